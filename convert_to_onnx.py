@@ -1,9 +1,39 @@
-import torch
 import argparse
-from vision.ssd.mobilenetv1_ssd import create_mobilenetv1_ssd
-from vision.ssd.config import mobilenetv1_ssd_config
+import json
+import os
+import platform
+import time
+import xml.etree.ElementTree as ET
 
-def export_to_onnx(model_path, label_path, onnx_path):
+import cv2
+import numpy as np
+
+# Must match person_follow/detection/preprocess.py
+IMAGE_SIZE = 300
+SSD_IMAGE_MEAN = 127.0
+SSD_IMAGE_STD = 128.0
+DEFAULT_PERSON_CLASS_ID = 15   # Pascal VOC "person"
+
+
+def export_to_onnx(model_path, label_path, onnx_path, fused_preprocess=False):
+    import torch
+    from vision.ssd.mobilenetv1_ssd import create_mobilenetv1_ssd
+    from vision.ssd.config import mobilenetv1_ssd_config
+
+    class FusedPreprocess(torch.nn.Module):
+        """
+        uint8 BGR [1, H, W, 3] → RGB, (x - 127) / 128, CHW → SSD.
+        Lets the robot feed the letterboxed camera buffer as-is.
+        """
+
+        def __init__(self, net):
+            super().__init__()
+            self.net = net
+
+        def forward(self, image):
+            x = image.permute(0, 3, 1, 2)[:, [2, 1, 0]].float()
+            x = (x - SSD_IMAGE_MEAN) / SSD_IMAGE_STD
+            return self.net(x)
 
     # ------------------------------
     # 1. Load labels
@@ -26,9 +56,13 @@ def export_to_onnx(model_path, label_path, onnx_path):
     # ------------------------------
     # 3. Prepare dummy input (300x300)
     # ------------------------------
-    dummy = torch.randn(1, 3,
-                        mobilenetv1_ssd_config.image_size,
-                        mobilenetv1_ssd_config.image_size)
+    size = mobilenetv1_ssd_config.image_size
+    if fused_preprocess:
+        print("📦 Folding BGR→RGB, normalization and HWC→CHW into the graph")
+        net = FusedPreprocess(net).eval()
+        dummy = torch.zeros(1, size, size, 3, dtype=torch.uint8)
+    else:
+        dummy = torch.randn(1, 3, size, size)
 
     # ------------------------------
     # 4. Export ONNX
@@ -47,11 +81,303 @@ def export_to_onnx(model_path, label_path, onnx_path):
     print("✅ ONNX export complete:", onnx_path)
 
 
+# ============================================================
+# VOC DATASET HELPERS (same layout train_ssd.py uses)
+# ============================================================
+def read_image_ids(voc_root, split):
+    path = os.path.join(voc_root, "ImageSets", "Main", f"{split}.txt")
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def read_person_boxes(voc_root, image_id):
+    """
+    Non-difficult "person" ground-truth boxes as an [M, 4] float array.
+    """
+    tree = ET.parse(os.path.join(voc_root, "Annotations", f"{image_id}.xml"))
+    boxes = []
+    for obj in tree.findall("object"):
+        if obj.find("name").text.strip().lower() != "person":
+            continue
+        difficult = obj.find("difficult")
+        if difficult is not None and int(difficult.text) == 1:
+            continue
+        bb = obj.find("bndbox")
+        boxes.append([float(bb.find(k).text) - 1 for k in ("xmin", "ymin", "xmax", "ymax")])
+    return np.array(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def letterbox_blob(image, fused=False):
+    """
+    BGR image → (blob, scale, new_w, new_h), exactly like the robot's
+    Preprocessor: long side to 300, top-left aligned, black padding.
+    blob is (x - 127) / 128 as float [1, 3, 300, 300], or the raw
+    uint8 BGR [1, 300, 300, 3] for graphs with fused preprocessing.
+    """
+    H, W = image.shape[:2]
+    scale = IMAGE_SIZE / float(max(H, W))
+    new_w, new_h = int(W * scale), int(H * scale)
+
+    canvas = np.zeros((IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.uint8)
+    canvas[:new_h, :new_w] = cv2.resize(image, (new_w, new_h))
+    if fused:
+        return canvas[None], scale, new_w, new_h
+
+    rgb = canvas[:, :, ::-1].astype(np.float32)
+    rgb = (rgb - SSD_IMAGE_MEAN) / SSD_IMAGE_STD
+
+    blob = np.ascontiguousarray(rgb.transpose(2, 0, 1)[None])
+    return blob, scale, new_w, new_h
+
+
+def is_fused(session):
+    return session.get_inputs()[0].type == "tensor(uint8)"
+
+
+def person_class_id(label_path):
+    try:
+        class_names = [l.strip().lower() for l in open(label_path)]
+        return class_names.index("person")
+    except (OSError, ValueError):
+        return DEFAULT_PERSON_CLASS_ID
+
+
+# ============================================================
+# INT8 QUANTIZATION
+# ============================================================
+def default_int8_path(onnx_path):
+    root, ext = os.path.splitext(onnx_path)
+    return f"{root}.int8{ext or '.onnx'}"
+
+
+def quantize_onnx(fp32_path, int8_path, voc_root, split="trainval", count=200,
+                  quant_format="qdq", per_channel=True, op_types=("Conv",),
+                  activation_type="uint8"):
+    """
+    Static INT8 quantization, calibrated on letterboxed VOC images.
+    Only `op_types` are quantized; the SSD box decoding stays in float.
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        CalibrationMethod,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    image_ids = read_image_ids(voc_root, split)[:count]
+    print(f"📏 Calibrating on {len(image_ids)} images from {split}")
+
+    class VOCCalibrationReader(CalibrationDataReader):
+        def __init__(self, input_name, fused):
+            self.input_name = input_name
+            self.fused = fused
+            self.ids = iter(image_ids)
+
+        def get_next(self):
+            for image_id in self.ids:
+                image = cv2.imread(os.path.join(voc_root, "JPEGImages", f"{image_id}.jpg"))
+                if image is None:
+                    continue
+                return {self.input_name: letterbox_blob(image, self.fused)[0]}
+            return None
+
+    graph_input = onnx.load(fp32_path).graph.input[0]
+    input_name = graph_input.name
+    fused = graph_input.type.tensor_type.elem_type == onnx.TensorProto.UINT8
+
+    # Shape inference + graph cleanup recommended before static quantization.
+    # The export has static shapes, so symbolic inference (needs sympy) is skipped.
+    prep_path = int8_path + ".prep.onnx"
+    quant_pre_process(fp32_path, prep_path, skip_symbolic_shape=True)
+
+    try:
+        quantize_static(
+            prep_path,
+            int8_path,
+            VOCCalibrationReader(input_name, fused),
+            quant_format=QuantFormat.QDQ if quant_format == "qdq" else QuantFormat.QOperator,
+            op_types_to_quantize=list(op_types),
+            per_channel=per_channel,
+            activation_type=QuantType.QUInt8 if activation_type == "uint8" else QuantType.QInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CalibrationMethod.MinMax,
+        )
+    finally:
+        if os.path.exists(prep_path):
+            os.remove(prep_path)
+
+    # Tag the artifact so the runtime can report what it loaded
+    model = onnx.load(int8_path)
+    for key, value in (("precision", "int8"), ("quant_format", quant_format)):
+        entry = model.metadata_props.add()
+        entry.key, entry.value = key, value
+    onnx.save(model, int8_path)
+
+    print("✅ INT8 model written:", int8_path)
+
+
+# ============================================================
+# FP32 vs INT8 REPORT
+# ============================================================
+def _iou(box, boxes):
+    iw = np.maximum(0.0, np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]))
+    ih = np.maximum(0.0, np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]))
+    inter = iw * ih
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def _person_boxes(scores, boxes, class_id, conf, scale, new_w, new_h, nms_iou=0.45):
+    person = scores[0, :, class_id]
+    idx = np.flatnonzero(person >= conf)
+    idx = idx[np.argsort(-person[idx])]
+    restored = boxes[0, idx] * np.array([new_w, new_h, new_w, new_h], dtype=np.float32) / scale
+
+    keep = []
+    for i in range(len(idx)):
+        if keep and np.max(_iou(restored[i], restored[keep])) > nms_iou:
+            continue
+        keep.append(i)
+    return restored[keep]
+
+
+def _recall_and_latency(session, voc_root, image_ids, class_id, conf, match_iou):
+    input_name = session.get_inputs()[0].name
+    fused = is_fused(session)
+    matched = total = 0
+    latencies = []
+
+    for image_id in image_ids:
+        image = cv2.imread(os.path.join(voc_root, "JPEGImages", f"{image_id}.jpg"))
+        if image is None:
+            continue
+        gt = read_person_boxes(voc_root, image_id)
+        blob, scale, new_w, new_h = letterbox_blob(image, fused)
+
+        t0 = time.perf_counter()
+        scores, boxes = session.run(["scores", "boxes"], {input_name: blob})
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+        pred = _person_boxes(scores, boxes, class_id, conf, scale, new_w, new_h)
+        used = np.zeros(len(pred), dtype=bool)
+        for g in gt:
+            total += 1
+            if len(pred) == 0:
+                continue
+            ious = np.where(used, 0.0, _iou(g, pred))
+            j = int(np.argmax(ious))
+            if ious[j] >= match_iou:
+                used[j] = True
+                matched += 1
+
+    lat = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "person_boxes": total,
+        "recall": matched / total if total else None,
+        "latency_ms": {
+            "mean": float(lat.mean()),
+            "p50": float(np.percentile(lat, 50)),
+            "p95": float(np.percentile(lat, 95)),
+        },
+    }
+
+
+def compare_models(fp32_path, int8_path, voc_root, report_path, split="test", count=200,
+                   class_id=DEFAULT_PERSON_CLASS_ID, conf=0.35, match_iou=0.5):
+    """
+    Person-box recall and per-frame latency, FP32 vs INT8, as JSON.
+    Run it on the robot to get meaningful latency numbers.
+    """
+    import onnxruntime as ort
+
+    image_ids = read_image_ids(voc_root, split)[:count]
+    print(f"📊 Comparing FP32 vs INT8 on {len(image_ids)} images from {split}")
+
+    results = {}
+    for name, path in (("fp32", fp32_path), ("int8", int8_path)):
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        # untimed warmup
+        blank = np.zeros((IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.uint8)
+        session.run(None, {session.get_inputs()[0].name: letterbox_blob(blank, is_fused(session))[0]})
+        results[name] = _recall_and_latency(session, voc_root, image_ids, class_id, conf, match_iou)
+        results[name]["model"] = path
+        results[name]["size_bytes"] = os.path.getsize(path)
+
+    fp32, int8 = results["fp32"], results["int8"]
+    report = {
+        "host": platform.machine(),
+        "split": split,
+        "images": len(image_ids),
+        "conf_threshold": conf,
+        "match_iou": match_iou,
+        "fp32": fp32,
+        "int8": int8,
+        "recall_delta": (int8["recall"] - fp32["recall"])
+        if fp32["recall"] is not None and int8["recall"] is not None else None,
+        "speedup_p50": fp32["latency_ms"]["p50"] / max(int8["latency_ms"]["p50"], 1e-9),
+    }
+
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"   recall FP32={fp32['recall']} INT8={int8['recall']}")
+    print(f"   p50 ms FP32={fp32['latency_ms']['p50']:.1f} INT8={int8['latency_ms']['p50']:.1f}")
+    print("✅ Report written:", report_path)
+    return report
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("model_path")
     parser.add_argument("label_path")
     parser.add_argument("--onnx", required=True)
+    parser.add_argument("--skip-export", action="store_true",
+                        help="Reuse an existing FP32 --onnx file (no torch needed)")
+    parser.add_argument("--fused-preprocess", action="store_true",
+                        help="Graph takes the letterboxed uint8 BGR frame (1, 300, 300, 3) "
+                             "and does RGB conversion, normalization and transpose itself")
+
+    # INT8
+    parser.add_argument("--quantize", action="store_true",
+                        help="Also write a static INT8 model and an FP32/INT8 report")
+    parser.add_argument("--int8-onnx", default=None,
+                        help="INT8 output path (default: <onnx>.int8.onnx)")
+    parser.add_argument("--dataset", default="dataset/VOC2007",
+                        help="VOC-format dataset used for calibration and the report")
+    parser.add_argument("--calib-split", default="trainval")
+    parser.add_argument("--calib-count", type=int, default=200)
+    parser.add_argument("--eval-split", default="test")
+    parser.add_argument("--eval-count", type=int, default=200)
+    parser.add_argument("--quant-format", choices=["qdq", "qoperator"], default="qdq")
+    parser.add_argument("--activation-type", choices=["uint8", "int8"], default="uint8")
+    parser.add_argument("--per-tensor", action="store_true",
+                        help="Per-tensor instead of per-channel weight scales")
+    parser.add_argument("--report", default=None,
+                        help="Report path (default: <int8-onnx>.report.json)")
     args = parser.parse_args()
 
-    export_to_onnx(args.model_path, args.label_path, args.onnx)
\ No newline at end of file
+    if not args.skip_export:
+        export_to_onnx(args.model_path, args.label_path, args.onnx,
+                       fused_preprocess=args.fused_preprocess)
+
+    if args.quantize:
+        int8_path = args.int8_onnx or default_int8_path(args.onnx)
+        quantize_onnx(
+            args.onnx, int8_path, args.dataset,
+            split=args.calib_split,
+            count=args.calib_count,
+            quant_format=args.quant_format,
+            per_channel=not args.per_tensor,
+            activation_type=args.activation_type,
+        )
+        compare_models(
+            args.onnx, int8_path, args.dataset,
+            args.report or os.path.splitext(int8_path)[0] + ".report.json",
+            split=args.eval_split,
+            count=args.eval_count,
+            class_id=person_class_id(args.label_path),
+        )
@@ -4,32 +4,35 @@ from typing import Optional
 
 from config.constants import DEBUG_PRINT
 from decision.decision import MotionCommand
+from telemetry.metrics import METRICS
 
 
 def _clamp_speed(value: int) -> int:
     return max(-99, min(99, int(value)))
 
 
-def apply_motion_command(bot, cmd: MotionCommand):
+def apply_motion_command(bot, cmd: MotionCommand, log: bool = True, origin: float = None):
     """
     Apply MotionCommand speeds to the AUPPBot instance.
     If bot is None, just print (dry-run mode).
+    log: print the [ACTION] line (callers publishing every frame pass
+    False for repeats).
+    origin: capture time of the frame behind cmd (glass-to-wheel with acks).
     """
     left = _clamp_speed(cmd.left_speed)
     right = _clamp_speed(cmd.right_speed)
 
-    if DEBUG_PRINT:
+    if DEBUG_PRINT and log:
         print(f"[ACTION] {cmd.label:12s} | L={left:3d} R={right:3d}")
 
     if bot is None:
         return
 
     try:
-        # Assuming AUPPBot API like your line-follower code
-        bot.motor1.speed(left)
-        bot.motor2.speed(left)
-        bot.motor3.speed(right)
-        bot.motor4.speed(right)
+        # All four motors in one serial write, unchanged wheels skipped.
+        # Only posted to the bot's I/O thread: this never waits on the port.
+        with METRICS.span("serial.write"):
+            bot.set_motors(left, left, right, right, origin=origin)
     except Exception as e:
         if DEBUG_PRINT:
             print("⚠️  Error while commanding motors:", e)
@@ -42,11 +45,9 @@ def stop_bot(bot: Optional[object]):
     if bot is None:
         return
 
+    # close() writes everything still queued before releasing the port
     try:
-        bot.motor1.speed(0)
-        bot.motor2.speed(0)
-        bot.motor3.speed(0)
-        bot.motor4.speed(0)
+        bot.set_motors(0, 0, 0, 0, force=True)
     except Exception:
         pass
 
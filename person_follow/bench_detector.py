@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# file: bench_detector.py
+"""
+Per-stage latency benchmark for PersonDetector, no camera needed.
+
+  python bench_detector.py path/to/images/ --output bench.json
+  python bench_detector.py clip.mp4 --model person_follower.int8.onnx
+
+Reports p50/p95/p99 for preprocess, session run and postprocess,
+tracemalloc allocations per frame and process RSS, as JSON.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from config.constants import ONNX_MODEL_PATH, ONNX_MODEL_PRECISION
+from detection.detection import PersonDetector
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+# ------------------------------------------------------------
+# INPUT
+# ------------------------------------------------------------
+def load_frames(source: str, limit: int):
+    """
+    Decode up to `limit` frames into memory so decode time isn't measured.
+    """
+    frames = []
+    if os.path.isdir(source):
+        paths = sorted(p for p in glob.glob(os.path.join(source, "*"))
+                       if p.lower().endswith(IMAGE_EXTS))
+        for path in paths[:limit]:
+            img = cv2.imread(path)
+            if img is not None:
+                frames.append(img)
+    else:
+        cap = cv2.VideoCapture(source)
+        while len(frames) < limit:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+        cap.release()
+
+    if not frames:
+        raise RuntimeError(f"No frames could be read from {source}")
+    return frames
+
+
+# ------------------------------------------------------------
+# MEMORY
+# ------------------------------------------------------------
+def rss_mb():
+    """
+    Current and peak resident set size in MB.
+    """
+    current = peak = None
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    current = int(line.split()[1]) / 1024.0
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    if peak is None:
+        # ru_maxrss is in KB on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return current, peak
+
+
+def percentiles(samples_ms):
+    a = np.asarray(samples_ms)
+    return {
+        "p50": float(np.percentile(a, 50)),
+        "p95": float(np.percentile(a, 95)),
+        "p99": float(np.percentile(a, 99)),
+        "mean": float(a.mean()),
+        "max": float(a.max()),
+    }
+
+
+# ------------------------------------------------------------
+# BENCHMARK
+# ------------------------------------------------------------
+def run_frame(detector: PersonDetector, frame: np.ndarray, timings=None):
+    """
+    Same stages as PersonDetector.detect_all(), timed separately.
+    """
+    t0 = time.perf_counter()
+    detector.preprocess(frame)
+    t1 = time.perf_counter()
+    scores, boxes = detector.engine.run()
+    t2 = time.perf_counter()
+    detections = detector.postprocess(scores[0], boxes[0])
+    t3 = time.perf_counter()
+
+    if timings is not None:
+        timings["preprocess"].append((t1 - t0) * 1000.0)
+        timings["inference"].append((t2 - t1) * 1000.0)
+        timings["postprocess"].append((t3 - t2) * 1000.0)
+        timings["total"].append((t3 - t0) * 1000.0)
+    return detections
+
+
+def measure_allocations(detector: PersonDetector, frames, count: int):
+    """
+    Net bytes / blocks still allocated after `count` frames, and the
+    tracemalloc peak. Runs separately: tracing slows everything down.
+    """
+    run_frame(detector, frames[0])
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+
+    for i in range(count):
+        run_frame(detector, frames[i % len(frames)])
+
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    net_bytes = sum(s.size_diff for s in stats)
+    net_blocks = sum(s.count_diff for s in stats)
+    return {
+        "frames": count,
+        "net_bytes_per_frame": net_bytes / count,
+        "net_blocks_per_frame": net_blocks / count,
+        "peak_bytes": peak,
+    }
+
+
+def benchmark(args):
+    frames = load_frames(args.source, args.frames)
+    rss_start, _ = rss_mb()
+
+    detector = PersonDetector(args.model, precision=args.precision,
+                              warmup_runs=args.warmup)
+
+    timings = {"preprocess": [], "inference": [], "postprocess": [], "total": []}
+    found = 0
+    t_start = time.perf_counter()
+    for _ in range(args.repeat):
+        for frame in frames:
+            found += len(run_frame(detector, frame, timings)) > 0
+    wall = time.perf_counter() - t_start
+
+    allocations = measure_allocations(detector, frames, args.alloc_frames) \
+        if args.alloc_frames > 0 else None
+    rss_end, rss_peak = rss_mb()
+
+    n = len(timings["total"])
+    return {
+        "source": args.source,
+        "model": detector.model_path,
+        "precision": detector.precision,
+        "fused_preprocess": detector.fused_preprocess,
+        "providers": detector.session.get_providers(),
+        "host": {
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "frames": n,
+        "frame_shape": list(frames[0].shape),
+        "frames_with_person": int(found),
+        "fps": n / wall if wall > 0 else None,
+        "latency_ms": {stage: percentiles(samples) for stage, samples in timings.items()},
+        "allocations": allocations,
+        "rss_mb": {"start": rss_start, "end": rss_end, "peak": rss_peak},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PersonDetector per-stage benchmark")
+    parser.add_argument("source", help="Directory of images or a video file")
+    parser.add_argument("--model", default=ONNX_MODEL_PATH)
+    parser.add_argument("--precision", default=ONNX_MODEL_PRECISION, choices=["fp32", "int8"])
+    parser.add_argument("--frames", type=int, default=300, help="Max frames to load")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the loaded frames")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--alloc-frames", type=int, default=50,
+                        help="Frames traced with tracemalloc (0 to skip)")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = benchmark(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"✅ Report written: {args.output}")
+
+    lat = report["latency_ms"]
+    for stage in ("preprocess", "inference", "postprocess", "total"):
+        s = lat[stage]
+        print(f"{stage:12s} p50={s['p50']:7.2f}  p95={s['p95']:7.2f}  p99={s['p99']:7.2f} ms")
+    print(f"FPS: {report['fps']:.1f} | RSS peak: {report['rss_mb']['peak']:.0f} MB")
+    if report["allocations"]:
+        a = report["allocations"]
+        print(f"Allocations: {a['net_bytes_per_frame']:.0f} B/frame net, "
+              f"peak {a['peak_bytes'] / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
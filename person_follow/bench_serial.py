@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# file: bench_serial.py
+"""
+Serial-path benchmark for AUPPBot against the firmware emulator, no robot needed.
+
+  python bench_serial.py --commands 500 --rate 100 --output serial.json
+  python bench_serial.py --mode threaded --rate 0      # flood: latest command wins
+  python bench_serial.py --ack                         # + firmware acks: round trip, lost
+
+Modes, same command sequence each:
+  legacy    motor1..motor4.speed() one by one, inline (four flushed writes)
+  batched   set_motors() inline, one buffer + one flush
+  threaded  set_motors() posted to the bot's I/O thread
+
+Reports how long the caller was blocked per command, command latency
+(call → last packet in at the emulated baud rate), delivered vs
+superseded commands, throughput, and whether the emulator ended in the
+last commanded state, as JSON. With --ack the emulator acks every
+packet and AUPPBot's feedback reader adds round-trip times.
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+from robot.auppbot import AUPPBot
+from robot.emulator import FirmwareEmulator, MOTOR_IDS
+
+MODES = ("legacy", "batched", "threaded")
+
+
+def percentiles(samples_ms):
+    if not samples_ms:
+        return None
+    a = np.asarray(samples_ms)
+    return {
+        "p50": float(np.percentile(a, 50)),
+        "p95": float(np.percentile(a, 95)),
+        "p99": float(np.percentile(a, 99)),
+        "max": float(a.max()),
+    }
+
+
+def command_speeds(k: int):
+    """
+    (m1, m2, m3, m4) for command k: every command differs from the one
+    before, so each one is recognizable in the emulator's motor state.
+    """
+    left = k % 99 + 1
+    right = -((k * 7) % 99 + 1)
+    return left, left, right, right
+
+
+class _Matcher:
+    """
+    Pairs emulator packets with the command that produced them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pending = {}        # speeds → call time
+        self.latencies = []      # ms, call → last packet on the wire
+        self.delivered = 0
+
+    def posted(self, speeds, t: float):
+        with self._lock:
+            self.pending[speeds] = t
+
+    def on_packet(self, emu: FirmwareEmulator, pkt):
+        state = tuple(emu.motors[i] for i in MOTOR_IDS)
+        with self._lock:
+            t = self.pending.pop(state, None)
+            if t is not None:
+                self.latencies.append((pkt.time - t) * 1000.0)
+                self.delivered += 1
+
+
+def run_mode(mode: str, commands: int, rate: float, baud: int, ack: bool = False) -> dict:
+    matcher = _Matcher()
+    emu = FirmwareEmulator(baud=baud, on_packet=matcher.on_packet, ack=ack).start()
+    bot = AUPPBot(emu.port, 115200, use_signals=False, threaded=(mode == "threaded"), feedback=ack)
+    motors = (bot.motor1, bot.motor2, bot.motor3, bot.motor4)
+
+    gap = 1.0 / rate if rate > 0 else 0.0
+    call_ms = []
+    speeds = None
+    start = time.perf_counter()
+    next_time = start
+
+    for k in range(commands):
+        if gap:
+            wait = next_time - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            next_time += gap
+
+        speeds = command_speeds(k)
+        t0 = time.perf_counter()
+        matcher.posted(speeds, t0)
+        if mode == "legacy":
+            for motor, value in zip(motors, speeds):
+                motor.speed(value)
+        else:
+            bot.set_motors(*speeds)
+        call_ms.append((time.perf_counter() - t0) * 1000.0)
+
+    bot.flush(timeout=5.0)
+    final_ok = emu.wait(lambda e: tuple(e.motors[i] for i in MOTOR_IDS) == speeds, timeout=2.0)
+    elapsed = time.perf_counter() - start
+    if ack:
+        # last acks are still on their way back
+        emu.settle()
+        deadline = time.perf_counter() + 1.0
+        while bot.feedback.stats["acked"] < emu.acks_sent and time.perf_counter() < deadline:
+            time.sleep(0.01)
+
+    stats = emu.stats()
+    link = bot.link_stats()
+    rtt = bot.feedback.snapshot()["rtt_ms"] if ack else None
+    bot.close()
+    emu.close()
+
+    return {
+        "mode": mode,
+        "commands": commands,
+        "delivered": matcher.delivered,
+        "superseded": link.get("superseded", 0),
+        "final_state_ok": final_ok,
+        "call_ms": percentiles(call_ms),
+        "latency_ms": percentiles(matcher.latencies),
+        "packets": stats["packets"],
+        "bytes": stats["bytes"],
+        "commands_per_s": round(commands / elapsed, 1),
+        "packets_per_s": stats["packets_per_s"],
+        "invalid_bytes": stats["invalid_bytes"],
+        "rtt_ms": {k: rtt[k] for k in ("count", "p50", "p95", "p99", "max")} if rtt else None,
+        "link": link,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AUPPBot serial-path benchmark (firmware emulator)")
+    parser.add_argument("--mode", choices=MODES, action="append",
+                        help="Mode to run (repeatable, default all)")
+    parser.add_argument("--commands", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=100.0,
+                        help="Commands per second (0 = as fast as possible)")
+    parser.add_argument("--baud", type=int, default=115200,
+                        help="Emulated UART speed for wire time (0 = instant)")
+    parser.add_argument("--ack", action="store_true",
+                        help="Emulator acks every packet; measure round trip with the feedback reader")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = {
+        "commands": args.commands,
+        "rate": args.rate,
+        "baud": args.baud,
+        "ack": args.ack,
+        "modes": [run_mode(m, args.commands, args.rate, args.baud, args.ack)
+                  for m in (args.mode or MODES)],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"✅ Report written: {args.output}")
+
+    for r in report["modes"]:
+        call, lat = r["call_ms"], r["latency_ms"]
+        lat_text = f"p50={lat['p50']:6.2f} p95={lat['p95']:6.2f} max={lat['max']:6.2f}" if lat else "n/a"
+        print(f"{r['mode']:9s} call p50={call['p50']:6.3f} p95={call['p95']:6.3f} ms | "
+              f"latency {lat_text} ms | delivered {r['delivered']}/{r['commands']} "
+              f"| {r['packets']} pkts | final {'OK' if r['final_state_ok'] else 'WRONG'}")
+        if r["rtt_ms"]:
+            rtt, link = r["rtt_ms"], r["link"]
+            print(f"{'':9s} rtt  p50={rtt['p50']:6.2f} p95={rtt['p95']:6.2f} max={rtt['max']:6.2f} ms "
+                  f"| acked {link['acked']} lost {link['lost']} unmatched {link['unmatched']}")
+
+
+if __name__ == "__main__":
+    main()
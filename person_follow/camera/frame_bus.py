@@ -0,0 +1,309 @@
+# file: camera/frame_bus.py
+
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from config.constants import FRAME_BUS_SLOTS
+
+# Layout of the shared block:
+#   header   8 x u64   magic, slots, height, width, channels, latest_seq, closed, pid
+#   slots    2 x u64   per slot: seqlock word, capture time (f64 bits)
+#   frames   slots x (height * width * channels) bytes, 64-byte aligned
+#
+# Seqlock: the writer stores 2*seq+1 (odd) before touching a slot and
+# 2*seq (even) once the frame is complete. A reader that sees the same
+# even word before and after reading got an untorn frame.
+_MAGIC = int.from_bytes(b"PFBUS1\0\0", "little")
+_HEADER_WORDS = 8
+_LATEST = 5
+_CLOSED = 6
+_PID = 7
+_ALIGN = 64
+
+# A waiting subscriber sleeps through this share of the publisher's frame
+# period before it starts polling for the next frame
+_EARLY_WAKE = 0.9
+
+
+def _frame_offset(slots: int) -> int:
+    raw = (_HEADER_WORDS + 2 * slots) * 8
+    return (raw + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Open an existing block without letting this process' resource
+    tracker unlink it on exit (it belongs to the publisher).
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python >= 3.13
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        # a publisher in this same process shares the registration: keep it
+        if shm.size < _HEADER_WORDS * 8 or _owner_pid(shm) != os.getpid():
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _owner_pid(shm: shared_memory.SharedMemory) -> int:
+    return int.from_bytes(shm.buf[_PID * 8:_PID * 8 + 8], "little")
+
+
+class _BusViews:
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int, shape: tuple):
+        self.slots = slots
+        self.shape = shape
+        self.header = np.ndarray((_HEADER_WORDS,), dtype=np.uint64, buffer=shm.buf)
+        meta = np.ndarray((slots, 2), dtype=np.uint64, buffer=shm.buf, offset=_HEADER_WORDS * 8)
+        self.locks = meta[:, 0]
+        self.times = meta.view(np.float64)[:, 1]
+        size = int(np.prod(shape))
+        base = _frame_offset(slots)
+        self.frames = [np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=base + i * size)
+                       for i in range(slots)]
+
+    def drop(self):
+        self.header = self.locks = self.times = None
+        self.frames = []
+
+
+class FrameBusPublisher:
+    """
+    Owns the shared block and writes frames into it round-robin.
+
+        view = bus.begin()
+        ok, frame = cap.read(image=view)   # decode straight into shared memory
+        bus.commit(time.time()) if ok else bus.abort()
+
+    Only the slot being written is ever inconsistent; the latest frame
+    stays untouched for the next slots-1 publishes.
+    """
+
+    def __init__(self, name: str, shape: tuple, slots: int = FRAME_BUS_SLOTS):
+        self.name = name
+        self.shape = tuple(int(v) for v in shape)
+        if len(self.shape) == 2:
+            self.shape += (1,)
+        size = _frame_offset(slots) + slots * int(np.prod(self.shape))
+
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # left behind by a publisher that crashed
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        self._v = _BusViews(self.shm, slots, self.shape)
+        h, w, c = self.shape
+        self._v.header[:] = [_MAGIC, slots, h, w, c, 0, 0, os.getpid()]
+        self.seq = 0
+        self._slot = None
+
+    def begin(self) -> np.ndarray:
+        """
+        Claim the next slot and return it as a writable frame view.
+        """
+        seq = self.seq + 1
+        slot = seq % self._v.slots
+        self._v.locks[slot] = 2 * seq + 1
+        self._slot = slot
+        return self._v.frames[slot]
+
+    def commit(self, capture_time: float):
+        seq = self.seq + 1
+        slot = self._slot
+        self._v.times[slot] = capture_time
+        self._v.locks[slot] = 2 * seq
+        self._v.header[_LATEST] = seq
+        self.seq = seq
+        self._slot = None
+
+    def abort(self):
+        # mark the slot as never written so readers skip it
+        if self._slot is not None:
+            self._v.locks[self._slot] = 0
+            self._slot = None
+
+    def publish(self, frame: np.ndarray, capture_time: float):
+        view = self.begin()
+        np.copyto(view, frame.reshape(view.shape))
+        self.commit(capture_time)
+
+    def close(self):
+        try:
+            self._v.header[_CLOSED] = 1
+            self._v.drop()
+            self.shm.close()
+            self.shm.unlink()
+        except Exception:
+            pass
+
+
+class FrameBusSubscriber:
+    """
+    Attaches to a publisher's block by name. Any number of processes can
+    subscribe; nothing is ever written by a subscriber.
+
+    wait_next() returns zero-copy views straight into shared memory,
+    check valid(seq) after using one to know it wasn't overwritten.
+    VideoStream follows the bus this way (open_source("bus:<name>")).
+    read(image=...) copies the newest frame into a caller buffer with
+    seqlock validation, so it can also stand in for cv2.VideoCapture.
+
+    Waiting sleeps until the next frame is about due (from the capture
+    times seen so far) and only polls every `poll` s after that.
+
+    A publisher killed without close() never sets the closed flag, and
+    its replacement unlinks the block and creates a new one under the
+    same name. stale turns true once the publisher's pid is gone;
+    reattach() then maps whatever block the name points to now.
+    """
+
+    def __init__(self, name: str, timeout: float = 1.0, poll: float = 0.001):
+        self.name = name
+        self.timeout = timeout
+        self.poll = poll
+        self.generation = 0          # bumped by every (re)attach
+        try:
+            self._open()
+        except FileNotFoundError:
+            raise RuntimeError(f"No frame bus named {name!r}, start camera_publisher.py first")
+
+    def _open(self):
+        self.shm = _attach(self.name)
+        header = np.ndarray((_HEADER_WORDS,), dtype=np.uint64, buffer=self.shm.buf)
+        if int(header[0]) != _MAGIC:
+            del header
+            self.shm.close()
+            raise RuntimeError(f"Shared memory {self.name!r} is not a frame bus")
+        slots, h, w, c = (int(v) for v in header[1:5])
+        del header
+
+        self.shape = (h, w, c) if c > 1 else (h, w)
+        self._v = _BusViews(self.shm, slots, (h, w, c))
+        self.pid = int(self._v.header[_PID])
+        self.last_seq = 0
+        self.generation += 1
+        self._period = 0.0           # publisher frame period (EMA), s
+        self._last = None            # (seq, capture_time) of the last frame handed out
+
+    def reattach(self) -> bool:
+        """
+        The publisher went away; attach to its replacement if one is up.
+        Views handed out before stay mapped but never test valid() again.
+        """
+        self.release()
+        try:
+            self._open()
+            return True
+        except (FileNotFoundError, RuntimeError):
+            return False
+
+    # ------------------------------------------------------------
+    # ZERO-COPY ACCESS
+    # ------------------------------------------------------------
+    @property
+    def latest_seq(self) -> int:
+        return int(self._v.header[_LATEST])
+
+    @property
+    def closed(self) -> bool:
+        return self._v.header is None or bool(self._v.header[_CLOSED])
+
+    @property
+    def stale(self) -> bool:
+        """
+        True once the publisher closed the bus or its process is gone.
+        """
+        if self.closed:
+            return True
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass      # alive, owned by another user
+        return False
+
+    def wait_next(self, last_seq: int = 0, timeout: float = None):
+        """
+        (view, seq, capture_time) of the newest frame with seq > last_seq,
+        or None on timeout or once the bus is closed. The view is only
+        guaranteed intact while valid(seq) holds.
+        """
+        deadline = time.time() + (self.timeout if timeout is None else timeout)
+        while not self.closed:
+            seq = self.latest_seq
+            if seq > last_seq:
+                slot = seq % self._v.slots
+                if int(self._v.locks[slot]) == 2 * seq:
+                    capture_time = float(self._v.times[slot])
+                    self._track_period(seq, capture_time)
+                    return self.frame(seq), seq, capture_time
+            now = time.time()
+            if now >= deadline:
+                return None
+            time.sleep(max(self.poll, min(self._due() - now, deadline - now)))
+        return None
+
+    def _track_period(self, seq: int, capture_time: float):
+        if self._last is not None and seq > self._last[0]:
+            period = (capture_time - self._last[1]) / (seq - self._last[0])
+            if 0 < period < self.timeout:
+                self._period += 0.2 * (period - self._period) if self._period else period
+        self._last = (seq, capture_time)
+
+    def _due(self) -> float:
+        # when the next frame should be close: no point polling before that
+        if self._last is None or not self._period:
+            return 0.0
+        return self._last[1] + _EARLY_WAKE * self._period
+
+    def frame(self, seq: int) -> np.ndarray:
+        """
+        Zero-copy view of the slot frame `seq` was written to.
+        """
+        return self._v.frames[seq % self._v.slots].reshape(self.shape)
+
+    def valid(self, seq: int) -> bool:
+        locks = self._v.locks
+        return locks is not None and int(locks[seq % self._v.slots]) == 2 * seq
+
+    # ------------------------------------------------------------
+    # cv2.VideoCapture-LIKE
+    # ------------------------------------------------------------
+    def isOpened(self) -> bool:
+        return True
+
+    def set(self, prop, value) -> bool:
+        return False   # the publisher owns the camera settings
+
+    def read(self, image=None):
+        if self.stale and not self.reattach():
+            time.sleep(self.timeout)
+            return False, None
+
+        deadline = time.time() + self.timeout
+        while True:
+            item = self.wait_next(self.last_seq, max(0.0, deadline - time.time()))
+            if item is None:
+                return False, None
+            view, seq, _ = item
+            out = image if image is not None and image.shape == view.shape else np.empty_like(view)
+            np.copyto(out, view)
+            if self.valid(seq):
+                self.last_seq = seq
+                return True, out
+            # overwritten mid-copy (reader fell slots-1 frames behind): retry
+
+    def release(self):
+        self._v.drop()
+        try:
+            self.shm.close()
+        except BufferError:
+            pass   # a caller still holds a zero-copy view
@@ -0,0 +1,357 @@
+# file: camera/sources.py
+
+import glob
+import os
+import struct
+import time
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+from camera.frame_bus import FrameBusSubscriber
+
+# Recorded session file: MAGIC, then per frame <capture_time f64><jpeg_len u32><jpeg>
+SESSION_MAGIC = b"PFSESS1\n"
+SESSION_EXT = ".pfs"
+_RECORD_HEADER = struct.Struct("<dI")
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Decode-time downscale factor → imdecode flag. JPEG is decoded straight
+# to 1/2, 1/4 or 1/8 size (DCT scaling), far cheaper than decode + resize.
+DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def is_jpeg(data) -> bool:
+    return data is not None and data.size > 2 and data.flat[0] == 0xFF and data.flat[1] == 0xD8
+
+
+def decode_scaled(data: np.ndarray, scale: int = 1) -> np.ndarray:
+    """
+    Encoded image bytes → BGR frame at 1/scale of the full resolution.
+    """
+    return cv2.imdecode(data, DECODE_FLAGS[scale])
+
+
+def shrink(frame: np.ndarray, scale: int) -> np.ndarray:
+    if scale == 1:
+        return frame
+    h, w = frame.shape[:2]
+    return cv2.resize(frame, (w // scale, h // scale), interpolation=cv2.INTER_AREA)
+
+
+def _decode_packet(raw, scale: int):
+    """
+    What cap.read() returned in raw mode → (frame, encoded bytes or None).
+    A backend that ignored raw mode hands back a decoded image instead.
+    """
+    if raw is None:
+        return None, None
+    if raw.ndim == 3:
+        return shrink(raw, scale), None
+    data = raw.reshape(-1)
+    if not is_jpeg(data):
+        return None, None
+    return decode_scaled(data, scale), data
+
+
+class _Pacer:
+    """
+    Releases frames at their original capture rate (realtime=True)
+    or as fast as the consumer can take them.
+    """
+
+    def __init__(self, realtime: bool):
+        self.realtime = realtime
+        self._t0_wall = None
+        self._t0_src = None
+
+    def reset(self):
+        self._t0_wall = None
+
+    def wait(self, src_time: float):
+        if not self.realtime:
+            return
+        now = time.time()
+        if self._t0_wall is None:
+            self._t0_wall, self._t0_src = now, src_time
+            return
+        delay = (self._t0_wall + (src_time - self._t0_src)) - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class FrameSource(ABC):
+    """
+    Offline stand-in for cv2.VideoCapture: isOpened() / read() / set() /
+    release(), so VideoStream can drive it exactly like a camera.
+    Subclasses implement _next() → (src_time, frame) or None at the end.
+
+    With decode_scale > 1 frames come out at 1/decode_scale size and,
+    when the source is JPEG, .last_encoded keeps the compressed bytes
+    so a full-resolution decode stays possible.
+    """
+
+    def __init__(self, realtime: bool = True, loop: bool = False, decode_scale: int = 1):
+        if decode_scale not in DECODE_FLAGS:
+            raise ValueError(f"decode_scale must be one of {sorted(DECODE_FLAGS)}")
+        self.loop = loop
+        self.finished = False
+        self.decode_scale = decode_scale
+        self.last_encoded = None
+        self._pacer = _Pacer(realtime)
+
+    def isOpened(self) -> bool:
+        return True
+
+    def set(self, prop, value) -> bool:
+        return False   # resolution etc. are fixed by the recording
+
+    @abstractmethod
+    def _next(self):
+        """
+        Next (src_time, frame), or None at the end of the recording.
+        """
+
+    @abstractmethod
+    def _rewind(self):
+        """
+        Go back to the first frame (loop=True).
+        """
+
+    def read(self, image=None):
+        item = self._next()
+        if item is None and self.loop:
+            self._rewind()
+            self._pacer.reset()
+            item = self._next()
+        if item is None:
+            self.finished = True
+            return False, None
+
+        src_time, frame = item
+        self._pacer.wait(src_time)
+
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class VideoFileSource(FrameSource):
+    """
+    With decode_scale > 1, MJPEG files (e.g. recorded from the robot's
+    camera) are read as raw packets and decoded at reduced size; other
+    codecs are decoded normally and then shrunk.
+    """
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False, decode_scale: int = 1):
+        super().__init__(realtime, loop, decode_scale)
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Cannot open video file {path}")
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 30.0
+        self._index = 0
+        self.raw = decode_scale > 1 and self._try_raw()
+
+    def _try_raw(self) -> bool:
+        if not self.cap.set(cv2.CAP_PROP_FORMAT, -1):
+            return False
+        ok, raw = self.cap.read()
+        if ok and raw.ndim == 2 and is_jpeg(raw):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            return True
+        # not MJPEG: reopen in normal decoded mode
+        self.cap.release()
+        self.cap = cv2.VideoCapture(self.path)
+        return False
+
+    def _next(self):
+        ok, frame = self.cap.read()
+        if not ok:
+            return None
+        if self.raw:
+            frame, self.last_encoded = _decode_packet(frame, self.decode_scale)
+            if frame is None:
+                return None
+        else:
+            frame = shrink(frame, self.decode_scale)
+        t = self._index / self.fps
+        self._index += 1
+        return t, frame
+
+    def _rewind(self):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self._index = 0
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirSource(FrameSource):
+    def __init__(self, path: str, fps: float = 30.0, realtime: bool = True, loop: bool = False,
+                 decode_scale: int = 1):
+        super().__init__(realtime, loop, decode_scale)
+        self.paths = sorted(p for p in glob.glob(os.path.join(path, "*"))
+                            if p.lower().endswith(IMAGE_EXTS))
+        if not self.paths:
+            raise RuntimeError(f"No images found in {path}")
+        self.fps = fps
+        self._index = 0
+
+    def _next(self):
+        while self._index < len(self.paths):
+            i = self._index
+            self._index += 1
+            data = np.fromfile(self.paths[i], dtype=np.uint8)
+            frame = decode_scaled(data, self.decode_scale) if data.size else None
+            if frame is not None:
+                self.last_encoded = data
+                return i / self.fps, frame
+        return None
+
+    def _rewind(self):
+        self._index = 0
+
+
+class RecordedSessionSource(FrameSource):
+    """
+    Replays a file written by SessionRecorder with the original timing.
+    """
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False, decode_scale: int = 1):
+        super().__init__(realtime, loop, decode_scale)
+        self.path = path
+        self._f = open(path, "rb")
+        if self._f.read(len(SESSION_MAGIC)) != SESSION_MAGIC:
+            self._f.close()
+            raise RuntimeError(f"{path} is not a recorded session")
+
+    def _next_record(self):
+        header = self._f.read(_RECORD_HEADER.size)
+        if len(header) < _RECORD_HEADER.size:
+            return None
+        t, n = _RECORD_HEADER.unpack(header)
+        data = self._f.read(n)
+        if len(data) < n:
+            return None
+        return t, data
+
+    def _next(self):
+        record = self._next_record()
+        if record is None:
+            return None
+        t, data = record
+        self.last_encoded = np.frombuffer(data, dtype=np.uint8)
+        return t, decode_scaled(self.last_encoded, self.decode_scale)
+
+    def _rewind(self):
+        self._f.seek(len(SESSION_MAGIC))
+
+    def release(self):
+        self._f.close()
+
+
+class MjpegCameraSource:
+    """
+    USB camera read as undecoded MJPEG (CAP_PROP_CONVERT_RGB=0) and
+    decoded straight to 1/decode_scale size, keeping the JPEG in
+    .last_encoded for an on-demand full-resolution decode. Backends that
+    ignore raw mode still work, the decoded frame is shrunk instead.
+    """
+
+    def __init__(self, index: int, decode_scale: int = 2):
+        if decode_scale not in DECODE_FLAGS:
+            raise ValueError(f"decode_scale must be one of {sorted(DECODE_FLAGS)}")
+        self.decode_scale = decode_scale
+        self.last_encoded = None
+        self.cap = cv2.VideoCapture(index)
+        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+        self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def set(self, prop, value) -> bool:
+        return self.cap.set(prop, value)
+
+    def read(self, image=None):
+        ok, raw = self.cap.read()
+        if not ok:
+            return False, None
+        frame, self.last_encoded = _decode_packet(raw, self.decode_scale)
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class SessionRecorder:
+    """
+    Appends frames as JPEG with their capture time — a compact,
+    replayable record of what the camera saw.
+    """
+
+    def __init__(self, path: str, quality: int = 90):
+        self.path = path
+        self.quality = quality
+        self.frames = 0
+        self._f = open(path, "wb")
+        self._f.write(SESSION_MAGIC)
+
+    def write(self, frame: np.ndarray, capture_time: float):
+        ok, jpg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+        self.write_encoded(jpg, capture_time)
+
+    def write_encoded(self, jpg: np.ndarray, capture_time: float):
+        """
+        Store a frame that is already JPEG (raw MJPEG capture), as-is.
+        """
+        self._f.write(_RECORD_HEADER.pack(capture_time, jpg.size))
+        self._f.write(jpg.tobytes())
+        self.frames += 1
+
+    def close(self):
+        try:
+            self._f.close()
+        except Exception:
+            pass
+
+
+def open_source(spec, realtime: bool = True, loop: bool = False, decode_scale: int = 1):
+    """
+    Camera index (int or digit string) → cv2.VideoCapture
+    (MjpegCameraSource when decode_scale > 1),
+    bus:<name> → FrameBusSubscriber (frames from camera_publisher.py),
+    directory → ImageDirSource, *.pfs → RecordedSessionSource,
+    anything else → VideoFileSource.
+    """
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        if decode_scale > 1:
+            return MjpegCameraSource(int(spec), decode_scale)
+        return cv2.VideoCapture(int(spec))
+    if spec.startswith("bus:"):
+        return FrameBusSubscriber(spec[len("bus:"):])
+    if os.path.isdir(spec):
+        return ImageDirSource(spec, realtime=realtime, loop=loop, decode_scale=decode_scale)
+    if spec.endswith(SESSION_EXT):
+        return RecordedSessionSource(spec, realtime=realtime, loop=loop, decode_scale=decode_scale)
+    return VideoFileSource(spec, realtime=realtime, loop=loop, decode_scale=decode_scale)
@@ -3,64 +3,368 @@
 import cv2
 import threading
 import time
+from typing import Optional
 
-from config.constants import CAM_INDEX, FRAME_WIDTH, FRAME_HEIGHT
+import numpy as np
+
+from config.constants import CAM_INDEX, FRAME_WIDTH, FRAME_HEIGHT, FRAME_RING_SLOTS, CAPTURE_DECODE_SCALE
+from camera.frame_bus import FrameBusSubscriber
+from camera.sources import open_source, decode_scaled, is_jpeg
+from telemetry.metrics import METRICS
+
+
+class FrameRef:
+    """
+    A captured frame pinned in the VideoStream ring.
+
+    .image is a read-only view of the ring slot and stays valid until
+    release(); the capture thread never decodes into a pinned slot.
+    Use retain() to hand the same frame to another owner (e.g. the
+    inference worker), each owner releases its own reference.
+
+    With reduced-size decode, .image is 1/scale of the camera
+    resolution; full() decodes the same frame at full resolution.
+
+    Frames from a bus:<name> source are views straight into the shared
+    block, which the publisher doesn't know about and overwrites
+    FRAME_BUS_SLOTS-1 frames later. Whoever reads .image checks valid()
+    afterwards and drops what it computed if the frame changed under it.
+    Ring frames are pinned and always valid.
+    """
+
+    __slots__ = ("image", "seq", "time", "scale", "_stream", "_slot")
+
+    def __init__(self, stream, slot: int, image: np.ndarray, seq: int, frame_time: float):
+        self.image = image
+        self.seq = seq
+        self.time = frame_time
+        self.scale = stream.scale
+        self._stream = stream
+        self._slot = slot
+
+    def retain(self) -> "FrameRef":
+        return self._stream._pin(self._slot, self.seq, self.time, self.image)
+
+    def full(self) -> np.ndarray:
+        """
+        New full-resolution copy of this frame (must not be released yet).
+        """
+        return self._stream._full(self._slot, self.image)
+
+    def valid(self) -> bool:
+        """
+        True while .image still holds this frame (must not be released yet).
+        """
+        return self._slot is not None and self._stream._valid(self._slot)
+
+    def release(self):
+        if self._slot is not None:
+            self._stream._unpin(self._slot)
+            self._slot = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
 
 
 class VideoStream:
     """
     Simple threaded camera grabber.
-    Call .start(), then .read() to get the latest frame.
+    Call .start(), then .wait_next() to get each new frame once.
+
+    The capture thread decodes straight into a ring of preallocated
+    slots (cap.read(image=slot)), so reading a frame costs no copy.
+    Every frame carries a sequence number and its capture time;
+    wait_next(last_seq) blocks until a newer frame is published and
+    returns it pinned. If every slot is pinned the camera frame is
+    read and discarded (counted as camera.ring_overrun).
+
+    src can be a camera index, a video file, an image directory or a
+    recorded session (*.pfs), see camera.sources.open_source().
+    With a recorder, every captured frame is also written to disk.
+
+    A bus:<name> source (camera_publisher.py) needs no ring: the thread
+    only follows the bus, and frames are handed out as zero-copy views
+    of the shared block (see FrameRef.valid()). If the publisher dies
+    the stream attaches to its replacement.
+
+    File sources with realtime=False run in lockstep: the next frame is
+    only decoded once the current one has been read, so a replay is as
+    fast as the consumer and no frame is skipped.
+
+    decode_scale=2/4 decodes MJPEG straight to half/quarter size (see
+    camera.sources.MjpegCameraSource); .scale is the factor actually in
+    effect and FrameRef.full() recovers the full-resolution frame.
     """
 
     def __init__(self,
-                 src: int = CAM_INDEX,
+                 src=CAM_INDEX,
                  width: int = FRAME_WIDTH,
-                 height: int = FRAME_HEIGHT):
+                 height: int = FRAME_HEIGHT,
+                 realtime: bool = True,
+                 loop: bool = False,
+                 recorder=None,
+                 slots: int = FRAME_RING_SLOTS,
+                 decode_scale: int = CAPTURE_DECODE_SCALE):
         self.src = src
         self.width = width
         self.height = height
+        self.recorder = recorder
 
-        self.cap = cv2.VideoCapture(self.src)
+        self.cap = open_source(self.src, realtime=realtime, loop=loop, decode_scale=decode_scale)
+        self.scale = getattr(self.cap, "decode_scale", 1)
         if not self.cap.isOpened():
             raise RuntimeError(f"Cannot open camera index {self.src}")
+        self.bus = self.cap if isinstance(self.cap, FrameBusSubscriber) else None
+        self.lockstep = not realtime and hasattr(self.cap, "finished")
+        self._consumed = threading.Event()
 
         # Try to set resolution (may be ignored by some webcams)
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
 
-        self.grabbed, self.frame = self.cap.read()
-        if not self.grabbed:
-            raise RuntimeError("Failed to grab initial frame from camera")
+        if self.bus is not None:
+            self._init_bus()
+        else:
+            self._init_ring(slots)
+
+        # True once a file-backed source has no more frames
+        self.finished = False
 
         self.stopped = False
         self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
         self.thread = threading.Thread(target=self.update, daemon=True)
 
+    def _init_ring(self, slots: int):
+        self.grabbed, frame = self.cap.read()
+        if not self.grabbed:
+            raise RuntimeError("Failed to grab initial frame from camera")
+
+        # Ring sized from the first frame; slot 0 holds it
+        self._slots = [np.empty_like(frame) for _ in range(max(2, slots))]
+        np.copyto(self._slots[0], frame)
+        self._pins = [0] * len(self._slots)
+        self._times = [0.0] * len(self._slots)
+        self._seqs = [0] * len(self._slots)
+        # compressed bytes behind each slot (raw MJPEG capture), for full()
+        self._encoded = [None] * len(self._slots)
+        self._encoded[0] = getattr(self.cap, "last_encoded", None)
+
+        self.seq = 1                 # sequence number of the latest frame
+        self._latest = 0             # its slot
+        self.frame_time = time.time()
+        self._times[0] = self.frame_time
+        self._seqs[0] = self.seq
+        self._record(self._slots[0], self._encoded[0], self.frame_time)
+
+    def _init_bus(self):
+        item = self.bus.wait_next(0)
+        if item is None:
+            raise RuntimeError("Failed to grab initial frame from camera")
+        view, bus_seq, capture_time = item
+
+        self.grabbed = True
+        self.seq = 1                 # own numbering: survives a publisher restart
+        self._latest = (self.bus.generation, bus_seq)
+        self.frame_time = capture_time
+        self._record(view, None, capture_time)
+
     def start(self):
         self.thread.start()
         return self
 
+    def _record(self, frame, encoded, capture_time):
+        if self.recorder is None:
+            return
+        if is_jpeg(encoded):
+            # camera JPEG as-is: full resolution and no re-encode
+            self.recorder.write_encoded(encoded, capture_time)
+        else:
+            self.recorder.write(frame, capture_time)
+
+    # ------------------------------------------------------------
+    # RING
+    # ------------------------------------------------------------
+    def _free_slot(self) -> Optional[int]:
+        with self._lock:
+            n = len(self._slots)
+            for k in range(1, n + 1):
+                i = (self._latest + k) % n
+                if i != self._latest and self._pins[i] == 0:
+                    return i
+        return None
+
+    def _pin(self, slot, seq: int, frame_time: float, image: np.ndarray) -> FrameRef:
+        if self.bus is None:
+            with self._lock:
+                self._pins[slot] += 1
+        return FrameRef(self, slot, image, seq, frame_time)
+
+    def _unpin(self, slot):
+        if self.bus is None:
+            with self._lock:
+                self._pins[slot] -= 1
+
+    def _valid(self, slot) -> bool:
+        if self.bus is None:
+            return True
+        generation, bus_seq = slot
+        with self._lock:
+            return generation == self.bus.generation and self.bus.valid(bus_seq)
+
+    def _full(self, slot, image: np.ndarray) -> np.ndarray:
+        if self.bus is not None:
+            return image.copy()
+        encoded = self._encoded[slot]
+        if self.scale == 1:
+            return self._slots[slot].copy()
+        if encoded is not None:
+            return decode_scaled(encoded, 1)
+        h, w = self._slots[slot].shape[:2]
+        return cv2.resize(self._slots[slot], (w * self.scale, h * self.scale))
+
     def update(self):
+        if self.bus is not None:
+            self._follow_bus()
+            return
         while not self.stopped:
-            grabbed, frame = self.cap.read()
+            if self.lockstep:
+                # wait until the consumer has taken the current frame
+                if not self._consumed.wait(timeout=0.1):
+                    continue
+                self._consumed.clear()
+
+            slot = self._free_slot()
+            if slot is None:
+                # every buffer is held by a reader: drop this frame
+                self.cap.read()
+                METRICS.inc("camera.ring_overrun")
+                continue
+
+            buf = self._slots[slot]
+            with METRICS.span("camera.read"):
+                grabbed, frame = self.cap.read(image=buf)
             if not grabbed:
+                if getattr(self.cap, "finished", False):
+                    with self._cond:
+                        self.finished = True
+                        self._cond.notify_all()
+                    return
                 # avoid tight loop if camera disconnects
                 time.sleep(0.01)
                 continue
 
-            with self._lock:
+            if frame is not buf:
+                # the source changed resolution: adopt its buffer
+                self._slots[slot] = frame
+
+            encoded = getattr(self.cap, "last_encoded", None)
+            self._encoded[slot] = encoded
+
+            now = time.time()
+            self._record(frame, encoded, now)
+
+            with self._cond:
+                self.seq += 1
+                self._seqs[slot] = self.seq
+                self._times[slot] = now
+                self._latest = slot
                 self.grabbed = grabbed
-                self.frame = frame
+                self.frame_time = now
+                self._cond.notify_all()
+
+    def _follow_bus(self):
+        bus_seq = self._latest[1]
+        while not self.stopped:
+            item = self.bus.wait_next(bus_seq, timeout=0.5)
+            if item is None:
+                if self.bus.stale:
+                    # publisher crashed or restarted: map its new block
+                    with self._lock:
+                        attached = self.bus.reattach()
+                    if attached:
+                        METRICS.inc("camera.bus_reattach")
+                        bus_seq = 0
+                    else:
+                        time.sleep(0.1)
+                continue
+
+            view, bus_seq, capture_time = item
+            self._record(view, None, capture_time)
+            with self._cond:
+                self.seq += 1
+                self._latest = (self.bus.generation, bus_seq)
+                self.frame_time = capture_time
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------
+    # READERS
+    # ------------------------------------------------------------
+    def wait_next(self, last_seq: int = 0, timeout: float = None) -> Optional[FrameRef]:
+        """
+        Newest frame with seq > last_seq, pinned (release() when done).
+        Frames published in between are skipped. Returns None on
+        timeout or once the stream is stopped or finished.
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                    lambda: self.seq > last_seq or self.stopped or self.finished, timeout):
+                return None
+            if self.seq <= last_seq:
+                return None
+            if self.bus is not None:
+                return self._bus_ref()
+            slot = self._latest
+            self._pins[slot] += 1
+            seq, frame_time = self._seqs[slot], self._times[slot]
+            self._consumed.set()
+
+        view = self._slots[slot].view()
+        view.flags.writeable = False
+        return FrameRef(self, slot, view, seq, frame_time)
+
+    def _bus_ref(self) -> Optional[FrameRef]:
+        # caller holds self._lock
+        generation, bus_seq = self._latest
+        if generation != self.bus.generation:
+            return None      # its block is gone, the next frame comes from the new one
+        view = self.bus.frame(bus_seq).view()
+        view.flags.writeable = False
+        return FrameRef(self, self._latest, view, self.seq, self.frame_time)
 
     def read(self):
+        """
+        Copy of the latest frame (new or not), or None.
+        """
+        frame, _ = self.read_timed()
+        return frame
+
+    def read_timed(self):
+        """
+        Copy of the latest frame and its capture time (time.time()), or (None, None).
+        """
         with self._lock:
             if not self.grabbed:
-                return None
-            return self.frame.copy()
+                return None, None
+            self._consumed.set()
+            if self.bus is not None:
+                ref = self._bus_ref()
+                if ref is None:
+                    return None, None
+                frame = ref.image.copy()
+                # self._lock is held: ask the bus directly, not ref.valid()
+                intact = self.bus.valid(self._latest[1])
+                return (frame, self.frame_time) if intact else (None, None)
+            return self._slots[self._latest].copy(), self.frame_time
 
     def stop(self):
-        self.stopped = True
+        with self._cond:
+            self.stopped = True
+            self._cond.notify_all()
         try:
             self.thread.join(timeout=1.0)
         except Exception:
@@ -69,3 +373,5 @@ class VideoStream:
             self.cap.release()
         except Exception:
             pass
+        if self.recorder is not None:
+            self.recorder.close()
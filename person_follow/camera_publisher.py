@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# file: camera_publisher.py
+"""
+Owns the camera and publishes every frame on a shared-memory frame bus,
+so the follower and the web stream can run as separate processes:
+
+  python camera_publisher.py                       # camera 0 → bus "pf_camera"
+  python main.py --source bus:pf_camera
+  PF_CAMERA=bus:pf_camera python app_mssd.py
+
+Frames are decoded straight into shared memory; subscribers never
+block the publisher.
+"""
+
+import argparse
+import signal
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from camera.frame_bus import FrameBusPublisher
+from camera.sources import open_source
+from config.constants import CAM_INDEX, FRAME_WIDTH, FRAME_HEIGHT, FRAME_BUS_NAME, FRAME_BUS_SLOTS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Publish camera frames on a shared-memory bus")
+    parser.add_argument("--source", default=str(CAM_INDEX),
+                        help="Camera index, video file, image directory or recorded session (.pfs)")
+    parser.add_argument("--name", default=FRAME_BUS_NAME, help="Bus name subscribers attach to")
+    parser.add_argument("--slots", type=int, default=FRAME_BUS_SLOTS)
+    parser.add_argument("--width", type=int, default=FRAME_WIDTH)
+    parser.add_argument("--height", type=int, default=FRAME_HEIGHT)
+    parser.add_argument("--loop", action="store_true", help="Loop file sources")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # `kill` / systemd stop should still unlink the shared block
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    cap = open_source(args.source, realtime=True, loop=args.loop)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open camera {args.source}")
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, args.width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, args.height)
+
+    ok, frame = cap.read()
+    if not ok:
+        raise RuntimeError("Failed to grab initial frame from camera")
+
+    bus = FrameBusPublisher(args.name, frame.shape, args.slots)
+    bus.publish(frame, time.time())
+    print(f"✓ Publishing {frame.shape[1]}x{frame.shape[0]} on bus:{args.name} "
+          f"({args.slots} slots)")
+
+    fps_time = time.time()
+    frames = 0
+    try:
+        while True:
+            view = bus.begin()
+            ok, frame = cap.read(image=view)
+            if not ok:
+                bus.abort()
+                if getattr(cap, "finished", False):
+                    print("✓ Source finished")
+                    break
+                time.sleep(0.01)
+                continue
+            if frame is not view:
+                if frame.shape != view.shape:
+                    bus.abort()
+                    continue
+                np.copyto(view, frame)
+            bus.commit(time.time())
+
+            frames += 1
+            now = time.time()
+            if now - fps_time >= 5.0:
+                print(f"[BUS] {frames / (now - fps_time):.1f} FPS | seq {bus.seq}")
+                fps_time = now
+                frames = 0
+
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupted by user")
+    finally:
+        bus.close()
+        cap.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,17 +9,81 @@ PROJECT_ROOT = os.path.dirname(BASE_DIR)
 # Adjust this if your ONNX file lives somewhere else
 ONNX_MODEL_PATH = os.path.join(PROJECT_ROOT, "/home/aupp/person_follow/person_follower.onnx")
 
+# "fp32" or "int8". convert_to_onnx.py --quantize writes <name>.int8.onnx next to
+# the FP32 model; if that file is missing the FP32 model is used.
+ONNX_MODEL_PRECISION = "fp32"
+
 # Detection
 CONFIDENCE_THRESHOLD = 0.35
+NMS_IOU_THRESHOLD = 0.45     # overlap above which a weaker person box is suppressed
+NMS_CANDIDATE_SIZE = 200     # keep at most this many top-scoring boxes before NMS
+
+# Steering zones, as fractions of frame width
+ZONE_LEFT_END = 0.35       # LEFT   : [0, 0.35W)
+ZONE_RIGHT_START = 0.65    # CENTER : [0.35W, 0.65W), RIGHT : [0.65W, W)
+
+# Adaptive detection cadence
+CONTROL_LOOP_HZ = 30           # loop rate the scheduler protects
+DETECT_MIN_INTERVAL = 0.05     # s between detections when steering is uncertain
+DETECT_MAX_INTERVAL = 0.5      # s between detections when the track is solid
+DETECT_MAX_DUTY = 0.6          # max fraction of wall time spent inside inference
+SCHED_CONF_REF = 0.6           # tracker confidence treated as fully certain
+SCHED_FAST_MOTION = 0.5        # bbox speed (frame widths / s) treated as fully uncertain
+SCHED_BOUNDARY_MARGIN = 0.08   # bbox centre this close (fraction of W) to a zone edge → uncertain
+
+# ROI detection around the last known target
+ROI_ENABLED = True
+ROI_PADDING = 0.5              # padding on each side, as a fraction of bbox size
+ROI_MIN_SIZE = 300             # px; never crop smaller than the model input
+ROI_MAX_AREA = 0.6             # ROI covering more of the frame than this → full frame
+ROI_FULL_SCAN_PERIOD = 1.0     # s; periodic full-frame scan even while tracking
+
+# ONNX Runtime session
+ORT_GRAPH_OPTIMIZATION = "all"   # "disable" | "basic" | "extended" | "all"
+ORT_INTRA_OP_THREADS = 4         # Pi has 4 cores; 0 = let ORT decide
+ORT_INTER_OP_THREADS = 1         # only used in "parallel" execution mode
+ORT_EXECUTION_MODE = "sequential"  # "sequential" | "parallel"
+ORT_ENABLE_CPU_MEM_ARENA = True
+ORT_ALLOW_SPINNING = False       # spinning workers burn CPU the control loop needs
+# CPU-side providers in order of preference; unavailable ones are skipped
+ORT_PROVIDERS = [
+    "XnnpackExecutionProvider",
+    "CPUExecutionProvider",
+]
+ORT_USE_IO_BINDING = True
+ORT_WARMUP_RUNS = 3              # inferences run at startup, before the robot moves
+# Graph-optimized copy of the model saved on first start and loaded on later
+# starts (skips ORT's optimizer); keyed by model file, ORT version and settings
+ORT_OPTIMIZED_CACHE = True
+ORT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "person_follow")
+
+# Tracking between detections (optical flow + constant-velocity Kalman)
+TRACK_SCALE = 0.25         # optical flow runs on a frame downscaled by this factor
+TRACK_MAX_POINTS = 40      # feature points seeded inside the bbox
+TRACK_MIN_POINTS = 6       # fewer surviving points → track lost
+TRACK_MAX_AGE = 1.0        # seconds a track may live without a confirming detection
+TRACK_MAX_MISSES = 2       # consecutive empty detections before dropping the track
 
 # Camera
 CAM_INDEX = 0
 FRAME_WIDTH = 640
 FRAME_HEIGHT = 480
+FRAME_RING_SLOTS = 4     # preallocated capture buffers (latest + being read + held by the detector)
+CAPTURE_DECODE_SCALE = 1  # 2 or 4: decode MJPEG straight to 1/2 or 1/4 size (detector input is ~300 px)
+
+# Shared-memory frame bus: camera_publisher.py writes, "bus:<name>" sources read
+FRAME_BUS_NAME = "pf_camera"
+FRAME_BUS_SLOTS = 6      # a zero-copy reader has slots-1 frame periods before its view is reused
 
 # Robot serial
 SERIAL_PORT = "/dev/ttyUSB0"   # change to your port if needed
 BAUD_RATE = 115200
+SERIAL_WRITE_TIMEOUT = 0.1     # s a write may block before it is dropped (stalled adapter)
+SERIAL_LATE_AFTER = 0.05       # s from command to wire before it counts as late
+SERIAL_HEARTBEAT_HZ = 5.0      # resend current wheel speeds at this rate when idle (0 = off)
+COMMAND_WATCHDOG = 0.5         # s without a fresh command from the loop → wheels stopped (0 = off)
+SERIAL_FEEDBACK = False        # read firmware acks / telemetry (robot/feedback.py); main.py --feedback
+SERIAL_ACK_TIMEOUT = 0.5       # s before an unacked packet counts as lost
 
 # Movement parameters (tweak on real robot)
 BASE_SPEED = 16          # forward speed when following
@@ -29,6 +93,25 @@ SEARCH_SPIN_SPEED = 12   # speed when spinning to search for person
 # "Memory" when person is briefly lost
 MEMORY_SECONDS = 0.8     # keep moving based on last seen zone for this many seconds
 
+# Web stream (app_mssd.py)
+STREAM_JPEG_QUALITY = 80       # default JPEG quality, ?quality= overrides per client
+STREAM_MIN_WIDTH = 160         # px; smallest width a client (or adaptive mode) can get
+STREAM_ADAPT_WINDOW = 2.0      # s between adaptive quality decisions
+STREAM_ADAPT_DROP_RATIO = 0.3  # fraction of frames skipped in a window → step quality down
+STREAM_ADAPT_MAX_WRITE = 0.05  # s a single frame write may block before the client counts as behind
+
+# Telemetry
+METRICS_ENABLED = True
+METRICS_HOST = "0.0.0.0"
+METRICS_PORT = 8088            # GET /metrics (text) or /metrics.json; 0 disables the endpoint
+METRICS_SUMMARY_PERIOD = 5.0   # s between compact [METRICS] lines (needs DEBUG_PRINT)
+
 # Debug options
 DEBUG_PRINT = True
 DEBUG_DRAW = False       # True if you connect a monitor and want OpenCV windows
+
+# Built-in debug stream in main.py (headless alternative to DEBUG_DRAW):
+# the web viewer on this port, fed from the control loop's own frames
+DEBUG_STREAM_HOST = "0.0.0.0"
+DEBUG_STREAM_PORT = 0    # e.g. 5001; 0 = off (main.py --stream-port overrides)
+DEBUG_STREAM_FPS = 10    # frames/s handed to the stream, only while a viewer is connected
@@ -1,45 +1,171 @@
 # file: detection/detection.py
 
-import cv2
+from dataclasses import dataclass
+
 import numpy as np
-import onnxruntime as ort
 
 from config.constants import (
     ONNX_MODEL_PATH,
+    ONNX_MODEL_PRECISION,
     CONFIDENCE_THRESHOLD,
+    NMS_IOU_THRESHOLD,
+    NMS_CANDIDATE_SIZE,
+    ORT_USE_IO_BINDING,
+    ORT_WARMUP_RUNS,
+    FRAME_WIDTH,
+    FRAME_HEIGHT,
+)
+from detection.preprocess import Preprocessor
+from detection.zones import classify_zone
+from telemetry.metrics import METRICS
+from detection.session import (
+    create_session,
+    find_output,
+    model_precision,
+    resolve_model_path,
+    InferenceEngine,
 )
 
 # Pascal VOC PERSON = index 15
 PERSON_CLASS_ID = 15
 
-# MobileNet-SSD normalization constants
-SSD_IMAGE_MEAN = np.array([127, 127, 127], dtype=np.float32)
-SSD_IMAGE_STD = 128.0
+
+# ============================================================
+# NMS — greedy, vectorized over the remaining candidates
+# ============================================================
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Greedy non-maximum suppression.
+    boxes: [K, 4] (x1, y1, x2, y2), scores: [K].
+    Returns indices of the kept boxes, highest score first.
+    """
+    order = np.argsort(-scores, kind="stable")
+    if order.size <= 1:
+        return order
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.maximum(0.0, x2 - x1) * np.maximum(0.0, y2 - y1)
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        if rest.size == 0:
+            break
+
+        # IoU of the current best box against every remaining one
+        iw = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        ih = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = iw * ih
+        union = areas[i] + areas[rest] - inter
+        iou = inter / np.maximum(union, 1e-9)
+
+        order = rest[iou <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.intp)
+
+
+# ============================================================
+# RESULT — every person in the frame, array backed
+# ============================================================
+@dataclass
+class Detections:
+    """
+    All person detections for one frame, sorted by confidence.
+      boxes  : [K, 4] int32 (x1, y1, x2, y2) in frame pixels
+      scores : [K] float32 person confidence
+    """
+    boxes: np.ndarray
+    scores: np.ndarray
+    frame_width: int
+
+    def __len__(self) -> int:
+        return int(self.scores.shape[0])
+
+    @classmethod
+    def empty(cls, frame_width: int) -> "Detections":
+        return cls(
+            boxes=np.zeros((0, 4), dtype=np.int32),
+            scores=np.zeros((0,), dtype=np.float32),
+            frame_width=frame_width,
+        )
+
+    def best(self) -> dict:
+        """
+        Single-best person in the legacy detection dict format.
+        """
+        if len(self) == 0:
+            return {
+                "found": False,
+                "zone": None,
+                "bbox": None,
+                "conf": 0.0,
+            }
+
+        bbox = tuple(int(v) for v in self.boxes[0])
+        return {
+            "found": True,
+            "zone": classify_zone(bbox, self.frame_width),
+            "bbox": bbox,
+            "conf": float(self.scores[0]),
+        }
 
 
 class PersonDetector:
     def __init__(self, model_path: str = ONNX_MODEL_PATH,
-                 conf_threshold: float = CONFIDENCE_THRESHOLD):
+                 precision: str = ONNX_MODEL_PRECISION,
+                 conf_threshold: float = CONFIDENCE_THRESHOLD,
+                 iou_threshold: float = NMS_IOU_THRESHOLD,
+                 candidate_size: int = NMS_CANDIDATE_SIZE,
+                 use_io_binding: bool = ORT_USE_IO_BINDING,
+                 warmup_runs: int = ORT_WARMUP_RUNS):
         self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.candidate_size = candidate_size
 
-        # Load ONNX MobileNet-SSD
-        self.session = ort.InferenceSession(
-            model_path,
-            providers=["CPUExecutionProvider"],
-        )
+        # Load ONNX MobileNet-SSD (options come from config ORT_*).
+        # FP32 and INT8 (QDQ / QOperator) artifacts share the same float I/O.
+        self.model_path = resolve_model_path(model_path, precision)
+        self.session = create_session(self.model_path)
 
         # Input tensor metadata
         meta = self.session.get_inputs()[0]
         self.input_name = meta.name
-        _, self.ch, self.in_h, self.in_w = meta.shape  # expected (1, 3, 300, 300)
+        # Fused graphs take the letterboxed BGR frame as uint8 (1, 300, 300, 3);
+        # plain exports take the normalized float tensor (1, 3, 300, 300).
+        self.fused_preprocess = meta.type == "tensor(uint8)"
+        if self.fused_preprocess:
+            _, self.in_h, self.in_w, self.ch = meta.shape
+        else:
+            _, self.ch, self.in_h, self.in_w = meta.shape
 
         # Outputs: scores [1, N, 21], boxes [1, N, 4]
-        outs = self.session.get_outputs()
-        self.output_scores = outs[0].name
-        self.output_boxes = outs[1].name
+        self.output_scores = find_output(self.session, "scores", 0)
+        self.output_boxes = find_output(self.session, "boxes", 1)
+
+        self.precision = model_precision(self.session)
+        print(f"✓ ONNX loaded: {self.model_path} ({self.precision})")
+        if self.fused_preprocess:
+            print(f"Input shape: HWC uint8 = ({self.in_h}, {self.in_w}, {self.ch}) [fused preprocess]")
+        else:
+            print(f"Input shape: CHW = ({self.ch}, {self.in_h}, {self.in_w})")
+        print(f"Providers: {self.session.get_providers()}")
+
+        # Reusable, contiguous input buffers
+        self.preprocessor = Preprocessor(self.in_h, self.in_w, fused=self.fused_preprocess)
+
+        # Input/outputs bound once to fixed buffers
+        self.engine = InferenceEngine(
+            self.session,
+            self.preprocessor.blob,
+            [self.output_scores, self.output_boxes],
+            use_io_binding=use_io_binding,
+        )
 
-        print(f"✓ ONNX loaded: {model_path}")
-        print(f"Input shape: CHW = ({self.ch}, {self.in_h}, {self.in_w})")
+        # what the blob holds, for infer()
+        self._roi = None
+        self._frame_width = self.in_w
 
         # cache for bbox restoration
         self.last_scale = 1.0
@@ -48,6 +174,22 @@ class PersonDetector:
         self.last_W = self.in_w
         self.last_H = self.in_h
 
+        self.warmup(warmup_runs)
+
+    def warmup(self, runs: int, frame_size=(FRAME_WIDTH, FRAME_HEIGHT)):
+        """
+        Run a few inferences on a blank camera-sized frame so the first
+        real frame doesn't pay for lazy initialization.
+        """
+        if runs <= 0:
+            return
+
+        W, H = frame_size
+        blank = np.zeros((H, W, 3), dtype=np.uint8)
+        self.preprocess(blank)
+        self.engine.warmup(runs)
+        print(f"✓ Warmup done ({runs} runs)")
+
     # ============================================================
     # PREPROCESS — letterbox + normalization (SSD style)
     # ============================================================
@@ -55,37 +197,18 @@ class PersonDetector:
         """
         Resize while preserving aspect ratio, pad into 300×300,
         then normalize like the original PyTorch SSD predictor.
+        Writes into the preprocessor's reusable input buffer
+        (normalization is skipped when the graph does it).
         """
-        H, W = frame.shape[:2]
-
-        # Scale so that the LONG side fits 300 (no overflow)
-        long_side = max(H, W)
-        scale = self.in_h / float(long_side)
-
-        new_w = int(W * scale)
-        new_h = int(H * scale)
-
-        # Resize original frame
-        resized = cv2.resize(frame, (new_w, new_h))
-        resized = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB).astype(np.float32)
-
-        # Pad into 300×300 (top-left aligned)
-        canvas = np.zeros((self.in_h, self.in_w, 3), dtype=np.float32)
-        canvas[:new_h, :new_w] = resized
-
-        # SSD normalization
-        canvas = (canvas - SSD_IMAGE_MEAN) / SSD_IMAGE_STD
-
-        # HWC → CHW, add batch
-        chw = np.transpose(canvas, (2, 0, 1))
-        blob = np.expand_dims(chw, axis=0)
+        blob = self.preprocessor(frame)
 
         # Cache for restoring coordinates
-        self.last_scale = scale
-        self.last_new_w = new_w
-        self.last_new_h = new_h
-        self.last_W = W
-        self.last_H = H
+        geometry = self.preprocessor.geometry
+        self.last_scale = geometry.scale
+        self.last_new_w = geometry.new_w
+        self.last_new_h = geometry.new_h
+        self.last_W = geometry.src_w
+        self.last_H = geometry.src_h
 
         return blob
 
@@ -120,61 +243,108 @@ class PersonDetector:
 
         return int(x1), int(y1), int(x2), int(y2)
 
+    def restore_bboxes(self, boxes: np.ndarray) -> np.ndarray:
+        """
+        Vectorized restore_bbox for a [K, 4] array of normalized boxes.
+        Returns float32 [K, 4] frame coordinates, clipped to the frame.
+        """
+        sx = self.last_new_w / self.last_scale
+        sy = self.last_new_h / self.last_scale
+        out = boxes * np.array([sx, sy, sx, sy], dtype=np.float32)
+        np.clip(
+            out,
+            0,
+            np.array([self.last_W, self.last_H, self.last_W, self.last_H], dtype=np.float32),
+            out=out,
+        )
+        return out
+
+    # ============================================================
+    # POSTPROCESS — threshold, restore, NMS (all vectorized)
+    # ============================================================
+    def postprocess(self, scores: np.ndarray, boxes: np.ndarray) -> Detections:
+        """
+        scores: [N, num_classes], boxes: [N, 4] normalized.
+        Uses the letterbox geometry cached by the last preprocess().
+        """
+        person = scores[:, PERSON_CLASS_ID]
+        idx = np.flatnonzero(person >= self.conf_threshold)
+        if idx.size == 0:
+            return Detections.empty(self.last_W)
+
+        conf = person[idx]
+
+        # Only the strongest candidates go through NMS
+        if idx.size > self.candidate_size:
+            top = np.argpartition(-conf, self.candidate_size - 1)[:self.candidate_size]
+            idx = idx[top]
+            conf = conf[top]
+
+        restored = self.restore_bboxes(boxes[idx])
+        keep = nms(restored, conf, self.iou_threshold)
+
+        return Detections(
+            boxes=restored[keep].astype(np.int32),
+            scores=conf[keep].astype(np.float32),
+            frame_width=self.last_W,
+        )
+
     # ============================================================
-    # ZONE DECISION — based on overlap with left/center/right
+    # MAIN DETECTION API
     # ============================================================
-    @staticmethod
-    def _overlap_1d(a0: int, a1: int, b0: int, b1: int) -> int:
+    def detect_all(self, frame: np.ndarray, roi=None) -> Detections:
         """
-        1D overlap length between segment [a0, a1] and [b0, b1].
+        Run ONNX MobileNet-SSD on a single frame and return every
+        person found, after NMS, sorted by confidence.
+
+        roi: optional (x0, y0, x1, y1) crop. Only that region is
+        letterboxed into the model input (higher effective resolution),
+        and boxes are mapped back into full-frame coordinates.
+
+        Same as prepare(frame, roi) followed by infer().
         """
-        left = max(a0, b0)
-        right = min(a1, b1)
-        return max(0, right - left)
+        self.prepare(frame, roi)
+        return self.infer()
 
-    def _classify_zone(self, bbox, frame_width: int) -> str:
+    def prepare(self, frame: np.ndarray, roi=None):
         """
-        Classify LEFT / CENTER / RIGHT using overlap between the
-        bounding box and each zone.
-        Zones:
-           LEFT   : [0, 0.35W)
-           CENTER : [0.35W, 0.65W)
-           RIGHT  : [0.65W, W)
+        First half of detect_all(): letterbox the frame (or its roi)
+        into the input blob. The frame is not read again afterwards.
         """
-        x1, _, x2, _ = bbox
-        box_w = max(1, x2 - x1)
+        self._roi = roi
+        self._frame_width = frame.shape[1]
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            frame = frame[y0:y1, x0:x1]
 
-        # Define zones
-        left_end = int(frame_width * 0.35)
-        right_start = int(frame_width * 0.65)
+        with METRICS.span("preprocess"):
+            self.preprocess(frame)
 
-        left_range = (0, left_end)
-        center_range = (left_end, right_start)
-        right_range = (right_start, frame_width)
+    def infer(self) -> Detections:
+        """
+        Second half of detect_all(): inference and postprocessing on
+        the blob the last prepare() filled.
+        """
+        # Run ONNX inference (reads the preprocessor's blob in place)
+        with METRICS.span("inference"):
+            scores, boxes = self.engine.run()
 
-        # Compute overlaps
-        ol_left = self._overlap_1d(x1, x2, *left_range)
-        ol_center = self._overlap_1d(x1, x2, *center_range)
-        ol_right = self._overlap_1d(x1, x2, *right_range)
+        scores = scores[0]  # [N, num_classes]
+        boxes = boxes[0]    # [N, 4]
 
-        overlaps = {
-            "LEFT": ol_left,
-            "CENTER": ol_center,
-            "RIGHT": ol_right,
-        }
+        with METRICS.span("postprocess"):
+            detections = self.postprocess(scores, boxes)
 
-        # If overlaps are all tiny (e.g. detection way out of frame), default to CENTER
-        max_ol = max(overlaps.values())
-        if max_ol < box_w * 0.1:  # very little overlap anywhere
-            return "CENTER"
+        # Model health: best person score, exported as a gauge
+        if METRICS.enabled:
+            METRICS.set_gauge("detector.max_person_conf", float(scores[:, PERSON_CLASS_ID].max()))
 
-        # Pick zone with largest overlap
-        zone = max(overlaps.items(), key=lambda kv: kv[1])[0]
-        return zone
+        if self._roi is not None:
+            x0, y0, _, _ = self._roi
+            detections.boxes += np.array([x0, y0, x0, y0], dtype=np.int32)
+            detections.frame_width = self._frame_width
+        return detections
 
-    # ============================================================
-    # MAIN DETECTION API
-    # ============================================================
     def detect(self, frame: np.ndarray, zones=None) -> dict:
         """
         Run ONNX MobileNet-SSD on a single frame and return:
@@ -185,52 +355,4 @@ class PersonDetector:
             "conf": float          # best person confidence
           }
         """
-        blob = self.preprocess(frame)
-
-        # Run ONNX inference
-        scores, boxes = self.session.run(
-            [self.output_scores, self.output_boxes],
-            {self.input_name: blob},
-        )
-
-        scores = scores[0]  # [N, num_classes]
-        boxes = boxes[0]    # [N, 4]
-
-        # Debug: check model health
-        try:
-            print("Max class confidence:", float(np.max(scores)))
-        except Exception:
-            pass
-
-        best_conf = 0.0
-        best_bbox = None
-
-        # Pick the single best PERSON box
-        num_priors = scores.shape[0]
-        for i in range(num_priors):
-            conf = float(scores[i][PERSON_CLASS_ID])
-            if conf < self.conf_threshold:
-                continue
-
-            if conf > best_conf:
-                best_conf = conf
-                best_bbox = self.restore_bbox(boxes[i])
-
-        if best_bbox is None:
-            return {
-                "found": False,
-                "zone": None,
-                "bbox": None,
-                "conf": 0.0,
-            }
-
-        # Decide LEFT / CENTER / RIGHT using overlap
-        frame_w = frame.shape[1]
-        zone = self._classify_zone(best_bbox, frame_w)
-
-        return {
-            "found": True,
-            "zone": zone,
-            "bbox": best_bbox,
-            "conf": best_conf,
-        }
+        return self.detect_all(frame).best()
@@ -0,0 +1,135 @@
+# file: detection/preprocess.py
+
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+# MobileNet-SSD normalization constants
+SSD_IMAGE_MEAN = 127.0
+SSD_IMAGE_STD = 128.0
+
+# Max number of input resolutions whose buffers we keep around
+GEOMETRY_CACHE_SIZE = 8
+
+
+@dataclass(frozen=True)
+class LetterboxGeometry:
+    """
+    How a W×H source frame maps into the model input:
+    resized to new_w×new_h by `scale`, top-left aligned, rest padded.
+    """
+    src_w: int
+    src_h: int
+    new_w: int
+    new_h: int
+    scale: float
+
+
+class _GeometryBuffers:
+    """
+    Per-resolution state: the geometry, the uint8 resize target and
+    (src, dst) channel views used to scatter BGR HWC into RGB CHW.
+    For fused graphs the resize target is the input blob itself.
+    """
+
+    def __init__(self, geometry: LetterboxGeometry, blob: np.ndarray, fused: bool):
+        self.geometry = geometry
+
+        if fused:
+            self.resized = blob[0, :geometry.new_h, :geometry.new_w]
+            self.planes = []
+            return
+
+        self.resized = np.empty((geometry.new_h, geometry.new_w, 3), dtype=np.uint8)
+
+        # BGR → RGB by reading source channel 2 - c into plane c
+        self.planes = [
+            (self.resized[:, :, 2 - c], blob[0, c, :geometry.new_h, :geometry.new_w])
+            for c in range(3)
+        ]
+
+
+class Preprocessor:
+    """
+    Letterbox + SSD normalization into a preallocated, contiguous
+    NCHW float32 buffer.
+
+    With fused=True (model exported with convert_to_onnx.py
+    --fused-preprocess) the graph does BGR→RGB, normalization and the
+    transpose itself, so the blob is the letterboxed BGR frame as a
+    (1, H, W, 3) uint8 tensor and the resize writes straight into it.
+
+    The returned blob is owned by the preprocessor and is overwritten
+    on the next call — consume it (session.run) before preprocessing
+    another frame.
+    """
+
+    def __init__(self, in_h: int, in_w: int,
+                 mean: float = SSD_IMAGE_MEAN,
+                 std: float = SSD_IMAGE_STD,
+                 fused: bool = False):
+        self.in_h = in_h
+        self.in_w = in_w
+        self.fused = fused
+
+        # (x - mean) / std  ==  x * inv_std - mean * inv_std  (exact for std = 128)
+        self._inv_std = np.float32(1.0 / std)
+        self._offset = np.float32(mean / std)
+
+        if fused:
+            self._pad_value = 0
+            self.blob = np.empty((1, in_h, in_w, 3), dtype=np.uint8)
+        else:
+            self._pad_value = np.float32(-mean / std)   # normalized value of a black pixel
+            self.blob = np.empty((1, 3, in_h, in_w), dtype=np.float32)
+        self.blob.fill(self._pad_value)
+
+        self._cache = OrderedDict()   # (H, W) → _GeometryBuffers
+        self._active_key = None
+        self.geometry = None
+
+    def _buffers_for(self, H: int, W: int) -> _GeometryBuffers:
+        key = (H, W)
+        bufs = self._cache.get(key)
+        if bufs is not None:
+            self._cache.move_to_end(key)
+            return bufs
+
+        # Scale so that the LONG side fits the input (no overflow)
+        long_side = max(H, W)
+        scale = self.in_h / float(long_side)
+        geometry = LetterboxGeometry(
+            src_w=W,
+            src_h=H,
+            new_w=int(W * scale),
+            new_h=int(H * scale),
+            scale=scale,
+        )
+
+        bufs = _GeometryBuffers(geometry, self.blob, self.fused)
+        self._cache[key] = bufs
+        if len(self._cache) > GEOMETRY_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return bufs
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        H, W = frame.shape[:2]
+        bufs = self._buffers_for(H, W)
+        geometry = bufs.geometry
+
+        # Padding only needs resetting when the letterboxed area changes
+        key = (H, W)
+        if key != self._active_key:
+            self.blob.fill(self._pad_value)
+            self._active_key = key
+
+        cv2.resize(frame, (geometry.new_w, geometry.new_h), dst=bufs.resized)
+
+        for src, dst in bufs.planes:
+            np.multiply(src, self._inv_std, out=dst)
+            np.subtract(dst, self._offset, out=dst)
+
+        self.geometry = geometry
+        return self.blob
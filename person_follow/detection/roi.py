@@ -0,0 +1,85 @@
+# file: detection/roi.py
+
+from config.constants import (
+    ROI_ENABLED,
+    ROI_PADDING,
+    ROI_MIN_SIZE,
+    ROI_MAX_AREA,
+    ROI_FULL_SCAN_PERIOD,
+)
+
+# ROI sides are rounded up to this many pixels so the preprocessor's
+# per-resolution cache only ever sees a handful of sizes.
+_ROI_STEP = 32
+
+
+class RoiPlanner:
+    """
+    Chooses what the next detection looks at: a padded square crop
+    around the tracked person, or the full frame.
+
+    A distant person letterboxed from 640×480 to 300×300 is only a few
+    dozen pixels tall; cropping around them keeps more of their pixels
+    at the same inference cost.
+
+    Full-frame scans happen when there is no track, when the last ROI
+    detection came back empty, and every ROI_FULL_SCAN_PERIOD seconds
+    so new or re-appearing people are still found.
+    """
+
+    def __init__(self,
+                 enabled: bool = ROI_ENABLED,
+                 padding: float = ROI_PADDING,
+                 min_size: int = ROI_MIN_SIZE,
+                 max_area: float = ROI_MAX_AREA,
+                 full_scan_period: float = ROI_FULL_SCAN_PERIOD):
+        self.enabled = enabled
+        self.padding = padding
+        self.min_size = min_size
+        self.max_area = max_area
+        self.full_scan_period = full_scan_period
+
+        self.last_full_scan = 0.0
+        self.force_full = True
+
+    def plan(self, now: float, detection: dict, frame_shape):
+        """
+        detection: the tracker's current dict.
+        Returns (x0, y0, x1, y1) or None for a full-frame scan.
+        """
+        if not self.enabled or self.force_full:
+            return None
+        if not detection.get("found", False) or not detection.get("bbox"):
+            return None
+        if now - self.last_full_scan >= self.full_scan_period:
+            return None
+
+        H, W = frame_shape[:2]
+        x1, y1, x2, y2 = detection["bbox"]
+        bw, bh = max(1, x2 - x1), max(1, y2 - y1)
+
+        # Square crop: the model input is square, so use all of it
+        side = max(bw, bh) * (1.0 + 2.0 * self.padding)
+        side = max(side, self.min_size)
+        side = int(-(-side // _ROI_STEP) * _ROI_STEP)
+        side_w, side_h = min(side, W), min(side, H)
+
+        if side_w * side_h > self.max_area * W * H:
+            return None
+
+        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+        x0 = int(min(max(0, cx - side_w // 2), W - side_w))
+        y0 = int(min(max(0, cy - side_h // 2), H - side_h))
+        return x0, y0, x0 + side_w, y0 + side_h
+
+    def submitted(self, now: float, roi):
+        if roi is None:
+            self.last_full_scan = now
+            self.force_full = False
+
+    def record_result(self, result):
+        """
+        An empty ROI detection means the person left the crop.
+        """
+        if result.roi is not None and not result.detection.get("found", False):
+            self.force_full = True
@@ -0,0 +1,135 @@
+# file: detection/scheduler.py
+
+from collections import deque
+
+import numpy as np
+
+from config.constants import (
+    CONTROL_LOOP_HZ,
+    DETECT_MIN_INTERVAL,
+    DETECT_MAX_INTERVAL,
+    DETECT_MAX_DUTY,
+    SCHED_CONF_REF,
+    SCHED_FAST_MOTION,
+    SCHED_BOUNDARY_MARGIN,
+    TRACK_MAX_AGE,
+    ZONE_LEFT_END,
+    ZONE_RIGHT_START,
+)
+
+# Loop-rate protection: how fast the detection interval backs off / recovers
+_BACKOFF_STEP = 1.25
+_BACKOFF_MAX = 4.0
+_RECOVER_STEP = 0.95
+
+# The interval never reaches the track's lifetime: the next detection
+# (plus its inference latency) must land before the track expires
+_TRACK_AGE_MARGIN = 0.5
+
+
+class DetectionScheduler:
+    """
+    Decides when the next SSD inference should start.
+
+    The interval between detections shrinks toward DETECT_MIN_INTERVAL
+    as the steering decision gets uncertain:
+      - no track, or low tracker confidence
+      - fast bbox motion (from the tracker's velocity estimate)
+      - bbox centre close to a LEFT / CENTER / RIGHT boundary
+    and grows toward DETECT_MAX_INTERVAL when the track is solid.
+
+    Two floors keep the control loop fed:
+      - rolling inference latency / DETECT_MAX_DUTY
+      - a backoff multiplier that grows while the loop's own work per
+        iteration doesn't fit in 1 / CONTROL_LOOP_HZ
+
+    The loop waits for camera frames, so its rate says nothing about
+    load: a 25 fps camera is not a reason to detect less. Only the
+    time an iteration spends working counts. The interval is capped
+    well below TRACK_MAX_AGE so a solid track is re-confirmed in time.
+    """
+
+    def __init__(self,
+                 min_interval: float = DETECT_MIN_INTERVAL,
+                 max_interval: float = DETECT_MAX_INTERVAL,
+                 max_duty: float = DETECT_MAX_DUTY,
+                 target_loop_hz: float = CONTROL_LOOP_HZ,
+                 track_max_age: float = TRACK_MAX_AGE,
+                 latency_window: int = 20):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_duty = max_duty
+        self.target_loop_hz = target_loop_hz
+        self.interval_cap = track_max_age * _TRACK_AGE_MARGIN
+
+        self.latencies = deque(maxlen=latency_window)
+        self.last_submit = 0.0
+        self.loop_busy = 0.0        # s of work per iteration (EMA)
+        self.backoff = 1.0
+
+        self.interval = min_interval
+        self.uncertainty = 1.0
+
+    # ------------------------------------------------------------
+    # MEASUREMENTS
+    # ------------------------------------------------------------
+    def record_latency(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def record_loop(self, busy: float):
+        """
+        Call once per control-loop iteration with the seconds it spent
+        working (not waiting for the next frame).
+        """
+        # EMA over roughly the last 10 iterations
+        self.loop_busy += 0.1 * (busy - self.loop_busy)
+
+        if self.loop_busy > 0.9 / self.target_loop_hz:
+            self.backoff = min(_BACKOFF_MAX, self.backoff * _BACKOFF_STEP)
+        else:
+            self.backoff = max(1.0, self.backoff * _RECOVER_STEP)
+
+    @property
+    def latency(self) -> float:
+        if not self.latencies:
+            return 0.0
+        return float(np.median(self.latencies))
+
+    # ------------------------------------------------------------
+    # DECISION
+    # ------------------------------------------------------------
+    def _uncertainty(self, detection: dict, velocity, frame_width: int) -> float:
+        if not detection.get("found", False) or not detection.get("bbox"):
+            return 1.0
+
+        # Confidence of the (possibly tracked) box
+        u_conf = 1.0 - min(1.0, detection.get("conf", 0.0) / SCHED_CONF_REF)
+
+        # Horizontal motion drives steering changes
+        speed = abs(velocity[0]) / max(1, frame_width)
+        u_motion = min(1.0, speed / SCHED_FAST_MOTION)
+
+        # Near a zone boundary a few pixels flip the command
+        x1, _, x2, _ = detection["bbox"]
+        cx = (x1 + x2) / 2.0 / max(1, frame_width)
+        dist = min(abs(cx - ZONE_LEFT_END), abs(cx - ZONE_RIGHT_START))
+        u_boundary = 1.0 - min(1.0, dist / SCHED_BOUNDARY_MARGIN)
+
+        return max(u_conf, u_motion, u_boundary)
+
+    def should_detect(self, now: float, detection: dict, velocity=(0.0, 0.0),
+                      frame_width: int = 1) -> bool:
+        """
+        detection: the tracker's current dict, velocity: its (vx, vy) in px/s.
+        Call submit() once the frame has actually been handed to the worker.
+        """
+        self.uncertainty = self._uncertainty(detection, velocity, frame_width)
+
+        interval = self.max_interval - self.uncertainty * (self.max_interval - self.min_interval)
+        interval = max(interval, self.latency / self.max_duty)
+        self.interval = min(interval * self.backoff, self.interval_cap)
+
+        return now - self.last_submit >= self.interval
+
+    def submit(self, now: float):
+        self.last_submit = now
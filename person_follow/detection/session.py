@@ -0,0 +1,270 @@
+# file: detection/session.py
+
+import hashlib
+import os
+import platform
+
+import numpy as np
+import onnxruntime as ort
+
+from config.constants import (
+    ORT_GRAPH_OPTIMIZATION,
+    ORT_INTRA_OP_THREADS,
+    ORT_INTER_OP_THREADS,
+    ORT_EXECUTION_MODE,
+    ORT_ENABLE_CPU_MEM_ARENA,
+    ORT_ALLOW_SPINNING,
+    ORT_PROVIDERS,
+    ORT_OPTIMIZED_CACHE,
+    ORT_CACHE_DIR,
+)
+
+_GRAPH_OPT_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+_EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+# ONNX tensor element type → numpy dtype
+_ORT_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(uint8)": np.uint8,
+    "tensor(int8)": np.int8,
+}
+
+
+def ort_dtype(type_str: str):
+    """
+    Numpy dtype for an ONNX Runtime type string like "tensor(float)".
+    """
+    if type_str not in _ORT_DTYPES:
+        raise ValueError(f"Unsupported ONNX tensor type: {type_str}")
+    return _ORT_DTYPES[type_str]
+
+
+# ============================================================
+# MODEL ARTIFACTS
+# ============================================================
+def resolve_model_path(model_path: str, precision: str = "fp32") -> str:
+    """
+    Map the FP32 model path to the artifact for `precision`.
+    "int8" → <name>.int8.onnx if it exists, otherwise the FP32 model.
+    """
+    if precision == "fp32":
+        return model_path
+    if precision != "int8":
+        raise ValueError(f"Unknown model precision: {precision}")
+
+    root, ext = os.path.splitext(model_path)
+    if root.endswith(".int8"):
+        return model_path
+
+    int8_path = f"{root}.int8{ext}"
+    if os.path.exists(int8_path):
+        return int8_path
+
+    print(f"⚠️  INT8 model not found ({int8_path}) — using FP32")
+    return model_path
+
+
+def model_precision(session: ort.InferenceSession) -> str:
+    """
+    Precision tag written by convert_to_onnx.py --quantize ("fp32" if untagged).
+    """
+    meta = session.get_modelmeta().custom_metadata_map
+    return meta.get("precision", "fp32")
+
+
+def find_output(session: ort.InferenceSession, name: str, fallback_index: int) -> str:
+    """
+    Output name by exported name, falling back to position for models
+    whose outputs were renamed (e.g. by quantization tooling).
+    """
+    names = [o.name for o in session.get_outputs()]
+    return name if name in names else names[fallback_index]
+
+
+# ============================================================
+# SESSION FACTORY
+# ============================================================
+def select_providers(preferred=ORT_PROVIDERS,
+                     intra_op_threads: int = ORT_INTRA_OP_THREADS):
+    """
+    Keep the preferred providers this onnxruntime build actually has,
+    always ending with CPUExecutionProvider as the fallback.
+    Returns a list usable as InferenceSession(providers=...).
+    """
+    available = set(ort.get_available_providers())
+    providers = []
+
+    for name in preferred:
+        if name not in available or name in providers:
+            continue
+        if name == "XnnpackExecutionProvider":
+            # XNNPACK keeps its own thread pool
+            providers.append((name, {"intra_op_num_threads": max(1, intra_op_threads)}))
+        else:
+            providers.append(name)
+
+    if "CPUExecutionProvider" not in [p if isinstance(p, str) else p[0] for p in providers]:
+        providers.append("CPUExecutionProvider")
+
+    return providers
+
+
+def create_session_options(graph_optimization: str = ORT_GRAPH_OPTIMIZATION,
+                           intra_op_threads: int = ORT_INTRA_OP_THREADS,
+                           inter_op_threads: int = ORT_INTER_OP_THREADS,
+                           execution_mode: str = ORT_EXECUTION_MODE,
+                           enable_cpu_mem_arena: bool = ORT_ENABLE_CPU_MEM_ARENA,
+                           allow_spinning: bool = ORT_ALLOW_SPINNING) -> ort.SessionOptions:
+    so = ort.SessionOptions()
+    so.graph_optimization_level = _GRAPH_OPT_LEVELS[graph_optimization]
+    so.execution_mode = _EXECUTION_MODES[execution_mode]
+    so.intra_op_num_threads = intra_op_threads
+    so.inter_op_num_threads = inter_op_threads
+    so.enable_cpu_mem_arena = enable_cpu_mem_arena
+    so.add_session_config_entry(
+        "session.intra_op.allow_spinning", "1" if allow_spinning else "0"
+    )
+    so.add_session_config_entry(
+        "session.inter_op.allow_spinning", "1" if allow_spinning else "0"
+    )
+    return so
+
+
+def optimized_model_path(model_path: str, graph_optimization: str, providers,
+                         cache_dir: str = ORT_CACHE_DIR) -> str:
+    """
+    Cache file for the graph-optimized copy of `model_path`. The name
+    changes with the model file, ORT version, optimization level,
+    providers and CPU architecture, so a stale cache is never loaded.
+    """
+    st = os.stat(model_path)
+    key = "|".join(str(v) for v in (
+        os.path.abspath(model_path), st.st_size, st.st_mtime_ns, ort.__version__,
+        graph_optimization, providers, platform.machine(),
+    ))
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    root = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(cache_dir, f"{root}.{digest}.opt.onnx")
+
+
+def create_session(model_path: str, use_cache: bool = ORT_OPTIMIZED_CACHE,
+                   **option_overrides) -> ort.InferenceSession:
+    """
+    Build an InferenceSession using the ORT_* settings from config.
+    Keyword arguments override individual create_session_options() values.
+
+    With use_cache the first start saves the optimized graph
+    (SessionOptions.optimized_model_filepath) and later starts load it
+    with graph optimization off, skipping the optimizer passes.
+    """
+    so = create_session_options(**option_overrides)
+    providers = select_providers(
+        intra_op_threads=option_overrides.get("intra_op_threads", ORT_INTRA_OP_THREADS),
+    )
+    level = option_overrides.get("graph_optimization", ORT_GRAPH_OPTIMIZATION)
+    if not use_cache or level == "disable":
+        return ort.InferenceSession(model_path, sess_options=so, providers=providers)
+
+    cached = optimized_model_path(model_path, level, providers)
+    if os.path.exists(cached):
+        so.graph_optimization_level = _GRAPH_OPT_LEVELS["disable"]
+        try:
+            return ort.InferenceSession(cached, sess_options=so, providers=providers)
+        except Exception as e:
+            print(f"⚠️  Optimized model cache unusable ({e}) — rebuilding")
+            os.remove(cached)
+            so = create_session_options(**option_overrides)
+
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        so.optimized_model_filepath = cached
+        return ort.InferenceSession(model_path, sess_options=so, providers=providers)
+    except Exception as e:
+        # e.g. read-only cache dir, or a provider whose nodes can't be serialized
+        print(f"⚠️  Could not cache optimized model ({e})")
+        so = create_session_options(**option_overrides)
+        return ort.InferenceSession(model_path, sess_options=so, providers=providers)
+
+
+# ============================================================
+# ENGINE — IOBinding over fixed input / output buffers
+# ============================================================
+class InferenceEngine:
+    """
+    Runs a single-input session whose input always lives in the same
+    numpy buffer (e.g. Preprocessor.blob).
+
+    With IOBinding the input and the outputs are bound once to
+    preallocated memory, so run() neither copies the input nor
+    allocates outputs. The returned arrays are reused by the next run().
+    """
+
+    def __init__(self, session: ort.InferenceSession, input_buffer: np.ndarray,
+                 output_names, use_io_binding: bool = True):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+        self.input_buffer = input_buffer
+        self.output_names = list(output_names)
+        self.use_io_binding = use_io_binding
+
+        self.outputs = None
+        self._binding = None
+
+        if use_io_binding:
+            self._bind()
+
+    def _output_shapes(self):
+        metas = {o.name: o for o in self.session.get_outputs()}
+        shapes = [metas[name].shape for name in self.output_names]
+        if all(isinstance(d, int) for shape in shapes for d in shape):
+            return shapes
+
+        # Symbolic dims — discover the concrete shapes with one plain run
+        results = self.session.run(self.output_names, {self.input_name: self.input_buffer})
+        return [r.shape for r in results]
+
+    def _bind(self):
+        metas = {o.name: o for o in self.session.get_outputs()}
+        self.outputs = [
+            np.empty(shape, dtype=ort_dtype(metas[name].type))
+            for name, shape in zip(self.output_names, self._output_shapes())
+        ]
+
+        binding = self.session.io_binding()
+        binding.bind_input(
+            self.input_name, "cpu", 0,
+            self.input_buffer.dtype, list(self.input_buffer.shape),
+            self.input_buffer.ctypes.data,
+        )
+        for name, out in zip(self.output_names, self.outputs):
+            binding.bind_output(name, "cpu", 0, out.dtype, list(out.shape), out.ctypes.data)
+
+        self._binding = binding
+
+    def run(self):
+        """
+        Run inference on the current contents of input_buffer.
+        Returns the outputs in output_names order.
+        """
+        if self._binding is None:
+            return self.session.run(self.output_names, {self.input_name: self.input_buffer})
+
+        self.session.run_with_iobinding(self._binding)
+        return self.outputs
+
+    def warmup(self, runs: int):
+        """
+        Pay lazy-init costs (arena growth, kernel selection) up front.
+        """
+        for _ in range(runs):
+            self.run()
@@ -0,0 +1,155 @@
+# file: detection/worker.py
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from detection.detection import PersonDetector, Detections
+from telemetry.metrics import METRICS
+
+
+@dataclass
+class DetectionResult:
+    detection: dict          # single-best dict (PersonDetector.detect format)
+    detections: Detections   # every person in the frame
+    frame_id: int            # id passed to submit()
+    frame_time: float        # when the frame was captured (time.time())
+    done_time: float         # when inference finished (time.time())
+    latency: float           # seconds spent in detect_all()
+    roi: Optional[tuple] = None  # (x0, y0, x1, y1) crop, None for full frame
+
+
+class InferenceWorker:
+    """
+    Runs PersonDetector on a background thread, latest frame wins.
+
+    submit() never blocks: if the worker is still busy, the previously
+    pending frame is replaced (and counted in .dropped). latest() returns
+    the most recent finished result. ONNX Runtime releases the GIL inside
+    session.run, so the control loop keeps running during inference.
+
+    Frames passed to submit() must not be modified afterwards. Pass
+    release= (e.g. FrameRef.release) to be told when the worker is done
+    with the frame, whether it was processed or dropped; that happens as
+    soon as preprocessing has copied it into the input blob. With valid=
+    (FrameRef.valid, for zero-copy bus frames) the frame is checked right
+    then, and skipped if it was overwritten while being read.
+    """
+
+    def __init__(self, detector: PersonDetector):
+        self.detector = detector
+
+        self._cond = threading.Condition()
+        self._pending = None   # (frame, frame_id, frame_time, roi, release, valid)
+        self._result: Optional[DetectionResult] = None
+        self._busy = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def submit(self, frame: np.ndarray, frame_id: int, frame_time: float = None, roi=None,
+               release=None, valid=None):
+        if frame_time is None:
+            frame_time = time.time()
+
+        with self._cond:
+            replaced = self._pending
+            if replaced is not None:
+                self.dropped += 1
+                METRICS.inc("frames.dropped")
+            self._pending = (frame, frame_id, frame_time, roi, release, valid)
+            self.submitted += 1
+            self._cond.notify()
+
+        if replaced is not None and replaced[4] is not None:
+            replaced[4]()
+
+    @property
+    def busy(self) -> bool:
+        """
+        True while a frame is being processed or waiting to be.
+        """
+        with self._cond:
+            return self._busy or self._pending is not None
+
+    def latest(self) -> Optional[DetectionResult]:
+        with self._cond:
+            return self._result
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self.stopped:
+                    self._cond.wait()
+                if self.stopped:
+                    self._release_pending()
+                    return
+                frame, frame_id, frame_time, roi, release, valid = self._pending
+                self._pending = None
+                self._busy = True
+
+            t0 = time.time()
+            try:
+                self.detector.prepare(frame, roi)
+                # inference only reads the blob: the frame can go now
+                intact = valid is None or valid()
+                if release is not None:
+                    release()
+                    release = None
+                detections = self.detector.infer() if intact else None
+            except Exception as e:
+                print("⚠️  Inference failed:", e)
+                with self._cond:
+                    self._busy = False
+                continue
+            finally:
+                if release is not None:
+                    release()
+            t1 = time.time()
+
+            if not intact:
+                METRICS.inc("frames.torn")
+                with self._cond:
+                    self._busy = False
+                continue
+
+            result = DetectionResult(
+                detection=detections.best(),
+                detections=detections,
+                frame_id=frame_id,
+                frame_time=frame_time,
+                done_time=t1,
+                latency=t1 - t0,
+                roi=roi,
+            )
+
+            with self._cond:
+                self._result = result
+                self._busy = False
+                self.completed += 1
+
+    def _release_pending(self):
+        # caller holds self._cond
+        if self._pending is not None and self._pending[4] is not None:
+            self._pending[4]()
+        self._pending = None
+
+    def stop(self):
+        with self._cond:
+            self.stopped = True
+            self._cond.notify_all()
+        try:
+            self.thread.join(timeout=1.0)
+        except Exception:
+            pass
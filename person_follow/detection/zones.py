@@ -0,0 +1,53 @@
+# file: detection/zones.py
+
+from config.constants import ZONE_LEFT_END, ZONE_RIGHT_START
+
+
+def _overlap_1d(a0: int, a1: int, b0: int, b1: int) -> int:
+    """
+    1D overlap length between segment [a0, a1] and [b0, b1].
+    """
+    left = max(a0, b0)
+    right = min(a1, b1)
+    return max(0, right - left)
+
+
+def classify_zone(bbox, frame_width: int) -> str:
+    """
+    Classify LEFT / CENTER / RIGHT using overlap between the
+    bounding box and each zone.
+    Zones:
+       LEFT   : [0, 0.35W)
+       CENTER : [0.35W, 0.65W)
+       RIGHT  : [0.65W, W)
+    """
+    x1, _, x2, _ = bbox
+    box_w = max(1, x2 - x1)
+
+    # Define zones
+    left_end = int(frame_width * ZONE_LEFT_END)
+    right_start = int(frame_width * ZONE_RIGHT_START)
+
+    left_range = (0, left_end)
+    center_range = (left_end, right_start)
+    right_range = (right_start, frame_width)
+
+    # Compute overlaps
+    ol_left = _overlap_1d(x1, x2, *left_range)
+    ol_center = _overlap_1d(x1, x2, *center_range)
+    ol_right = _overlap_1d(x1, x2, *right_range)
+
+    overlaps = {
+        "LEFT": ol_left,
+        "CENTER": ol_center,
+        "RIGHT": ol_right,
+    }
+
+    # If overlaps are all tiny (e.g. detection way out of frame), default to CENTER
+    max_ol = max(overlaps.values())
+    if max_ol < box_w * 0.1:  # very little overlap anywhere
+        return "CENTER"
+
+    # Pick zone with largest overlap
+    zone = max(overlaps.items(), key=lambda kv: kv[1])[0]
+    return zone
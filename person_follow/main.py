@@ -4,27 +4,70 @@
 import os
 os.environ["QT_QPA_PLATFORM"] = "offscreen"   # prevent Qt errors on headless Pi
 
+import argparse
+import signal
+import sys
 import time
+from collections import deque
+from functools import partial
+
 import cv2
+import numpy as np
 
-from robot.auppbot import AUPPBot
 from camera.video_stream import VideoStream
-from detection.detection import PersonDetector
+from camera.sources import SessionRecorder
+from detection.scheduler import DetectionScheduler
+from detection.roi import RoiPlanner
 from decision.decision import PersonFollowerBrain
+from tracking.tracker import PersonTracker
 from actions.actions import apply_motion_command, stop_bot
+from telemetry.metrics import METRICS, MetricsServer
+from startup.orchestrator import Startup
+from streaming.broadcaster import FrameBroadcaster
+from streaming.encoding import frame_meta
+from streaming.page import INDEX_HTML
+from streaming.server import StreamServer
+from streaming.tap import FrameTap
 
 from config.constants import (
     SERIAL_PORT,
     BAUD_RATE,
+    SERIAL_WRITE_TIMEOUT,
+    SERIAL_LATE_AFTER,
+    SERIAL_HEARTBEAT_HZ,
+    COMMAND_WATCHDOG,
+    SERIAL_FEEDBACK,
+    SERIAL_ACK_TIMEOUT,
+    CAM_INDEX,
+    ONNX_MODEL_PATH,
     DEBUG_DRAW,
     DEBUG_PRINT,
+    CAPTURE_DECODE_SCALE,
+    FRAME_RING_SLOTS,
+    TRACK_SCALE,
+    METRICS_HOST,
+    METRICS_PORT,
+    METRICS_SUMMARY_PERIOD,
+    DEBUG_STREAM_HOST,
+    DEBUG_STREAM_PORT,
+)
+
+# Stages shown in the periodic [METRICS] line, in pipeline order
+SUMMARY_STAGES = (
+    "camera.read", "preprocess", "inference", "postprocess",
+    "tracker.update", "brain.update", "serial.write", "loop", "glass_to_command",
+    "serial.rtt", "glass_to_wheel",     # only with firmware acks (--feedback)
 )
 
 
 # ------------------------------------------------------------
 # OPTIONAL: Debug overlay
 # ------------------------------------------------------------
-def draw_debug(frame, detection: dict, cmd_label: str):
+def draw_debug(frame, detection: dict, cmd_label: str, scale: int = 1):
+    """
+    scale: how much larger `frame` is than the frame the detection
+    came from (full-res overlay over a reduced-size decode).
+    """
     h, w = frame.shape[:2]
 
     if detection.get("found", False):
@@ -33,7 +76,7 @@ def draw_debug(frame, detection: dict, cmd_label: str):
         zone = detection.get("zone", "")
 
         if bbox:
-            x1, y1, x2, y2 = bbox
+            x1, y1, x2, y2 = (int(v * scale) for v in bbox)
             cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
             cv2.putText(
                 frame,
@@ -53,79 +96,261 @@ def draw_debug(frame, detection: dict, cmd_label: str):
     return frame
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Person follower runtime")
+    parser.add_argument("--source", default=str(CAM_INDEX),
+                        help="Camera index, bus:<name> (camera_publisher.py), video file, "
+                             "image directory or recorded session (.pfs)")
+    parser.add_argument("--fast", action="store_true",
+                        help="Replay file sources as fast as possible instead of at capture rate")
+    parser.add_argument("--loop", action="store_true", help="Loop file sources")
+    parser.add_argument("--model", default=ONNX_MODEL_PATH, help="ONNX model path")
+    parser.add_argument("--record", default=None,
+                        help="Record the camera to a session file (.pfs) for later replay")
+    parser.add_argument("--decode-scale", type=int, default=CAPTURE_DECODE_SCALE, choices=[1, 2, 4],
+                        help="Decode MJPEG frames at 1/N resolution (camera, .pfs and MJPEG files)")
+    parser.add_argument("--stream-port", type=int, default=DEBUG_STREAM_PORT,
+                        help="Serve the debug overlay as a web stream on this port (0 = off)")
+    parser.add_argument("--serial-port", default=SERIAL_PORT,
+                        help='Robot serial port, or "emulator" for the built-in firmware '
+                             "emulator (robot/emulator.py)")
+    parser.add_argument("--feedback", action="store_true", default=SERIAL_FEEDBACK,
+                        help="Read firmware acks/telemetry: serial round trip and "
+                             "glass-to-wheel latency (the emulator acks too)")
+    return parser.parse_args()
+
+
+# ------------------------------------------------------------
+# STARTUP STEPS — run concurrently, see startup.orchestrator
+# ------------------------------------------------------------
+def connect_robot(port: str, feedback: bool = False):
+    from robot.auppbot import AUPPBot
+    try:
+        # writes run on the bot's own I/O thread, see robot/auppbot.py.
+        # Signal handlers can only be set from the main thread: main()
+        # turns SIGTERM into a normal exit so the finally block stops the bot.
+        bot = AUPPBot(port, BAUD_RATE, auto_safe=True, use_signals=False,
+                      write_timeout=SERIAL_WRITE_TIMEOUT, late_after=SERIAL_LATE_AFTER,
+                      heartbeat_hz=SERIAL_HEARTBEAT_HZ, watchdog=COMMAND_WATCHDOG,
+                      feedback=feedback, ack_timeout=SERIAL_ACK_TIMEOUT)
+        print(f"✓ AUPPBot connected on {port}")
+        return bot
+    except Exception as e:
+        print("⚠️ Robot connection failed — running in dry mode:", e)
+        return None
+
+
+def open_stream(args):
+    # VideoStream grabs the first frame before returning, no settle delay needed
+    recorder = SessionRecorder(args.record) if args.record else None
+    # the debug stream pins up to two more frames (see FrameTap)
+    slots = FRAME_RING_SLOTS + (2 if args.stream_port else 0)
+    stream = VideoStream(args.source, realtime=not args.fast, loop=args.loop, recorder=recorder,
+                         slots=slots, decode_scale=args.decode_scale).start()
+    print("✓ Video stream started" +
+          (f" (decoding at 1/{stream.scale} size)" if stream.scale > 1 else ""))
+    return stream
+
+
+def load_detector(model_path: str):
+    # onnxruntime import, session build (optimized-model cache) and warmup
+    from detection.detection import PersonDetector
+    return PersonDetector(model_path)
+
+
+def start_debug_stream(stream, bot, port: int):
+    """
+    Web viewer fed by the control loop through a FrameTap: the frames and
+    detections it already has, no second camera handle or inference.
+    """
+    tap = FrameTap()
+    broadcaster = FrameBroadcaster(tap.render).start()
+
+    def health():
+        return {"camera_ok": not stream.finished, "robot": bot is not None,
+                "viewers": broadcaster.viewers}
+
+    try:
+        server = StreamServer(broadcaster, INDEX_HTML, health, DEBUG_STREAM_HOST, port).start()
+    except (OSError, RuntimeError) as e:
+        print("⚠️  Debug stream unavailable:", e)
+        broadcaster.stop()
+        return None, None, None
+    print(f"✓ Debug stream on http://{DEBUG_STREAM_HOST}:{port}/")
+    return tap, broadcaster, server
+
+
+def print_run_summary(frames: int, elapsed: float, latencies):
+    if frames == 0 or elapsed <= 0:
+        return
+    print(f"[RUN] {frames} frames in {elapsed:.1f} s → {frames / elapsed:.1f} FPS")
+    if latencies:
+        lat = np.asarray(latencies) * 1000.0
+        print(f"[RUN] glass-to-command ms: p50={np.percentile(lat, 50):.1f} "
+              f"p95={np.percentile(lat, 95):.1f} max={lat.max():.1f}")
+
+
 # ------------------------------------------------------------
 # MAIN LOOP
 # ------------------------------------------------------------
 def main():
+    args = parse_args()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
     bot = None
+    emulator = None
     stream = None
+    worker = None
+    metrics_server = None
+    tap = broadcaster = stream_server = None
+    frame_ref = None
+
+    # End-to-end stats: frame capture → motion command decided
+    run_start = time.time()
+    run_frames = 0
+    glass_to_command = deque(maxlen=10000)
+
+    # Serial link, camera and ONNX session come up in parallel
+    boot = Startup()
+    if args.serial_port == "emulator":
+        from robot.emulator import FirmwareEmulator
+        emulator = FirmwareEmulator(BAUD_RATE, ack=args.feedback,
+                                    telemetry_hz=10 if args.feedback else 0).start()
+    boot.add("serial", connect_robot, emulator.port if emulator else args.serial_port, args.feedback)
+    boot.add("camera", open_stream, args)
+    boot.add("detector", load_detector, args.model)
 
     try:
-        # ------------------ ROBOT INIT ------------------------
-        try:
-            bot = AUPPBot(SERIAL_PORT, BAUD_RATE, auto_safe=True)
-            print(f"✓ AUPPBot connected on {SERIAL_PORT}")
-        except Exception as e:
-            print("⚠️ Robot connection failed — running in dry mode:", e)
-            bot = None
-
-        # ------------------ CAMERA INIT ------------------------
-        stream = VideoStream().start()
-        time.sleep(0.4)
-        print("✓ Video stream started")
+        # ------------------ ROBOT + CAMERA INIT -----------------
+        bot = boot.result("serial")
+        stream = boot.result("camera")
+
+        # ------------------ TELEMETRY ---------------------------
+        if METRICS.enabled and METRICS_PORT:
+            try:
+                metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT).start()
+                print(f"✓ Metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+            except OSError as e:
+                print("⚠️  Metrics endpoint unavailable:", e)
+
+        if args.stream_port:
+            tap, broadcaster, stream_server = start_debug_stream(stream, bot, args.stream_port)
 
         # ------------------ DETECTOR + BRAIN -------------------
-        detector = PersonDetector()
+        detector = boot.result("detector")
+        from detection.worker import InferenceWorker   # needs onnxruntime, loaded by the detector step
+        worker = InferenceWorker(detector).start()
+        # flow resolution stays the same whatever the decode size
+        tracker = PersonTracker(scale=min(1.0, TRACK_SCALE * stream.scale))
+        scheduler = DetectionScheduler()
+        roi_planner = RoiPlanner()
         brain = PersonFollowerBrain()
         print("✅ Person follower optimized runtime started.\n")
 
         # --------------------------------------------------------
         # PERFORMANCE OPTIMIZATION SETTINGS
         # --------------------------------------------------------
-        DETECT_EVERY_N_FRAMES = 3    # ONNX runs every 3 frames → ~3× FPS boost
-        LOOP_SLEEP = 0.01            # keep-alive → prevents robot timeout
-        last_cmd_label = None        # throttle repeated commands
+        last_cmd_label = None        # log / count only command changes
+        last_result_id = None        # frame id of the last detection fed to the brain
         frame_id = 0
+        last_seq = 0                 # sequence number of the last frame processed
 
         # FPS stats
         fps_time = time.time()
         frame_counter = 0
+        summary_time = time.time()
 
         # ----------------------- MAIN LOOP ----------------------
+        run_start = time.time()
         while True:
-            frame = stream.read()
-            if frame is None:
-                time.sleep(0.01)
+            if stream.finished:
+                print("✓ Source finished")
+                break
+
+            # Each frame is processed once; the previous one goes back to the ring
+            if frame_ref is not None:
+                frame_ref.release()
+            frame_ref = stream.wait_next(last_seq, timeout=0.5)
+            if frame_ref is None:
                 continue
+            frame, frame_time, last_seq = frame_ref.image, frame_ref.time, frame_ref.seq
 
+            loop_t0 = time.perf_counter()
             frame_id += 1
+            run_frames += 1
             frame_counter += 1
 
-            # ------------------ DETECTION SKIPPING -------------------
-            if frame_id % DETECT_EVERY_N_FRAMES == 0:
-                detection = detector.detect(frame)
-            else:
-                # fake detection: tells brain "nothing new"
-                detection = {"found": False, "zone": None, "bbox": None, "conf": 0.0}
+            # ------------------ TRACKING ------------------------------
+            # Optical flow carries the last bbox through frames the SSD
+            # hasn't seen yet; a fresh detection re-anchors the track.
+            with METRICS.span("tracker.update"):
+                detection = tracker.update(frame, frame_time)
+            if not frame_ref.valid():
+                # bus frame overwritten while tracking: this loop fell a
+                # whole bus ring behind, skip to the newest frame
+                METRICS.inc("frames.torn")
+                continue
 
-            # ------------------ DECISION MAKING -----------------------
-            cmd = brain.update(detection)
+            # ------------------ ASYNC DETECTION ----------------------
+            # Scheduler spends inference only when steering is uncertain;
+            # the worker never blocks this loop.
+            if not worker.busy and scheduler.should_detect(
+                    frame_time, detection, tracker.velocity, frame.shape[1]):
+                # Crop around the tracked person, or scan the full frame
+                roi = roi_planner.plan(frame_time, detection, frame.shape)
+                held = frame_ref.retain()
+                worker.submit(frame, frame_id, frame_time, roi,
+                              release=held.release, valid=held.valid)
+                scheduler.submit(frame_time)
+                roi_planner.submitted(frame_time, roi)
+
+            result = worker.latest()
+            if result is not None and result.frame_id != last_result_id:
+                scheduler.record_latency(result.latency)
+                roi_planner.record_result(result)
+                detection = tracker.correct(result)
+                last_result_id = result.frame_id
 
-            # ------------------ COMMAND THROTTLING --------------------
-            if cmd.label != last_cmd_label:
-                apply_motion_command(bot, cmd)
+            # ------------------ DECISION MAKING -----------------------
+            with METRICS.span("brain.update"):
+                cmd = brain.update(detection)
+            latency = time.time() - frame_time
+            glass_to_command.append(latency)
+            METRICS.observe("glass_to_command", latency * 1000.0)
+
+            # ------------------ MOTION COMMAND ------------------------
+            # Published every frame: it feeds the bot's watchdog, unchanged
+            # speeds cost no serial bytes, and the bot's heartbeat (not this
+            # loop) keeps the link alive.
+            changed = cmd.label != last_cmd_label
+            apply_motion_command(bot, cmd, log=changed, origin=frame_time)
+            if changed:
                 last_cmd_label = cmd.label
+                METRICS.inc("commands.sent")
+                if "first_command" not in boot.marks:
+                    boot.mark("first_command")
+                    print(boot.summary())
+            else:
+                METRICS.inc("commands.repeated")
 
-            # Always sleep briefly so serial stays alive
-            time.sleep(LOOP_SLEEP)
+            loop_busy = time.perf_counter() - loop_t0
+            scheduler.record_loop(loop_busy)
+            METRICS.observe("loop", loop_busy * 1000.0)
 
             # ------------------ OPTIONAL VISUALIZATION -----------------
             if DEBUG_DRAW:
-                vis = draw_debug(frame.copy(), detection, cmd.label)
+                vis = draw_debug(frame_ref.full(), detection, cmd.label, frame_ref.scale)
                 cv2.imshow("Person Follower Debug", vis)
                 if cv2.waitKey(1) & 0xFF == 27:  # ESC to quit
                     break
 
+            # Same overlay for the web stream, drawn off this thread and
+            # only while someone is watching
+            if tap is not None and broadcaster.viewers and tap.due(frame_time):
+                meta = frame_meta(last_seq, frame_time, frame.shape, detection, cmd=cmd.label)
+                tap.publish(frame_ref, meta, partial(draw_debug, detection=detection,
+                                                     cmd_label=cmd.label, scale=frame_ref.scale))
+
             # ------------------ FPS PRINTING ---------------------------
             now = time.time()
             if now - fps_time >= 1.0:
@@ -133,8 +358,19 @@ def main():
                 fps_time = now
                 frame_counter = 0
 
+                if bot is not None:
+                    for name, value in bot.link_stats().items():
+                        METRICS.set_gauge(f"serial.{name}", value)
+
                 if DEBUG_PRINT:
-                    print(f"[FPS] {fps:.1f}")
+                    print(f"[FPS] {fps:.1f} | detections {worker.completed} "
+                          f"| dropped frames {worker.dropped} "
+                          f"| detect every {scheduler.interval * 1000:.0f} ms "
+                          f"(infer {scheduler.latency * 1000:.0f} ms)")
+
+            if DEBUG_PRINT and METRICS.enabled and now - summary_time >= METRICS_SUMMARY_PERIOD:
+                summary_time = now
+                print(METRICS.summary(SUMMARY_STAGES))
 
     # ------------------------------------------------------------
     except KeyboardInterrupt:
@@ -142,14 +378,32 @@ def main():
 
     finally:
         # ------------------ CLEANUP ------------------------------
+        if bot is not None and bot.feedback is not None:
+            print(bot.feedback.summary())
         stop_bot(bot)
+        if emulator:
+            emulator.settle()
+            print(emulator.summary())
+            emulator.close()
+        if worker:
+            worker.stop()
+        if frame_ref is not None:
+            frame_ref.release()
+        if metrics_server:
+            metrics_server.stop()
+        if tap:
+            tap.close()
+            stream_server.stop()
+            broadcaster.stop()
         if stream:
             stream.stop()
+        boot.close()
 
         if DEBUG_DRAW:
             try: cv2.destroyAllWindows()
             except: pass
 
+        print_run_summary(run_frames, time.time() - run_start, glass_to_command)
         print("✅ Cleanup complete")
 
 
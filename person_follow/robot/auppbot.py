@@ -1,26 +1,216 @@
 # file: auppbot.py
 import serial, atexit, signal, threading, time, sys
+from collections import deque
 
 def _clamp(v, lo, hi): 
     return lo if v < lo else hi if v > hi else v
 
+def _packet(i: int, d: int, v: int) -> bytes:
+    return bytes([(i & 0xFF), (d & 0xFF), (v & 0xFF)])
+
 class _Writer:
     def __init__(self, ser: serial.Serial):   # ← fix here
         self.ser = ser
         self._lock = threading.Lock()
+        self._last = {}      # device id → (dir, value) last written
+        self.on_sent = None  # on_sent(data, perf_counter, origin) before each write (FeedbackReader)
     def send(self, i: int, d: int, v: int):
-        pkt = bytes([(i & 0xFF), (d & 0xFF), (v & 0xFF)])
         with self._lock:
-            self.ser.write(pkt)
+            if self.on_sent: self.on_sent(_packet(i, d, v), time.perf_counter(), None)
+            self._write(_packet(i, d, v))
+            self._last[i & 0xFF] = (d & 0xFF, v & 0xFF)
+    def _write(self, data: bytes):
+        # caller holds self._lock
+        try:
+            self.ser.write(data)
             self.ser.flush()
+        except Exception:
+            # part of it may have reached the firmware: trust nothing cached
+            self._last.clear()
+            raise
+    def send_many(self, packets, force: bool = False, origin: float = None) -> int:
+        """
+        Write several (id, dir, value) packets as one buffer with a single
+        flush, so they reach the firmware back to back. Packets whose
+        device already has that (dir, value) are skipped unless force.
+        origin: capture time of the frame behind this command, for acks.
+        Returns the number of packets written.
+        """
+        with self._lock:
+            buf, sent = bytearray(), {}
+            for i, d, v in packets:
+                key, state = i & 0xFF, (d & 0xFF, v & 0xFF)
+                if not force and self._last.get(key) == state:
+                    continue
+                buf += _packet(i, d, v)
+                sent[key] = state
+            if buf:
+                if self.on_sent: self.on_sent(bytes(buf), time.perf_counter(), origin)
+                self._write(buf)
+                self._last.update(sent)   # only once it actually went out
+            return len(sent)
+    def invalidate(self):
+        """Forget what was sent; the next send_many writes every packet."""
+        with self._lock:
+            self._last.clear()
+
+class _SerialThread(threading.Thread):
+    """
+    Serial I/O off the caller's thread, same send / send_many / invalidate
+    calls as _Writer but they only post and return.
+
+    Motion (send_many) goes through a single slot: a newer command
+    replaces one not yet written (counted as superseded), so a stalled
+    adapter delays the wheels by at most one write, never a backlog.
+    Everything else (servos, stop_all) is queued and never dropped, and
+    all writes happen in the order they were posted.
+
+    While idle the thread also keeps the link alive and safe:
+      heartbeat  every 1/heartbeat_hz s without a motor write, the current
+                 wheel speeds are re-sent (0 = off)
+      watchdog   no send_many for `watchdog` s (caller hung) → every
+                 motor set to 0 until the next command (0 = off)
+    """
+    def __init__(self, w: _Writer, late_after: float = 0.05,
+                 heartbeat_hz: float = 0.0, watchdog: float = 0.0):
+        super().__init__(name="auppbot-serial", daemon=True)
+        self._w = w
+        self.late_after = late_after     # s from post to written before a motion counts as late
+        self.heartbeat = 1.0 / heartbeat_hz if heartbeat_hz > 0 else 0.0
+        self.watchdog = watchdog
+        self._cond = threading.Condition()
+        self._motion = None              # (ticket, posted_at, packets, force, kind, origin)
+        self._queue = deque()            # (ticket, posted_at, fn, args)
+        self._ticket = 0
+        self._busy = False
+        self._current = {}               # motor id → (id, dir, value) last commanded
+        self._published = 0.0            # monotonic time of the last send_many
+        self._wire_at = 0.0              # monotonic time motor bytes last went out
+        self.tripped = False             # watchdog stopped the wheels
+        self.stopped = False
+        self.last_error = None
+        self.stats = {"motion": 0, "superseded": 0, "late": 0, "packets": 0,
+                      "skipped": 0, "errors": 0, "heartbeat": 0, "watchdog": 0}
+
+    # ---------- producer side ----------
+    def send(self, i: int, d: int, v: int): self._post(self._w.send, i, d, v)
+    def invalidate(self): self._post(self._w.invalidate)
+    def send_many(self, packets, force: bool = False, origin: float = None):
+        packets = list(packets)
+        with self._cond:
+            if self._motion is not None and self._motion[4] == "motion":
+                self.stats["superseded"] += 1
+            self._ticket += 1
+            self._published = time.monotonic()
+            self._motion = (self._ticket, self._published, packets, force, "motion", origin)
+            self._current.update((p[0], p) for p in packets)
+            self.tripped = False
+            self._cond.notify()
+    def halt(self):
+        """Drop the unsent motion and stop heartbeats (stop_all follows)."""
+        with self._cond:
+            self._motion = None
+            self._current = {}
+    def _post(self, fn, *args):
+        with self._cond:
+            self._ticket += 1
+            self._queue.append((self._ticket, time.monotonic(), fn, args))
+            self._cond.notify()
+    def flush(self, timeout=None) -> bool:
+        """Wait until everything posted so far is written."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._motion is None and not self._queue and not self._busy, timeout)
+    def close(self, timeout=1.0):
+        """Write what is pending, then stop."""
+        with self._cond:
+            self.stopped = True
+            self._cond.notify_all()
+        self.join(timeout)
+
+    # ---------- I/O thread ----------
+    def _idle_check(self):
+        """
+        With the lock held and nothing pending: post a watchdog stop or a
+        heartbeat if one is due. Returns s until the next check (None = no timer).
+        """
+        if not self._current:
+            return None
+        now = time.monotonic()
+        waits = []
+        if self.watchdog and not self.tripped:
+            left = self._published + self.watchdog - now
+            if left <= 0:
+                self.tripped = True
+                self.stats["watchdog"] += 1
+                self._current = {i: (i, 0, 0) for i in self._current}
+                self._ticket += 1
+                self._motion = (self._ticket, now, list(self._current.values()), True, "watchdog", None)
+                return 0.0
+            waits.append(left)
+        if self.heartbeat:
+            left = self._wire_at + self.heartbeat - now
+            if left <= 0:
+                self.stats["heartbeat"] += 1
+                self._ticket += 1
+                self._motion = (self._ticket, now, list(self._current.values()), True, "heartbeat", None)
+                return 0.0
+            waits.append(left)
+        return min(waits) if waits else None
+    def _next(self):
+        with self._cond:
+            while not (self._motion or self._queue or self.stopped):
+                self._cond.wait(self._idle_check())
+            if self._queue and (self._motion is None or self._queue[0][0] < self._motion[0]):
+                item, motion = self._queue.popleft(), False
+            elif self._motion is not None:
+                item, motion, self._motion = self._motion, True, None
+            else:
+                return None, False      # stopped, nothing left
+            self._busy = True
+            return item, motion
+    def run(self):
+        while True:
+            item, motion = self._next()
+            if item is None:
+                return
+            try:
+                if motion:
+                    _, posted, packets, force, kind, origin = item
+                    n = self._w.send_many(packets, force, origin)
+                    if n:
+                        self._wire_at = time.monotonic()
+                    if kind == "motion":
+                        self.stats["motion"] += 1
+                        self.stats["packets"] += n
+                        self.stats["skipped"] += len(packets) - n
+                        if time.monotonic() - posted > self.late_after:
+                            self.stats["late"] += 1
+                else:
+                    _, _, fn, args = item
+                    fn(*args)
+            except (serial.SerialException, OSError) as e:   # incl. SerialTimeoutException
+                self.stats["errors"] += 1
+                self.last_error = e
+            except Exception as e:
+                # a bug in a queued call or the on_sent hook must not end
+                # this thread: heartbeat and watchdog live here too
+                self.stats["errors"] += 1
+                self.last_error = e
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
 
 class Motor:
     def __init__(self, w, motor_id: int):     # ← fix here
         self._w, self.id = w, motor_id
-    def speed(self, value: int):
+    def packet(self, value: int):
+        """(id, dir, value) for speed `value`, see AUPPBot.set_motors"""
         val = int(_clamp(value, -99, 99))
-        direction = 0 if val >= 0 else 1
-        self._w.send(self.id, direction, abs(val))
+        return self.id, (0 if val >= 0 else 1), abs(val)
+    def speed(self, value: int):
+        self._w.send(*self.packet(value))
     def forward(self, speed: int): self.speed(abs(speed))
     def backward(self, speed: int): self.speed(-abs(speed))
     def stop(self): self._w.send(self.id, 0, 0)
@@ -34,33 +224,83 @@ class Servo:
 
 
 class AUPPBot:
-    def __init__(self, port, baud, auto_safe=False, timeout=1, use_signals=True):
-    
-        self.ser = serial.Serial(port, baud, timeout=timeout)
+    def __init__(self, port, baud, auto_safe=False, timeout=1, use_signals=True,
+                 write_timeout=0.1, threaded=True, late_after=0.05,
+                 heartbeat_hz=0.0, watchdog=0.0, feedback=False, ack_timeout=0.5):
+        """
+        write_timeout: s a single write may block before it fails (None = forever).
+        threaded: writes run on a background I/O thread (see _SerialThread),
+        so callers never wait on the serial port; False writes inline.
+        heartbeat_hz / watchdog: resend the wheel speeds at this rate, and
+        stop the wheels if set_motors isn't called for `watchdog` s
+        (threaded only, 0 = off).
+        feedback: read acks / telemetry the firmware sends back
+        (robot/feedback.py), exposed as .feedback.
+        """
+        self.ser = serial.Serial(port, baud, timeout=timeout, write_timeout=write_timeout)
         self.auto_safe = auto_safe
-        self._w = _Writer(self.ser)
-        # self._w = self.ser 
-        # expose devices
-        self.motor1 = Motor(self._w, 1)
-        self.motor2 = Motor(self._w, 2)
-        self.motor3 = Motor(self._w, 3)
-        self.motor4 = Motor(self._w, 4)
-        self.servo1 = Servo(self._w, 1)
-        self.servo2 = Servo(self._w, 2)
-
-        # setup exit behavior
-        if auto_safe:
-            atexit.register(self.safe)
-        if use_signals:
-            def _handler(sig, frame):
-                self.safe()
-                self.close()
-                sys.exit(0)
-            signal.signal(signal.SIGINT, _handler)
-            signal.signal(signal.SIGTERM, _handler)
+        self.feedback = None
+        self._io = None
+        try:
+            self._writer = _Writer(self.ser)
+            if feedback:
+                from robot.feedback import FeedbackReader
+                self.feedback = FeedbackReader(self.ser, ack_timeout)
+                self._writer.on_sent = self.feedback.sent
+                self.feedback.start()
+            self._io = (_SerialThread(self._writer, late_after, heartbeat_hz, watchdog)
+                        if threaded else None)
+            if self._io is not None:
+                self._io.start()
+            self._w = self._io or self._writer
+            # self._w = self.ser 
+            # expose devices
+            self.motor1 = Motor(self._w, 1)
+            self.motor2 = Motor(self._w, 2)
+            self.motor3 = Motor(self._w, 3)
+            self.motor4 = Motor(self._w, 4)
+            self.servo1 = Servo(self._w, 1)
+            self.servo2 = Servo(self._w, 2)
+
+            # setup exit behavior
+            if auto_safe:
+                atexit.register(self.safe)
+            if use_signals:
+                def _handler(sig, frame):
+                    self.safe()
+                    self.close()
+                    sys.exit(0)
+                signal.signal(signal.SIGINT, _handler)
+                signal.signal(signal.SIGTERM, _handler)
+        except Exception:
+            # e.g. signal handlers outside the main thread: don't leave the
+            # port open and its threads running for a bot nobody holds
+            atexit.unregister(self.safe)
+            if self._io is not None:
+                self._io.close()
+            if self.feedback is not None:
+                self.feedback.close()
+            self.ser.close()
+            raise
 
     # ---------- actions ----------
-    def stop_all(self): self._w.send(0xFF, 0, 0)
+    def set_motors(self, m1=None, m2=None, m3=None, m4=None, force=False, origin=None) -> int:
+        """
+        Set several motor speeds with one write + flush (None = leave as is).
+        Motors already at that speed are not re-sent unless force.
+        Returns the number of packets written (None when threaded: the
+        command is only posted, and replaces one still unsent).
+        origin: time.time() capture of the frame this command was decided
+        on; with feedback, acks turn it into glass-to-wheel latency.
+        """
+        motors = (self.motor1, self.motor2, self.motor3, self.motor4)
+        packets = [m.packet(v) for m, v in zip(motors, (m1, m2, m3, m4)) if v is not None]
+        return self._w.send_many(packets, force=force, origin=origin)
+    def stop_all(self):
+        if self._io is not None:
+            self._io.halt()      # no heartbeat may restart the wheels
+        self._w.send(0xFF, 0, 0)
+        self._w.invalidate()     # every motor is stopped now, whatever was cached
     def safe(self):
         """Center servos & stop all motors"""
         try:
@@ -68,10 +308,28 @@ class AUPPBot:
             self.stop_all()
         except Exception: pass
 
+    # ---------- link ----------
+    def flush(self, timeout=None) -> bool:
+        """Block until every posted command is on the wire."""
+        return self._io.flush(timeout) if self._io is not None else True
+    def link_stats(self) -> dict:
+        """I/O thread counters: motion, superseded, late, packets, skipped, errors,
+        heartbeat, watchdog; with feedback also acked, lost, unmatched, telemetry"""
+        stats = dict(self._io.stats) if self._io is not None else {}
+        if self.feedback is not None:
+            fb = self.feedback.snapshot()   # expires unacked packets first
+            fb.pop("rtt_ms")
+            stats.update(fb)
+        return stats
+
     # ---------- lifecycle ----------
     def close(self):
         if self.auto_safe:
             self.safe()
+        if self._io is not None:
+            self._io.close()     # drains pending writes first
+        if self.feedback is not None:
+            self.feedback.close()
         try: self.ser.close()
         except Exception: pass
 
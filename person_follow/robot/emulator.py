@@ -0,0 +1,235 @@
+# file: robot/emulator.py
+"""
+AUPPBot firmware stand-in on a pseudo-terminal, no robot needed.
+
+    emu = FirmwareEmulator().start()
+    bot = AUPPBot(emu.port, 115200, use_signals=False)
+    bot.set_motors(20, 20, 12, 12)
+    emu.wait(lambda e: e.motors[1] == 20, timeout=1.0)
+    print(emu.summary())
+
+Parses the 3-byte (id, dir, value) protocol the way the firmware does:
+ids 1-4 motors (dir 1 = reverse), 5-6 servos (value = degrees), 0xFF
+stop all. Every packet is logged with its arrival time and the time it
+would have finished arriving over a real UART at `baud`, so latency
+and throughput numbers include wire time. Linux / macOS only (pty).
+
+With ack=True it answers every packet with an ack once it has fully
+arrived, and telemetry_hz > 0 adds periodic status frames with the
+motor speeds (frame formats in robot/feedback.py).
+"""
+
+import os
+import pty
+import select
+import threading
+import time
+import tty
+from collections import deque
+from dataclasses import dataclass
+
+from robot.feedback import ACK, TELEMETRY, TELEMETRY_STATUS
+
+MOTOR_IDS = (1, 2, 3, 4)
+SERVO_IDS = (5, 6)
+STOP_ALL = 0xFF
+
+
+@dataclass
+class Packet:
+    arrived: float   # perf_counter when read from the pty
+    time: float      # perf_counter when the last byte would be in at `baud`
+    id: int
+    dir: int
+    value: int
+
+
+class FirmwareEmulator:
+    def __init__(self, baud: int = 115200, log_size: int = 100000, on_packet=None,
+                 ack: bool = False, telemetry_hz: float = 0.0):
+        """
+        baud: UART speed used for the wire-time model (0 = instant).
+        on_packet(emulator, packet): called on the reader thread after
+        each packet is applied.
+        ack / telemetry_hz: talk back like firmware with feedback enabled.
+        """
+        self.byte_time = 10.0 / baud if baud else 0.0    # 8N1: 10 bits per byte
+        self.on_packet = on_packet
+        self.ack = ack
+        self.telemetry_gap = 1.0 / telemetry_hz if telemetry_hz > 0 else 0.0
+        self.acks_sent = 0
+        self.telemetry_sent = 0
+        self.packets = deque(maxlen=log_size)
+
+        self.motors = {i: 0 for i in MOTOR_IDS}          # signed speed, -99..99
+        self.servos = {i: 90 for i in SERVO_IDS}
+        self.received = 0        # packets applied
+        self.received_bytes = 0
+        self.invalid = 0         # bytes skipped to resync on a malformed packet
+        self.stop_alls = 0
+        self.first_time = None
+        self.last_time = None
+
+        # raw mode: no echo, no newline translation, every byte passes through
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+
+        self._buf = bytearray()
+        self._wire_free = 0.0    # when the emulated UART finishes what it has
+        self._cond = threading.Condition()
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, name="auppbot-emulator", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    # ------------------------------------------------------------
+    # READER THREAD
+    # ------------------------------------------------------------
+    def _run(self):
+        next_telemetry = time.perf_counter() + self.telemetry_gap
+        while not self.stopped:
+            wait = 0.1
+            if self.telemetry_gap:
+                now = time.perf_counter()
+                if now >= next_telemetry:
+                    self._send_status()
+                    next_telemetry = now + self.telemetry_gap
+                wait = min(wait, max(0.0, next_telemetry - now))
+            ready, _, _ = select.select([self._master], [], [], wait)
+            if not ready:
+                continue
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                break
+            if data:
+                self._feed(data, time.perf_counter())
+
+    def _write(self, data: bytes):
+        try:
+            os.write(self._master, data)
+        except OSError:
+            pass     # host closed the port
+
+    def _send_status(self):
+        with self._cond:
+            speeds = [self.motors[i] & 0xFF for i in MOTOR_IDS]
+        self._write(bytes([TELEMETRY, TELEMETRY_STATUS, len(speeds)] + speeds))
+        self.telemetry_sent += 1
+
+    def _send_ack(self, pkt: Packet):
+        # the firmware acks once the packet is in; the ack itself takes 4 bytes of wire
+        wait = pkt.time + 4 * self.byte_time - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        self._write(bytes([ACK, pkt.id, pkt.dir, pkt.value]))
+        self.acks_sent += 1
+
+    def _feed(self, data: bytes, now: float):
+        self.received_bytes += len(data)
+        self._buf += data
+        # the host wrote these bytes at `now`; the UART sends them back to back
+        wire = max(now, self._wire_free)
+
+        while len(self._buf) >= 3:
+            i, d, v = self._buf[0], self._buf[1], self._buf[2]
+            if not self._valid(i, d, v):
+                del self._buf[0]
+                self.invalid += 1
+                continue
+            del self._buf[:3]
+            wire += 3 * self.byte_time
+            pkt = Packet(now, wire, i, d, v)
+            with self._cond:
+                self._apply(pkt)
+                self._cond.notify_all()
+            if self.on_packet is not None:
+                self.on_packet(self, pkt)
+            if self.ack:
+                self._send_ack(pkt)
+
+        self._wire_free = wire
+
+    @staticmethod
+    def _valid(i: int, d: int, v: int) -> bool:
+        if i in MOTOR_IDS:
+            return d in (0, 1) and v <= 99
+        if i in SERVO_IDS:
+            return v <= 180
+        return i == STOP_ALL
+
+    def _apply(self, pkt: Packet):
+        if pkt.id in MOTOR_IDS:
+            self.motors[pkt.id] = -pkt.value if pkt.dir else pkt.value
+        elif pkt.id in SERVO_IDS:
+            self.servos[pkt.id] = pkt.value
+        else:
+            self.stop_alls += 1
+            for i in MOTOR_IDS:
+                self.motors[i] = 0
+
+        self.packets.append(pkt)
+        self.received += 1
+        if self.first_time is None:
+            self.first_time = pkt.arrived
+        self.last_time = pkt.arrived
+
+    # ------------------------------------------------------------
+    # QUERIES
+    # ------------------------------------------------------------
+    def wait(self, predicate, timeout: float = 1.0) -> bool:
+        """
+        Block until predicate(self) is true (checked after every packet).
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: predicate(self), timeout)
+
+    def settle(self, quiet: float = 0.05, timeout: float = 1.0) -> bool:
+        """
+        Wait until nothing has arrived for `quiet` s, e.g. after the host
+        closed the port, so stats() include its last writes.
+        """
+        end = time.perf_counter() + timeout
+        while time.perf_counter() < end:
+            last = self.last_time or 0.0
+            if time.perf_counter() - last >= quiet and not select.select([self._master], [], [], 0)[0]:
+                return True
+            time.sleep(quiet / 5)
+        return False
+
+    def stats(self) -> dict:
+        with self._cond:
+            span = (self.last_time - self.first_time) if self.received > 1 else 0.0
+            return {
+                "packets": self.received,
+                "bytes": self.received_bytes,
+                "invalid_bytes": self.invalid,
+                "stop_all": self.stop_alls,
+                "acks_sent": self.acks_sent,
+                "telemetry_sent": self.telemetry_sent,
+                "seconds": round(span, 3),
+                "packets_per_s": round(self.received / span, 1) if span > 0 else 0.0,
+                "motors": dict(self.motors),
+                "servos": dict(self.servos),
+            }
+
+    def summary(self) -> str:
+        s = self.stats()
+        motors = " ".join(f"{v:+d}" for v in s["motors"].values())
+        servos = " ".join(str(v) for v in s["servos"].values())
+        return (f"[EMULATOR] {s['packets']} packets ({s['bytes']} B) in {s['seconds']:.1f} s "
+                f"| {s['packets_per_s']:.0f} pkt/s | motors {motors} | servos {servos} "
+                f"| invalid {s['invalid_bytes']} B")
+
+    def close(self):
+        self.stopped = True
+        if self.thread.is_alive():
+            self.thread.join(timeout=1.0)
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
@@ -0,0 +1,151 @@
+# file: robot/feedback.py
+"""
+Optional reader for what the firmware sends back on the motor port.
+
+Frames, robot → host:
+  A5 id dir value             ack: that (id, dir, value) packet was applied
+  5A type len payload[len]    telemetry (encoders, battery, status...), kept raw
+
+Each ack is matched to the oldest unacked identical packet the host
+wrote, which gives the command round trip (write → applied → ack back)
+and, for commands that carry the capture time of the frame they were
+decided on, glass-to-wheel latency. Packets not acked within
+ack_timeout count as lost, checked by the reader thread on every read
+(at most a port timeout apart) and whenever stats are queried; so do
+packets pushed out of a full outstanding list. Firmware without acks
+loses every packet.
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from telemetry.metrics import METRICS, Histogram
+
+ACK = 0xA5
+TELEMETRY = 0x5A
+TELEMETRY_STATUS = 0x01     # payload: motor 1-4 speeds as int8 (robot/emulator.py)
+
+
+@dataclass
+class TelemetryFrame:
+    time: float       # perf_counter when parsed
+    type: int
+    payload: bytes
+
+
+class FeedbackReader(threading.Thread):
+    def __init__(self, ser, ack_timeout: float = 0.5, ring_size: int = 256,
+                 max_outstanding: int = 1024):
+        super().__init__(name="auppbot-feedback", daemon=True)
+        self.ser = ser
+        self.ack_timeout = ack_timeout
+        self.rtt = Histogram()                        # ms, write → ack
+        self.telemetry = deque(maxlen=ring_size)      # recent TelemetryFrames
+        self._outstanding = deque(maxlen=max_outstanding)  # (written_at, origin, id, dir, value)
+        self._lock = threading.Lock()
+        self._buf = bytearray()
+        self.stopped = False
+        self.stats = {"acked": 0, "lost": 0, "unmatched": 0, "telemetry": 0, "garbage_bytes": 0}
+
+    # ---------- writer side ----------
+    def sent(self, data: bytes, written_at: float, origin: float = None):
+        """
+        Called by _Writer just before `data` (whole 3-byte packets) is
+        written. origin: wall-clock capture time of the frame behind
+        this command, if any.
+        """
+        with self._lock:
+            out = self._outstanding
+            for k in range(0, len(data) - 2, 3):
+                if len(out) == out.maxlen:
+                    self.stats["lost"] += 1     # the append below pushes the oldest out
+                out.append((written_at, origin, data[k], data[k + 1], data[k + 2]))
+
+    # ---------- reader thread ----------
+    def run(self):
+        while not self.stopped:
+            try:
+                data = self.ser.read(max(1, self.ser.in_waiting))
+            except Exception:     # port closed under us
+                break
+            now = time.perf_counter()
+            if data:
+                self._feed(data, now)
+            with self._lock:
+                self._expire(now)
+
+    def _feed(self, data: bytes, now: float):
+        buf = self._buf
+        buf += data
+        while buf:
+            if buf[0] == ACK:
+                if len(buf) < 4:
+                    break
+                self._ack(buf[1], buf[2], buf[3], now)
+                del buf[:4]
+            elif buf[0] == TELEMETRY:
+                if len(buf) < 3 or len(buf) < 3 + buf[2]:
+                    break
+                size = buf[2]
+                self.telemetry.append(TelemetryFrame(now, buf[1], bytes(buf[3:3 + size])))
+                self.stats["telemetry"] += 1
+                del buf[:3 + size]
+            else:
+                del buf[0]            # resync on the next frame marker
+                self.stats["garbage_bytes"] += 1
+
+    def _expire(self, now: float):
+        # caller holds self._lock
+        out = self._outstanding
+        while out and now - out[0][0] > self.ack_timeout:
+            out.popleft()
+            self.stats["lost"] += 1
+
+    def _ack(self, i: int, d: int, v: int, now: float):
+        with self._lock:
+            self._expire(now)
+            out = self._outstanding
+            for k, (written_at, origin, pi, pd, pv) in enumerate(out):
+                if (pi, pd, pv) == (i, d, v):
+                    del out[k]
+                    break
+            else:
+                self.stats["unmatched"] += 1
+                return
+            self.stats["acked"] += 1
+
+        ms = (now - written_at) * 1000.0
+        self.rtt.observe(ms)
+        METRICS.observe("serial.rtt", ms)
+        if origin is not None:
+            METRICS.observe("glass_to_wheel", (time.time() - origin) * 1000.0)
+
+    # ---------- queries ----------
+    def latest(self, frame_type: int = None):
+        """
+        Most recent telemetry frame (of `frame_type`), or None.
+        """
+        for frame in reversed(self.telemetry):
+            if frame_type is None or frame.type == frame_type:
+                return frame
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._expire(time.perf_counter())
+            stats = dict(self.stats)
+        return dict(stats, rtt_ms=self.rtt.snapshot())
+
+    def summary(self) -> str:
+        s, rtt = self.snapshot(), self.rtt
+        return (f"[SERIAL] rtt ms p50={rtt.quantile(0.5):.1f} p95={rtt.quantile(0.95):.1f} "
+                f"max={rtt.max:.1f} | acked {s['acked']} lost {s['lost']} "
+                f"unmatched {s['unmatched']} | telemetry {s['telemetry']}")
+
+    def close(self, timeout: float = 1.0):
+        self.stopped = True
+        try: self.ser.cancel_read()      # wake a blocked read (pyserial on posix)
+        except Exception: pass
+        self.join(timeout)
@@ -0,0 +1,60 @@
+# file: startup/orchestrator.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Startup:
+    """
+    Runs independent init steps (serial link, camera, ONNX session and
+    warmup, heavy imports) concurrently and times each one.
+
+        boot = Startup()
+        boot.add("camera", open_camera)
+        boot.add("detector", load_detector, model_path)
+        stream, detector = boot.result("camera"), boot.result("detector")
+        print(boot.summary())
+
+    Most of the work releases the GIL (device I/O, ORT session build and
+    inference, cv2), so the steps really overlap. A step that raises
+    re-raises from result().
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.t0 = time.perf_counter()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+        self._tasks = {}
+        self.timings = {}       # name → (started after t0, duration), seconds
+        self.marks = {}         # name → seconds after t0
+
+    def add(self, name: str, fn, *args, **kwargs):
+        self._tasks[name] = self._pool.submit(self._timed, name, fn, args, kwargs)
+        return self
+
+    def _timed(self, name, fn, args, kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.timings[name] = (start - self.t0, time.perf_counter() - start)
+
+    def result(self, name: str, timeout: float = None):
+        return self._tasks[name].result(timeout)
+
+    def mark(self, name: str) -> float:
+        """
+        Record a milestone, e.g. the first motor command.
+        """
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.t0
+        return self.marks[name]
+
+    def summary(self) -> str:
+        steps = sorted(self.timings.items(), key=lambda kv: kv[1][0])
+        parts = [f"{name} {dur * 1000:.0f} ms" for name, (_, dur) in steps]
+        parts += [f"{name} @ {t * 1000:.0f} ms" for name, t in self.marks.items()]
+        elapsed = max([s + d for s, d in self.timings.values()] + list(self.marks.values()) + [0.0])
+        return f"[STARTUP] {' | '.join(parts)} (ready after {elapsed * 1000:.0f} ms)"
+
+    def close(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,132 @@
+# file: streaming/broadcaster.py
+
+import threading
+import time
+from typing import Callable, Optional
+
+from telemetry.metrics import METRICS
+
+
+class Subscription:
+    """
+    Single-slot mailbox for one client: publishing replaces an unread
+    item, so a slow client skips frames instead of queueing them.
+    """
+
+    def __init__(self, broadcaster):
+        self._broadcaster = broadcaster
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0          # seq of the item in the slot
+        self._taken = 0        # seq of the last item handed to the client
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+
+    def _put(self, seq: int, item):
+        with self._cond:
+            if self._seq > self._taken:
+                self.dropped += 1
+                METRICS.inc("stream.client_dropped")
+            self._item = item
+            self._seq = seq
+            self._cond.notify()
+
+    def get(self, timeout: float = None):
+        """
+        Next item newer than the last one returned, or None on timeout
+        or once closed.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._taken or self.closed, timeout):
+                return None
+            if self.closed:
+                return None
+            self._taken = self._seq
+            self.delivered += 1
+            return self._item
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self._broadcaster.unsubscribe(self)
+
+
+class FrameBroadcaster:
+    """
+    One producer thread renders every frame once — inference, overlay,
+    JPEG encode — and fans the result out to all subscribers.
+
+        broadcaster = FrameBroadcaster(render).start()
+        sub = broadcaster.subscribe()
+        jpg = sub.get(timeout=1.0)
+        ...
+        sub.close()
+
+    render() should block until a new frame is ready and return the
+    item to publish (or None to skip). It is only called while at least
+    one client is subscribed, so an unwatched stream costs nothing.
+
+    subscribe(sink) registers any object with _put(seq, item) and
+    close() instead, e.g. a hand-off into an asyncio event loop.
+    """
+
+    def __init__(self, render: Callable[[], Optional[object]]):
+        self.render = render
+        self._lock = threading.Lock()
+        self._has_subscribers = threading.Event()
+        self._subscribers = []
+        self.seq = 0
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    @property
+    def viewers(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self, sink=None):
+        sub = sink if sink is not None else Subscription(self)
+        with self._lock:
+            self._subscribers.append(sub)
+            self._has_subscribers.set()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+            if not self._subscribers:
+                self._has_subscribers.clear()
+
+    def _run(self):
+        while not self.stopped:
+            if not self._has_subscribers.wait(timeout=0.5):
+                continue
+            try:
+                item = self.render()
+            except Exception as e:
+                print("⚠️  Stream render failed:", e)
+                time.sleep(0.1)
+                continue
+            if item is None:
+                continue
+
+            self.seq += 1
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for sub in subscribers:
+                sub._put(self.seq, item)
+
+    def stop(self):
+        self.stopped = True
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.close()
+        self.thread.join(timeout=1.0)
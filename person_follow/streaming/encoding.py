@@ -0,0 +1,209 @@
+# file: streaming/encoding.py
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from config.constants import (
+    STREAM_JPEG_QUALITY,
+    STREAM_MIN_WIDTH,
+    STREAM_ADAPT_WINDOW,
+    STREAM_ADAPT_DROP_RATIO,
+    STREAM_ADAPT_MAX_WRITE,
+)
+from telemetry.metrics import METRICS
+
+# Steps an adaptive client walks down when it can't keep up:
+# (fraction of the requested width, fraction of the requested quality)
+ADAPT_LADDER = (
+    (1.0, 1.0),
+    (1.0, 0.75),
+    (0.75, 0.75),
+    (0.5, 0.6),
+    (0.5, 0.45),
+    (0.25, 0.45),
+)
+
+
+def frame_meta(seq: int, frame_time: float, frame_shape, detection: dict,
+               persons=None, cmd: str = None) -> dict:
+    """
+    JSON-ready description of one frame: best person, every person
+    box [x1, y1, x2, y2, conf], and the motion command if known.
+    """
+    h, w = frame_shape[:2]
+    return {
+        "seq": seq,
+        "time": frame_time,
+        "width": w,
+        "height": h,
+        "found": bool(detection.get("found", False)),
+        "bbox": detection.get("bbox"),
+        "conf": round(float(detection.get("conf", 0.0)), 3),
+        "zone": detection.get("zone"),
+        "persons": persons or [],
+        "cmd": cmd,
+    }
+
+
+def sse_event(data: dict, event: str = None) -> bytes:
+    head = f"event: {event}\n" if event else ""
+    return (head + "data: " + json.dumps(data, separators=(",", ":")) + "\n\n").encode()
+
+
+class StreamFrame:
+    """
+    One rendered camera frame shared by every client.
+
+    The overlay is drawn and each (width, quality, overlay) JPEG is
+    encoded at most once, on first request, so ten viewers on the same
+    settings cost one encode and metadata-only clients cost none.
+    """
+
+    def __init__(self, image: np.ndarray, meta: dict, draw=None):
+        self.image = image          # camera frame, not modified
+        self.meta = meta            # JSON-ready detection metadata
+        self._draw = draw           # draw(copy_of_image) → annotated image
+        self._annotated = None
+        self._jpegs = {}
+        self._lock = threading.Lock()
+
+    def _source(self, overlay: bool) -> np.ndarray:
+        if not overlay or self._draw is None:
+            return self.image
+        if self._annotated is None:
+            self._annotated = self._draw(self.image.copy())
+        return self._annotated
+
+    def cached(self, width: int = 0, quality: int = STREAM_JPEG_QUALITY, overlay: bool = True):
+        """
+        Already-encoded bytes for these settings, or None.
+        """
+        return self._jpegs.get((width, quality, overlay))
+
+    def jpeg(self, width: int = 0, quality: int = STREAM_JPEG_QUALITY, overlay: bool = True) -> bytes:
+        key = (width, quality, overlay)
+        with self._lock:
+            data = self._jpegs.get(key)
+            if data is not None:
+                return data
+
+            img = self._source(overlay)
+            h, w = img.shape[:2]
+            if 0 < width < w:
+                img = cv2.resize(img, (width, max(1, round(h * width / w))),
+                                 interpolation=cv2.INTER_AREA)
+            with METRICS.span("stream.encode"):
+                ok, jpg = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+            data = jpg.tobytes() if ok else b""
+            self._jpegs[key] = data
+            return data
+
+
+def _arg(args, name, cast, default):
+    try:
+        return cast(args.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class StreamProfile:
+    """
+    What one client asked for: /stream?width=320&quality=50&fps=10&adaptive=1
+    width 0 keeps the camera resolution, fps 0 means uncapped.
+    """
+    width: int = 0
+    quality: int = STREAM_JPEG_QUALITY
+    fps: float = 0.0
+    adaptive: bool = False
+    overlay: bool = True
+
+    @classmethod
+    def from_query(cls, args) -> "StreamProfile":
+        width = _arg(args, "width", int, 0)
+        return cls(
+            width=max(STREAM_MIN_WIDTH, width) if width > 0 else 0,
+            quality=min(95, max(10, _arg(args, "quality", int, STREAM_JPEG_QUALITY))),
+            fps=max(0.0, _arg(args, "fps", float, 0.0)),
+            adaptive=str(args.get("adaptive", "0")).lower() in ("1", "true", "yes"),
+            overlay=str(args.get("overlay", "1")).lower() not in ("0", "false", "no"),
+        )
+
+
+class AdaptiveEncoder:
+    """
+    Picks width/quality for one client. In adaptive mode it steps down
+    ADAPT_LADDER when the client falls behind — more than
+    STREAM_ADAPT_DROP_RATIO of the frames in a window were skipped, or
+    a write blocked longer than STREAM_ADAPT_MAX_WRITE because the
+    socket send buffer was full — and climbs back one step after two
+    clean windows.
+    """
+
+    def __init__(self, profile: StreamProfile, window: float = STREAM_ADAPT_WINDOW,
+                 drop_ratio: float = STREAM_ADAPT_DROP_RATIO, max_write: float = STREAM_ADAPT_MAX_WRITE):
+        self.profile = profile
+        self.window = window
+        self.drop_ratio = drop_ratio
+        self.max_write = max_write
+        self.level = 0
+        self._window_start = time.time()
+        self._sent = 0
+        self._skipped = 0
+        self._backlogged = False
+        self._clean_windows = 0
+
+    def record(self, sent: int = 0, skipped: int = 0, write_time: float = 0.0,
+               backlogged: bool = False):
+        """
+        skipped: frames the client's mailbox overwrote (leave 0 under an
+        fps cap, those skips are intended). write_time: seconds the last
+        send blocked.
+        """
+        self._sent += sent
+        self._skipped += skipped
+        self._backlogged |= backlogged or write_time > self.max_write
+        if not self.profile.adaptive:
+            return
+
+        now = time.time()
+        if now - self._window_start < self.window:
+            return
+        total = self._sent + self._skipped
+        behind = self._backlogged or (total > 0 and self._skipped / total > self.drop_ratio)
+        if behind:
+            self.level = min(self.level + 1, len(ADAPT_LADDER) - 1)
+            self._clean_windows = 0
+        else:
+            self._clean_windows += 1
+            if self._clean_windows >= 2 and self.level > 0:
+                self.level -= 1
+                self._clean_windows = 0
+        self._window_start = now
+        self._sent = self._skipped = 0
+        self._backlogged = False
+
+    def settings(self, native_width: int):
+        """
+        (width, quality) to encode the next frame with.
+        """
+        width_f, quality_f = ADAPT_LADDER[self.level]
+        width = self.profile.width or native_width
+        if width_f < 1.0:
+            width = max(STREAM_MIN_WIDTH, int(width * width_f))
+        if width >= native_width:
+            width = 0
+        return width, max(10, int(self.profile.quality * quality_f))
+
+    def encode(self, frame: StreamFrame) -> bytes:
+        width, quality = self.settings(frame.image.shape[1])
+        return frame.jpeg(width, quality, self.profile.overlay)
+
+    def cached(self, frame: StreamFrame):
+        width, quality = self.settings(frame.image.shape[1])
+        return frame.cached(width, quality, self.profile.overlay)
@@ -0,0 +1,59 @@
+# file: streaming/page.py
+
+# Viewer page served at / by StreamServer (app_mssd.py and main.py --stream-port)
+INDEX_HTML = """<!doctype html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <title>MobileNet-SSD ONNX • Raspberry Pi Stream</title>
+  <meta name="viewport" content="width=device-width,initial-scale=1">
+  <style>
+    :root { color-scheme: light dark; }
+    body { margin:0; min-height:100vh; display:grid; place-items:center;
+           background:#0b0c10; color:#eaf0f6; font-family:system-ui,Segoe UI,Roboto,sans-serif; }
+    .card { width:min(96vw,900px); background:#111417; border-radius:16px; padding:14px;
+            border:1px solid rgba(255,255,255,0.08); box-shadow:0 10px 40px rgba(0,0,0,.35); }
+    h1 { margin:6px 0 10px; font-size:1.05rem; }
+    .row { display:flex; gap:10px; justify-content:space-between; align-items:center; }
+    .btn { border:1px solid rgba(255,255,255,.12); background:#1b2229; color:#eaf0f6;
+           padding:6px 12px; border-radius:10px; cursor:pointer; font-weight:600; }
+    .btn:hover { background:#222b33; }
+    .frame { width:100%; aspect-ratio:16/9; background:#0d1117; border-radius:12px; overflow:hidden;
+             border:1px solid rgba(255,255,255,0.08); display:grid; place-items:center; }
+    img { width:100%; height:100%; object-fit:contain; }
+    small { opacity:.65; }
+  </style>
+</head>
+<body>
+  <div class="card">
+    <div class="row">
+      <h1>Raspberry Pi • MobileNet-SSD (ONNX) Live</h1>
+      <button class="btn" onclick="reloadStream()">Reload</button>
+    </div>
+    <div class="frame">
+      <img id="stream" src="/stream" alt="Stream">
+    </div>
+    <div class="row" style="margin-top:8px;">
+      <small>Status: <span id="health">checking…</span></small>
+      <small>URL: <code id="url"></code></small>
+    </div>
+  </div>
+<script>
+  async function checkHealth() {
+    try {
+      const r = await fetch('/health', {cache:'no-store'});
+      const j = await r.json();
+      document.getElementById('health').textContent = j.camera_ok ? 'camera OK' : 'no camera';
+    } catch (e) {
+      document.getElementById('health').textContent = 'server offline';
+    }
+  }
+  function reloadStream() {
+    const img = document.getElementById('stream');
+    img.src = '/stream?ts=' + Date.now();
+  }
+  document.getElementById('url').textContent = location.href;
+  checkHealth(); setInterval(checkHealth, 4000);
+</script>
+</body></html>
+"""
@@ -0,0 +1,280 @@
+# file: streaming/server.py
+
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+from streaming.broadcaster import FrameBroadcaster
+from streaming.encoding import StreamProfile, AdaptiveEncoder, sse_event
+from telemetry.metrics import METRICS
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+_MAX_HEADER_LINES = 100
+
+
+class _Mailbox:
+    """
+    Latest-frame slot for one client, only touched on the event loop.
+    """
+
+    def __init__(self):
+        self.item = None
+        self.seq = 0
+        self.taken = 0
+        self.dropped = 0
+        self.event = asyncio.Event()
+
+    def put(self, seq: int, item):
+        if self.seq > self.taken:
+            self.dropped += 1
+            METRICS.inc("stream.client_dropped")
+        self.item = item
+        self.seq = seq
+        self.event.set()
+
+    async def get(self, timeout: float):
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.event.clear()
+        self.taken = self.seq
+        return self.item
+
+
+class _LoopFanout:
+    """
+    The broadcaster's one subscriber on behalf of every async client:
+    each rendered frame crosses into the event loop with a single
+    call_soon_threadsafe, then lands in every client's mailbox.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, broadcaster: FrameBroadcaster):
+        self.loop = loop
+        self.broadcaster = broadcaster
+        self.mailboxes = set()
+        self.closed = False
+
+    # called on the producer thread
+    def _put(self, seq: int, item):
+        self.loop.call_soon_threadsafe(self._deliver, seq, item)
+
+    def _deliver(self, seq: int, item):
+        for mailbox in self.mailboxes:
+            mailbox.put(seq, item)
+
+    def close(self):
+        self.closed = True
+
+    # called on the event loop
+    def open(self) -> _Mailbox:
+        mailbox = _Mailbox()
+        if not self.mailboxes:
+            self.broadcaster.subscribe(self)
+        self.mailboxes.add(mailbox)
+        return mailbox
+
+    def discard(self, mailbox: _Mailbox):
+        self.mailboxes.discard(mailbox)
+        if not self.mailboxes:
+            # nobody watching: let the producer idle
+            self.broadcaster.unsubscribe(self)
+
+
+class StreamServer:
+    """
+    Single-threaded asyncio HTTP server for the web viewer:
+
+        /              index page
+        /health        health() as JSON
+        /stream        MJPEG, per-client ?width=&quality=&fps=&adaptive=&overlay=
+        /events        detection metadata as Server-Sent Events (?fps=)
+        /metrics       telemetry text, /metrics.json as JSON
+
+    Every client is a coroutine on one event loop, so a viewer costs a
+    socket write per frame rather than an OS thread spinning on a lock.
+    Frames arrive from the broadcaster's producer thread without any
+    polling (see _LoopFanout).
+    """
+
+    def __init__(self, broadcaster: FrameBroadcaster, index_html: str = "",
+                 health=None, host: str = "0.0.0.0", port: int = 5000):
+        self.broadcaster = broadcaster
+        self.index_html = index_html.encode()
+        self.health = health or (lambda: {})
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.thread = None
+        self._server = None
+        self._fanout = None
+        self._ready = threading.Event()
+        self._error = None
+
+    # ------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._fanout = _LoopFanout(self.loop, self.broadcaster)
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            self._error = e        # e.g. port in use, re-raised by start()
+            raise
+        finally:
+            self._ready.set()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def serve_forever(self):
+        """
+        Run on the calling thread until interrupted.
+        """
+        try:
+            asyncio.run(self.serve())
+        except asyncio.CancelledError:
+            pass
+        except OSError:
+            if self.thread is None:
+                raise      # start() reports it for the background thread
+
+    def start(self):
+        """
+        Run on a daemon thread; returns once the socket is listening.
+        """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        if not self._ready.wait(timeout=5.0):
+            raise RuntimeError(f"Stream server failed to listen on {self.host}:{self.port}")
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def _shutdown(self):
+        self._fanout.closed = True     # ends every /stream and /events loop
+        self._server.close()
+
+    def stop(self):
+        if self.loop is not None and self._server is not None:
+            self.loop.call_soon_threadsafe(self._shutdown)
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+    # ------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            for _ in range(_MAX_HEADER_LINES):
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2:
+                await self._respond(writer, 400, b"bad request\n")
+                return
+            method, target = parts[0], parts[1]
+            if method != "GET":
+                await self._respond(writer, 405, b"GET only\n")
+                return
+
+            url = urlsplit(target)
+            query = dict(parse_qsl(url.query))
+            path = url.path
+
+            if path == "/":
+                await self._respond(writer, 200, self.index_html, "text/html; charset=utf-8")
+            elif path == "/health":
+                await self._respond(writer, 200, json.dumps(self.health()).encode(), "application/json")
+            elif path == "/metrics":
+                await self._respond(writer, 200, METRICS.render_text().encode(),
+                                    "text/plain; version=0.0.4")
+            elif path == "/metrics.json":
+                await self._respond(writer, 200, json.dumps(METRICS.snapshot()).encode(),
+                                    "application/json")
+            elif path == "/stream":
+                await self._stream(writer, StreamProfile.from_query(query))
+            elif path == "/events":
+                await self._events(writer, StreamProfile.from_query(query))
+            else:
+                await self._respond(writer, 404, b"not found\n")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass   # client hung up
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status: int, body: bytes, ctype: str = "text/plain"):
+        writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                     f"Content-Type: {ctype}\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Cache-Control: no-cache\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    @staticmethod
+    def _start_stream(writer, ctype: str):
+        writer.write(f"HTTP/1.1 200 OK\r\n"
+                     f"Content-Type: {ctype}\r\n"
+                     f"Cache-Control: no-cache\r\n"
+                     f"Connection: close\r\n\r\n".encode())
+
+    async def _frames(self, mailbox: _Mailbox, fps: float):
+        """
+        Frames for one client at most `fps` per second (0 = all), None
+        after an idle second.
+        """
+        gap = 1.0 / fps if fps > 0 else 0.0
+        next_time = 0.0
+        while not self._fanout.closed:
+            wait = next_time - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            frame = await mailbox.get(timeout=1.0)
+            if frame is not None:
+                next_time = time.time() + gap
+            yield frame
+
+    async def _stream(self, writer, profile: StreamProfile):
+        self._start_stream(writer, "multipart/x-mixed-replace; boundary=frame")
+        encoder = AdaptiveEncoder(profile)
+        mailbox = self._fanout.open()
+        seen_dropped = 0
+        try:
+            async for frame in self._frames(mailbox, profile.fps):
+                if frame is None:
+                    continue
+                # first client on these settings encodes off the loop, the rest reuse it
+                jpg = encoder.cached(frame)
+                if jpg is None:
+                    jpg = await self.loop.run_in_executor(None, encoder.encode, frame)
+                if not jpg:
+                    continue
+
+                # bytes still queued from the previous part = socket buffer backed up
+                backlogged = writer.transport.get_write_buffer_size() > 0
+                writer.write(b"--frame\r\n"
+                             b"Content-Type: image/jpeg\r\n"
+                             b"Content-Length: " + str(len(jpg)).encode() + b"\r\n\r\n" + jpg + b"\r\n")
+                t0 = time.time()
+                await writer.drain()
+                skipped = 0 if profile.fps else mailbox.dropped - seen_dropped
+                seen_dropped = mailbox.dropped
+                encoder.record(sent=1, skipped=skipped, write_time=time.time() - t0,
+                               backlogged=backlogged)
+        finally:
+            self._fanout.discard(mailbox)
+
+    async def _events(self, writer, profile: StreamProfile):
+        self._start_stream(writer, "text/event-stream")
+        mailbox = self._fanout.open()
+        try:
+            async for frame in self._frames(mailbox, profile.fps):
+                writer.write(b": keepalive\n\n" if frame is None else sse_event(frame.meta))
+                await writer.drain()
+        finally:
+            self._fanout.discard(mailbox)
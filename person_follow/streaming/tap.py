@@ -0,0 +1,86 @@
+# file: streaming/tap.py
+
+import threading
+
+from config.constants import DEBUG_STREAM_FPS
+from streaming.encoding import StreamFrame
+
+
+class FrameTap:
+    """
+    Feeds a FrameBroadcaster from a loop that already has the frames and
+    detections (main.py's control loop), instead of a render() that
+    reads the camera and runs inference itself.
+
+        tap = FrameTap()
+        broadcaster = FrameBroadcaster(tap.render).start()
+        ...
+        if broadcaster.viewers and tap.due(frame_time):
+            tap.publish(frame_ref, meta, draw)
+
+    publish() only pins the ring slot and returns; the full-resolution
+    copy, overlay and JPEG encode happen on the broadcaster and server
+    threads. Latest wins: an unread frame is released as soon as a newer
+    one replaces it, so the tap holds at most two slots.
+    """
+
+    def __init__(self, max_fps: float = DEBUG_STREAM_FPS):
+        self.gap = 1.0 / max_fps if max_fps > 0 else 0.0
+        self._cond = threading.Condition()
+        self._pending = None
+        self._next_time = 0.0
+        self.published = 0
+        self.closed = False
+
+    def due(self, frame_time: float) -> bool:
+        """
+        True once per 1/max_fps of frame time.
+        """
+        if frame_time < self._next_time:
+            return False
+        self._next_time = frame_time + self.gap
+        return True
+
+    def publish(self, ref, meta: dict, draw=None):
+        """
+        ref: FrameRef still held by the caller (the tap takes its own pin).
+        draw(full_res_copy) → annotated image, run only if a client wants it.
+        """
+        ref = ref.retain()
+        with self._cond:
+            if self.closed:
+                ref.release()
+                return
+            old, self._pending = self._pending, (ref, meta, draw)
+            self.published += 1
+            self._cond.notify()
+        if old is not None:
+            old[0].release()
+
+    def render(self, timeout: float = 0.5):
+        """
+        FrameBroadcaster render(): next published frame, or None.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending is not None or self.closed, timeout):
+                return None
+            item, self._pending = self._pending, None
+        if item is None:
+            return None
+
+        ref, meta, draw = item
+        try:
+            image = ref.full()
+            if not ref.valid():
+                return None      # zero-copy bus frame overwritten mid-copy
+        finally:
+            ref.release()
+        return StreamFrame(image, meta, draw)
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            item, self._pending = self._pending, None
+            self._cond.notify_all()
+        if item is not None:
+            item[0].release()
@@ -0,0 +1,294 @@
+# file: telemetry/metrics.py
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config.constants import METRICS_ENABLED
+
+# Quantiles exported next to the buckets, as (label, q)
+EXPORT_QUANTILES = (("0.5", 0.50), ("0.95", 0.95), ("0.99", 0.99))
+
+# Upper bounds in milliseconds; the last bucket catches everything else
+DEFAULT_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 200, 350, 500, 1000,
+                      float("inf"))
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram (milliseconds).
+    observe() is a bisect and three adds under a lock — cheap enough
+    for every frame.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float):
+        i = bisect_left(self.buckets, ms)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += ms
+            if ms > self.max:
+                self.max = ms
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate, interpolating linearly inside the matching bucket.
+        """
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+            top = self.max
+        if count == 0:
+            return 0.0
+
+        rank = q * count
+        seen = 0
+        for i, c in enumerate(counts):
+            if c and seen + c >= rank:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = min(self.buckets[i], top)
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return top
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count, total, top = self.count, self.total, self.max
+            buckets = [[b, c] for b, c in zip(self.buckets, self.counts)]
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else 0.0,
+            "max": top,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1):
+        with self._lock:
+            self.value += n
+
+
+class _Span:
+    __slots__ = ("_hist", "_t0")
+
+    def __init__(self, hist: Histogram):
+        self._hist = hist
+
+    def __enter__(self):
+        self._t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._hist.observe((time.perf_counter_ns() - self._t0) / 1e6)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """
+    Process-wide registry of histograms, counters and gauges.
+
+        with METRICS.span("inference"):
+            ...
+        METRICS.counter("frames.dropped").inc()
+
+    Spans use the monotonic perf_counter_ns clock. When disabled,
+    span() returns a shared no-op context manager.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def histogram(self, name: str) -> Histogram:
+        h = self.histograms.get(name)
+        if h is None:
+            with self._lock:
+                h = self.histograms.setdefault(name, Histogram())
+        return h
+
+    def counter(self, name: str) -> Counter:
+        c = self.counters.get(name)
+        if c is None:
+            with self._lock:
+                c = self.counters.setdefault(name, Counter())
+        return c
+
+    def span(self, name: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self.histogram(name))
+
+    def observe(self, name: str, ms: float):
+        if self.enabled:
+            self.histogram(name).observe(ms)
+
+    def inc(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counter(name).inc(n)
+
+    def set_gauge(self, name: str, value: float):
+        if not self.enabled:
+            return
+        if name in self.gauges:
+            self.gauges[name] = value
+        else:
+            with self._lock:
+                self.gauges[name] = value
+
+    def _sorted(self):
+        """
+        Sorted copies of the registries: other threads may register new
+        metrics while an export iterates.
+        """
+        with self._lock:
+            return (sorted(self.histograms.items()), sorted(self.counters.items()),
+                    sorted(self.gauges.items()))
+
+    # ------------------------------------------------------------
+    # EXPORT
+    # ------------------------------------------------------------
+    def snapshot(self) -> dict:
+        histograms, counters, gauges = self._sorted()
+        return {
+            "uptime_s": time.time() - self.started,
+            "latency_ms": {k: h.snapshot() for k, h in histograms},
+            "counters": {k: c.value for k, c in counters},
+            "gauges": dict(gauges),
+        }
+
+    def render_text(self) -> str:
+        """
+        Prometheus text exposition (format 0.0.4). Each stage is a
+        <stage>_ms histogram; its quantile estimates and max go out as
+        separate gauges, one type per metric name.
+        """
+        histograms, counters, gauges = self._sorted()
+        lines = []
+        for name, h in histograms:
+            key = name.replace(".", "_") + "_ms"
+            snap = h.snapshot()
+            lines.append(f"# TYPE {key} histogram")
+            cumulative = 0
+            for bound, c in snap["buckets"]:
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'{key}_bucket{{le="{le}"}} {cumulative}')
+            lines.append(f"{key}_sum {snap['sum']:.3f}")
+            lines.append(f"{key}_count {snap['count']}")
+            lines.append(f"# TYPE {key}_quantile gauge")
+            for label, q in EXPORT_QUANTILES:
+                lines.append(f'{key}_quantile{{quantile="{label}"}} {h.quantile(q):.3f}')
+            lines.append(f"# TYPE {key}_max gauge")
+            lines.append(f"{key}_max {snap['max']:.3f}")
+        for name, c in counters:
+            key = name.replace(".", "_") + "_total"
+            lines.append(f"# TYPE {key} counter")
+            lines.append(f"{key} {c.value}")
+        for name, v in gauges:
+            key = name.replace(".", "_")
+            lines.append(f"# TYPE {key} gauge")
+            lines.append(f"{key} {v}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, names=None) -> str:
+        """
+        One compact line: p50/p95/p99 per stage, then counters.
+        """
+        parts = []
+        for name in names or sorted(self.histograms):
+            h = self.histograms.get(name)
+            if h is None or h.count == 0:
+                continue
+            parts.append(f"{name} {h.quantile(0.5):.1f}/{h.quantile(0.95):.1f}/"
+                         f"{h.quantile(0.99):.1f}")
+        counters = " ".join(f"{k}={c.value}" for k, c in sorted(self.counters.items()))
+        return "[METRICS] p50/p95/p99 ms: " + " | ".join(parts) + (f" || {counters}" if counters else "")
+
+
+METRICS = Metrics()
+
+
+# ============================================================
+# HTTP ENDPOINT
+# ============================================================
+class _Handler(BaseHTTPRequestHandler):
+    metrics = METRICS
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path in ("/", "/metrics"):
+            body = self.metrics.render_text().encode()
+            ctype = "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body = json.dumps(self.metrics.snapshot()).encode()
+            ctype = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass   # keep the console for the runtime
+
+
+class MetricsServer:
+    """
+    Serves METRICS on a daemon thread: /metrics (text), /metrics.json.
+    """
+
+    def __init__(self, host: str, port: int, metrics: Metrics = METRICS):
+        handler = type("MetricsHandler", (_Handler,), {"metrics": metrics})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        try:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        except Exception:
+            pass
@@ -0,0 +1,7 @@
+# file: tests/conftest.py
+
+import os
+import sys
+
+# modules import each other as top-level packages (robot.*, config.*), like main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,180 @@
+# file: tests/test_auppbot_emulator.py
+"""
+AUPPBot's threaded serial path against the firmware emulator (pty,
+Linux / macOS): what reaches the wire, in which order, what the
+watchdog does when commands stop, and how feedback counts acks.
+"""
+
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from config.constants import COMMAND_WATCHDOG, SERIAL_HEARTBEAT_HZ
+from robot.auppbot import AUPPBot
+from robot.emulator import FirmwareEmulator, MOTOR_IDS, STOP_ALL
+from robot.feedback import FeedbackReader
+
+
+@pytest.fixture
+def emu():
+    emulator = FirmwareEmulator(baud=0).start()
+    yield emulator
+    emulator.close()
+
+
+@pytest.fixture
+def bot(emu):
+    robot = AUPPBot(emu.port, 115200, use_signals=False)
+    yield robot
+    robot.close()
+
+
+def wire(emu):
+    """(id, dir, value) of every packet the emulator received, in order."""
+    emu.settle()
+    return [(p.id, p.dir, p.value) for p in emu.packets]
+
+
+def motors(*speeds):
+    return [(i, 0 if v >= 0 else 1, abs(v)) for i, v in zip(MOTOR_IDS, speeds)]
+
+
+@contextmanager
+def io_stalled(bot):
+    """
+    Hold the writer as if the port were stuck mid-write: the I/O thread
+    takes a servo packet and blocks on it, everything posted inside the
+    block waits behind it. Yields the packet it is stuck on.
+    """
+    blocker = (6, 0, 100)
+    with bot._writer._lock:
+        bot.servo2.angle(100)
+        deadline = time.monotonic() + 1.0
+        while not bot._io._busy:
+            assert time.monotonic() < deadline, "I/O thread never picked up the blocker"
+            time.sleep(0.001)
+        yield blocker
+
+
+def test_writes_follow_post_order(emu, bot):
+    with io_stalled(bot) as blocker:
+        bot.servo1.angle(45)
+        bot.set_motors(10, 10, -10, -10)
+        bot.servo2.angle(120)
+    assert bot.flush(timeout=1.0)
+
+    assert wire(emu) == [blocker, (5, 0, 45)] + motors(10, 10, -10, -10) + [(6, 0, 120)]
+
+
+def test_stop_all_drops_unsent_motion(emu, bot):
+    with io_stalled(bot) as blocker:
+        bot.set_motors(20, 20, 20, 20)
+        bot.stop_all()
+    assert bot.flush(timeout=1.0)
+
+    assert wire(emu) == [blocker, (STOP_ALL, 0, 0)]
+
+
+def test_stop_all_forgets_cached_speeds(emu, bot):
+    bot.set_motors(20, 20, 20, 20)
+    bot.stop_all()
+    bot.set_motors(20, 20, 20, 20)      # same speeds, must still go out after the stop
+    assert bot.flush(timeout=1.0)
+
+    assert wire(emu)[-5:] == [(STOP_ALL, 0, 0)] + motors(20, 20, 20, 20)
+    assert emu.motors == {1: 20, 2: 20, 3: 20, 4: 20}
+
+
+def test_superseded_command_never_reaches_wire(emu, bot):
+    with io_stalled(bot) as blocker:
+        bot.set_motors(10, 10, 10, 10)
+        bot.set_motors(20, 20, 20, 20)
+        bot.set_motors(30, 30, -30, -30)
+    assert bot.flush(timeout=1.0)
+
+    assert wire(emu) == [blocker] + motors(30, 30, -30, -30)
+    assert bot.link_stats()["superseded"] == 2
+
+
+def test_watchdog_stops_wheels(emu):
+    bot = AUPPBot(emu.port, 115200, use_signals=False,
+                  heartbeat_hz=SERIAL_HEARTBEAT_HZ, watchdog=COMMAND_WATCHDOG)
+    try:
+        bot.set_motors(25, 25, 25, 25)
+        assert emu.wait(lambda e: e.motors[1] == 25, timeout=1.0)
+        t0 = time.monotonic()
+
+        assert emu.wait(lambda e: not any(e.motors.values()), timeout=COMMAND_WATCHDOG + 1.0)
+        assert time.monotonic() - t0 >= COMMAND_WATCHDOG * 0.9
+        assert bot.link_stats()["watchdog"] == 1
+
+        # the next command drives again
+        bot.set_motors(15, 15, 15, 15)
+        assert emu.wait(lambda e: e.motors == {1: 15, 2: 15, 3: 15, 4: 15}, timeout=1.0)
+    finally:
+        bot.close()
+
+
+def test_watchdog_quiet_while_commands_flow(emu):
+    bot = AUPPBot(emu.port, 115200, use_signals=False,
+                  heartbeat_hz=SERIAL_HEARTBEAT_HZ, watchdog=COMMAND_WATCHDOG)
+    try:
+        end = time.monotonic() + COMMAND_WATCHDOG * 2
+        while time.monotonic() < end:
+            bot.set_motors(25, 25, 25, 25)
+            time.sleep(COMMAND_WATCHDOG / 5)
+        assert bot.link_stats()["watchdog"] == 0
+        assert emu.motors == {1: 25, 2: 25, 3: 25, 4: 25}
+    finally:
+        bot.close()
+
+
+def test_io_thread_survives_failing_hook(emu):
+    bot = AUPPBot(emu.port, 115200, use_signals=False,
+                  heartbeat_hz=SERIAL_HEARTBEAT_HZ, watchdog=COMMAND_WATCHDOG)
+    try:
+        def broken_hook(data, written_at, origin):
+            bot._writer.on_sent = None      # fails once
+            raise RuntimeError("hook bug")
+
+        bot._writer.on_sent = broken_hook
+        bot.set_motors(10, 10, 10, 10)
+        assert bot.flush(timeout=1.0)
+        assert bot.link_stats()["errors"] == 1
+        assert isinstance(bot._io.last_error, RuntimeError)
+
+        # still writing, and the watchdog still guards the wheels
+        bot.set_motors(25, 25, 25, 25)
+        assert emu.wait(lambda e: e.motors[1] == 25, timeout=1.0)
+        assert emu.wait(lambda e: not any(e.motors.values()), timeout=COMMAND_WATCHDOG + 1.0)
+        assert bot.link_stats()["watchdog"] == 1
+    finally:
+        bot.close()
+
+
+@pytest.mark.parametrize("ack", [True, False])
+def test_feedback_counts_acked_and_lost(ack):
+    emu = FirmwareEmulator(baud=0, ack=ack).start()
+    bot = AUPPBot(emu.port, 115200, use_signals=False, feedback=True, ack_timeout=0.1)
+    try:
+        for speed in (10, 20, 30):
+            bot.set_motors(speed, speed, speed, speed)
+            assert bot.flush(timeout=1.0)
+        assert emu.wait(lambda e: e.received == 12, timeout=1.0)
+        time.sleep(0.2)          # past ack_timeout, with no further traffic
+
+        stats = bot.link_stats()
+        assert (stats["acked"], stats["lost"]) == ((12, 0) if ack else (0, 12))
+    finally:
+        bot.close()
+        emu.close()
+
+
+def test_feedback_counts_evicted_packets_as_lost():
+    class Port:
+        def read(self, n): return b""
+
+    reader = FeedbackReader(Port(), ack_timeout=10.0, max_outstanding=4)
+    reader.sent(bytes(range(3 * 6)), time.perf_counter())
+    assert reader.snapshot()["lost"] == 2
@@ -0,0 +1,159 @@
+# file: tests/test_frame_bus.py
+"""
+Shared-memory frame bus: publisher → subscriber in one process, and
+VideoStream on a bus:<name> source.
+"""
+
+import itertools
+import os
+import subprocess
+import threading
+
+import numpy as np
+import pytest
+
+from camera.frame_bus import FrameBusPublisher, FrameBusSubscriber, _PID
+from camera.video_stream import VideoStream
+
+SHAPE = (48, 64, 3)
+_names = itertools.count()
+
+
+def frame(k: int) -> np.ndarray:
+    return np.full(SHAPE, k % 256, dtype=np.uint8)
+
+
+@pytest.fixture
+def publisher():
+    bus = FrameBusPublisher(f"pf_test_{os.getpid()}_{next(_names)}", SHAPE, slots=4)
+    bus.publish(frame(1), 1.0)
+    yield bus
+    bus.close()
+
+
+def call(fn, timeout: float = 2.0):
+    """fn() on a thread; fails instead of hanging the suite on a deadlock."""
+    out = {}
+    t = threading.Thread(target=lambda: out.setdefault("value", fn()), daemon=True)
+    t.start()
+    t.join(timeout)
+    assert not t.is_alive(), f"{fn.__name__} did not return within {timeout} s"
+    return out["value"]
+
+
+def dead_pid() -> int:
+    proc = subprocess.Popen(["true"])
+    proc.wait()
+    return proc.pid
+
+
+def test_round_trip(publisher):
+    sub = FrameBusSubscriber(publisher.name)
+    try:
+        view, seq, capture_time = sub.wait_next(0, timeout=1.0)
+        assert (seq, capture_time) == (1, 1.0)
+        assert np.array_equal(view, frame(1))
+        assert sub.wait_next(1, timeout=0.05) is None
+
+        publisher.publish(frame(2), 2.0)
+        view, seq, capture_time = sub.wait_next(1, timeout=1.0)
+        assert (seq, capture_time) == (2, 2.0)
+        assert np.array_equal(view, frame(2))
+
+        # read() copies and never returns the same frame twice
+        ok, image = sub.read()
+        assert ok and np.array_equal(image, frame(2))
+        assert not np.shares_memory(image, view)
+        assert sub.read() == (False, None)
+    finally:
+        sub.release()
+
+
+def test_view_invalid_once_overwritten(publisher):
+    sub = FrameBusSubscriber(publisher.name)
+    try:
+        view, seq, _ = sub.wait_next(0, timeout=1.0)
+        # the slot is only reused slots publishes later
+        for k in range(2, 5):
+            publisher.publish(frame(k), float(k))
+        assert sub.valid(seq) and np.array_equal(view, frame(1))
+
+        publisher.begin()
+        assert not sub.valid(seq)          # being written
+        publisher.commit(5.0)
+        assert not sub.valid(seq)          # written: view holds frame 5
+        assert sub.valid(5)
+    finally:
+        sub.release()
+
+
+def test_stream_ref_invalid_once_overwritten(publisher):
+    stream = VideoStream(f"bus:{publisher.name}").start()
+    try:
+        ref = call(lambda: stream.wait_next(0, timeout=1.0))
+        with ref:
+            assert ref.valid()
+            for k in range(2, 6):
+                publisher.publish(frame(k), float(k))
+            assert not ref.valid()
+    finally:
+        stream.stop()
+
+
+def test_stale_publisher_replaced(publisher):
+    # a publisher that died without close()
+    publisher._v.header[_PID] = dead_pid()
+    sub = FrameBusSubscriber(publisher.name)
+    try:
+        assert not sub.closed and sub.stale
+        assert sub.reattach() and sub.stale        # same block again
+
+        replacement = FrameBusPublisher(publisher.name, SHAPE, slots=4)
+        try:
+            replacement.publish(frame(3), 3.0)
+            generation = sub.generation
+            assert sub.reattach()
+            assert sub.generation == generation + 1 and not sub.stale
+            view, seq, _ = sub.wait_next(0, timeout=1.0)
+            assert seq == 1 and np.array_equal(view, frame(3))
+        finally:
+            replacement.close()
+    finally:
+        sub.release()
+
+
+def test_stream_follows_replacement(publisher):
+    publisher._v.header[_PID] = dead_pid()
+    stream = VideoStream(f"bus:{publisher.name}").start()
+    replacement = None
+    try:
+        replacement = FrameBusPublisher(publisher.name, SHAPE, slots=4)
+        replacement.publish(frame(4), 4.0)
+        ref = call(lambda: stream.wait_next(1, timeout=2.0), timeout=3.0)
+        with ref:
+            assert ref.seq == 2 and np.array_equal(ref.image, frame(4))
+    finally:
+        stream.stop()
+        if replacement is not None:
+            replacement.close()
+
+
+def test_stream_read_from_bus(publisher):
+    stream = VideoStream(f"bus:{publisher.name}").start()
+    try:
+        publisher.publish(frame(7), 2.0)
+        assert call(lambda: stream.wait_next(1, timeout=1.0)).seq == 2
+
+        image, capture_time = call(stream.read_timed)
+        assert capture_time == 2.0
+        assert np.array_equal(image, frame(7))
+        assert np.array_equal(call(stream.read), frame(7))
+
+        # the capture thread still follows the bus afterwards
+        publisher.publish(frame(9), 3.0)
+        ref = call(lambda: stream.wait_next(2, timeout=1.0))
+        with ref:
+            assert np.array_equal(ref.image, frame(9))
+            assert ref.valid()
+    finally:
+        stream.stop()
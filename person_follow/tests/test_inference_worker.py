@@ -0,0 +1,86 @@
+# file: tests/test_inference_worker.py
+"""
+InferenceWorker with a stand-in detector: when the frame is released
+and when a zero-copy frame counts as torn.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from detection.detection import Detections
+from detection.worker import InferenceWorker
+
+
+class FakeDetector:
+    """prepare() / infer() like PersonDetector, recording the call order."""
+
+    def __init__(self):
+        self.calls = []
+        self.inferring = threading.Event()
+        self.finish = threading.Event()
+
+    def prepare(self, frame, roi=None):
+        self.calls.append("prepare")
+
+    def infer(self):
+        self.calls.append("infer")
+        self.inferring.set()
+        self.finish.wait(1.0)
+        return Detections.empty(64)
+
+
+@pytest.fixture
+def detector():
+    return FakeDetector()
+
+
+@pytest.fixture
+def worker(detector):
+    w = InferenceWorker(detector).start()
+    yield w
+    w.stop()
+
+
+def submit(worker, detector, valid):
+    worker.submit(np.zeros((48, 64, 3), np.uint8), 1, 0.0,
+                  release=lambda: detector.calls.append("release"), valid=valid)
+
+
+def wait_idle(worker, timeout: float = 1.0):
+    deadline = time.monotonic() + timeout
+    while worker.busy:
+        assert time.monotonic() < deadline, "worker never finished"
+        time.sleep(0.005)
+
+
+def test_frame_released_before_inference(worker, detector):
+    detector.finish.set()
+    submit(worker, detector, valid=lambda: True)
+    wait_idle(worker)
+
+    assert detector.calls == ["prepare", "release", "infer"]
+    assert worker.latest().frame_id == 1
+
+
+def test_overwrite_during_inference_keeps_result(worker, detector):
+    # only prepare() reads the frame: overwriting it later is harmless
+    intact = [True]
+    submit(worker, detector, valid=lambda: intact[0])
+    assert detector.inferring.wait(1.0)
+    intact[0] = False
+    detector.finish.set()
+    wait_idle(worker)
+
+    assert worker.latest().frame_id == 1
+
+
+def test_frame_torn_while_read_is_dropped(worker, detector):
+    submit(worker, detector, valid=lambda: False)
+    wait_idle(worker)
+
+    assert detector.calls == ["prepare", "release"]
+    assert worker.latest() is None
+    assert worker.completed == 0
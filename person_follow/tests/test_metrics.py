@@ -0,0 +1,73 @@
+# file: tests/test_metrics.py
+"""
+Metrics registry exports: Prometheus text rules, and exports running
+while other threads register new metrics.
+"""
+
+import re
+import threading
+
+from telemetry.metrics import Metrics
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$')
+
+
+def parse(text: str):
+    """{metric name: type} and [(sample name, labels, value)]."""
+    types, samples = {}, []
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            assert name not in types, f"{name} declared twice"
+            types[name] = kind
+        elif line:
+            m = SAMPLE.match(line)
+            assert m, f"bad sample line: {line!r}"
+            samples.append((m.group(1), m.group(2) or "", float(m.group(3))))
+    return types, samples
+
+
+def family(sample: str, types: dict) -> str:
+    for suffix in ("_bucket", "_sum", "_count"):
+        base = sample[:-len(suffix)]
+        if sample.endswith(suffix) and types.get(base) == "histogram":
+            return base
+    return sample
+
+
+def test_render_text_is_valid_exposition():
+    m = Metrics(enabled=True)
+    for ms in (0.3, 3.2, 7.0, 40.0):
+        m.observe("inference", ms)
+    m.inc("frames.dropped", 2)
+    m.set_gauge("detector.max_person_conf", 0.8)
+
+    types, samples = parse(m.render_text())
+    # every sample belongs to exactly one declared metric
+    for name, _, _ in samples:
+        assert family(name, types) in types, name
+
+    assert types["inference_ms"] == "histogram"
+    values = {name + labels: v for name, labels, v in samples}
+    assert values['inference_ms_bucket{le="+Inf"}'] == values["inference_ms_count"] == 4
+    assert values["inference_ms_sum"] == 50.5
+    assert values["frames_dropped_total"] == 2
+    quantiles = [labels for name, labels, _ in samples if name == "inference_ms_quantile"]
+    assert quantiles == ['{quantile="0.5"}', '{quantile="0.95"}', '{quantile="0.99"}']
+
+
+def test_export_while_registering():
+    m = Metrics(enabled=True)
+
+    def register():
+        for k in range(3000):
+            m.observe(f"stage{k}", 1.0)
+            m.inc(f"counter{k}")
+            m.set_gauge(f"gauge{k}", k)
+
+    t = threading.Thread(target=register)
+    t.start()
+    while t.is_alive():
+        m.snapshot()
+        m.render_text()
+    t.join()
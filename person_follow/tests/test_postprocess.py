@@ -0,0 +1,98 @@
+# file: tests/test_postprocess.py
+"""
+Vectorized postprocessing against the per-box loops it replaced:
+greedy NMS, bbox restoration and the single-best pick.
+"""
+
+import numpy as np
+import pytest
+
+from detection.detection import PERSON_CLASS_ID, PersonDetector, nms
+
+
+def loop_nms(boxes, scores, iou_threshold):
+    """Textbook greedy NMS, one pair of boxes at a time."""
+    def iou(a, b):
+        iw = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+        ih = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+        inter = iw * ih
+        area = lambda r: max(0.0, r[2] - r[0]) * max(0.0, r[3] - r[1])
+        return inter / max(area(a) + area(b) - inter, 1e-9)
+
+    keep = []
+    for i in sorted(range(len(scores)), key=lambda k: -scores[k]):
+        if all(iou(boxes[i], boxes[j]) <= iou_threshold for j in keep):
+            keep.append(i)
+    return keep
+
+
+def random_boxes(rng, n, size=640):
+    xy = rng.uniform(0, size * 0.8, (n, 2))
+    wh = rng.uniform(10, size * 0.3, (n, 2))
+    return np.hstack([xy, xy + wh]).astype(np.float32), rng.random(n).astype(np.float32)
+
+
+def detector(conf_threshold=0.5, iou_threshold=0.45, candidate_size=200,
+             frame=(480, 640), new=(225, 300), scale=300 / 640):
+    """A PersonDetector with only the postprocess state (no ONNX session)."""
+    d = PersonDetector.__new__(PersonDetector)
+    d.conf_threshold = conf_threshold
+    d.iou_threshold = iou_threshold
+    d.candidate_size = candidate_size
+    d.last_H, d.last_W = frame
+    d.last_new_h, d.last_new_w = new
+    d.last_scale = scale
+    return d
+
+
+@pytest.mark.parametrize("iou_threshold", [0.0, 0.3, 0.45, 0.7, 1.0])
+@pytest.mark.parametrize("seed", range(5))
+def test_nms_matches_loop(seed, iou_threshold):
+    rng = np.random.default_rng(seed)
+    boxes, scores = random_boxes(rng, 60)
+    assert nms(boxes, scores, iou_threshold).tolist() == loop_nms(boxes, scores, iou_threshold)
+
+
+def test_nms_edge_cases():
+    assert nms(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), 0.5).size == 0
+    assert nms(np.array([[0, 0, 10, 10]], np.float32), np.array([0.9], np.float32), 0.5).tolist() == [0]
+    # identical boxes: only the best survives
+    boxes = np.tile(np.array([[5, 5, 50, 50]], np.float32), (3, 1))
+    assert nms(boxes, np.array([0.6, 0.9, 0.7], np.float32), 0.5).tolist() == [1]
+
+
+def test_restore_bboxes_matches_restore_bbox():
+    d = detector()
+    rng = np.random.default_rng(1)
+    normalized = rng.uniform(-0.2, 1.2, (100, 4)).astype(np.float32)
+    loop = np.array([d.restore_bbox(b.copy()) for b in normalized])
+    assert np.abs(d.restore_bboxes(normalized).astype(np.int32) - loop).max() <= 1
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_best_matches_loop_pick(seed):
+    d = detector()
+    rng = np.random.default_rng(seed)
+    scores = rng.random((300, 21)).astype(np.float32) * 0.6
+    boxes = rng.uniform(0, 1, (300, 4)).astype(np.float32)
+    boxes[:, 2:] = np.maximum(boxes[:, 2:], boxes[:, :2])
+
+    # the loop PersonDetector.detect() used to run
+    best_conf, best_bbox = 0.0, None
+    for i in range(scores.shape[0]):
+        conf = float(scores[i][PERSON_CLASS_ID])
+        if conf >= d.conf_threshold and conf > best_conf:
+            best_conf, best_bbox = conf, d.restore_bbox(boxes[i].copy())
+
+    best = d.postprocess(scores, boxes).best()
+    assert best["found"] == (best_bbox is not None)
+    if best_bbox is not None:
+        assert best["conf"] == pytest.approx(best_conf)
+        assert np.abs(np.array(best["bbox"]) - best_bbox).max() <= 1
+
+
+def test_nothing_above_threshold():
+    d = detector()
+    scores = np.full((50, 21), 0.1, np.float32)
+    best = d.postprocess(scores, np.zeros((50, 4), np.float32)).best()
+    assert best == {"found": False, "zone": None, "bbox": None, "conf": 0.0}
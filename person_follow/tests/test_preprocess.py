@@ -0,0 +1,67 @@
+# file: tests/test_preprocess.py
+"""
+Preprocessor (reusable NCHW buffers) against the allocate-per-frame
+letterbox + normalization it replaced.
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from detection.preprocess import Preprocessor
+
+IN = 300
+
+
+def reference(frame):
+    """The old PersonDetector.preprocess(): new arrays on every call."""
+    H, W = frame.shape[:2]
+    scale = IN / float(max(H, W))
+    new_w, new_h = int(W * scale), int(H * scale)
+
+    resized = cv2.resize(frame, (new_w, new_h))
+    resized = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB).astype(np.float32)
+    canvas = np.zeros((IN, IN, 3), dtype=np.float32)
+    canvas[:new_h, :new_w] = resized
+    canvas = (canvas - np.array([127, 127, 127], dtype=np.float32)) / 128.0
+    return np.expand_dims(np.transpose(canvas, (2, 0, 1)), axis=0), (new_w, new_h, scale)
+
+
+def frame(shape, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+@pytest.mark.parametrize("shape", [(480, 640, 3), (640, 480, 3), (300, 300, 3), (123, 457, 3)])
+def test_matches_reference(shape):
+    pre = Preprocessor(IN, IN)
+    f = frame(shape)
+    blob = pre(f)
+    expected, (new_w, new_h, scale) = reference(f)
+
+    assert blob.shape == (1, 3, IN, IN) and blob.dtype == np.float32
+    assert blob.flags.c_contiguous
+    np.testing.assert_allclose(blob, expected, atol=1e-6)
+    g = pre.geometry
+    assert (g.new_w, g.new_h, g.scale, g.src_w, g.src_h) == (new_w, new_h, scale, shape[1], shape[0])
+
+
+def test_buffer_reused_and_padding_reset_between_sizes():
+    pre = Preprocessor(IN, IN)
+    first = pre(frame((640, 480, 3), 1))
+    # alternating geometries must not leave stale pixels in the padding
+    for k, shape in enumerate([(480, 640, 3), (640, 480, 3), (200, 600, 3), (480, 640, 3)]):
+        f = frame(shape, k + 2)
+        blob = pre(f)
+        assert blob is first
+        np.testing.assert_allclose(blob, reference(f)[0], atol=1e-6)
+
+
+def test_fused_blob_is_letterboxed_bgr():
+    pre = Preprocessor(IN, IN, fused=True)
+    f = frame((480, 640, 3))
+    blob = pre(f)
+    g = pre.geometry
+
+    assert blob.shape == (1, IN, IN, 3) and blob.dtype == np.uint8
+    np.testing.assert_array_equal(blob[0, :g.new_h, :g.new_w], cv2.resize(f, (g.new_w, g.new_h)))
+    assert not blob[0, g.new_h:].any() and not blob[0, :, g.new_w:].any()
@@ -0,0 +1,103 @@
+# file: tests/test_sources.py
+"""
+Reduced-size JPEG decode: decode_scaled(), the raw MJPEG packet path and
+VideoStream replaying a recorded session at decode_scale=2.
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from camera.sources import SessionRecorder, RecordedSessionSource, _decode_packet, decode_scaled
+from camera.video_stream import VideoStream
+
+H, W = 96, 128
+
+
+def image(k: int = 0) -> np.ndarray:
+    # smooth content: a reduced decode should look like decode + resize
+    y, x = np.mgrid[0:H, 0:W]
+    return np.dstack([x * 2, y * 2, np.full_like(x, 40 * k)]).astype(np.uint8)
+
+
+def jpeg(frame: np.ndarray) -> np.ndarray:
+    ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    assert ok
+    return data.reshape(-1)
+
+
+def jpegs(path: str) -> list:
+    source = RecordedSessionSource(path, realtime=False)
+    records = []
+    while True:
+        record = source._next_record()
+        if record is None:
+            break
+        records.append(record[1])
+    source.release()
+    return records
+
+
+@pytest.fixture
+def session(tmp_path):
+    path = str(tmp_path / "clip.pfs")
+    recorder = SessionRecorder(path, quality=95)
+    for k in range(4):
+        recorder.write(image(k), 100.0 + k)
+    recorder.close()
+    return path
+
+
+@pytest.mark.parametrize("scale", [2, 4])
+def test_decode_scaled_matches_decode_and_resize(scale):
+    data = jpeg(image())
+    full = decode_scaled(data, 1)
+    small = decode_scaled(data, scale)
+    assert full.shape == (H, W, 3)
+    assert small.shape == (H // scale, W // scale, 3)
+    resized = cv2.resize(full, (W // scale, H // scale), interpolation=cv2.INTER_AREA)
+    assert np.abs(small.astype(int) - resized).mean() < 2.0
+
+
+def test_decode_packet():
+    data = jpeg(image())
+    frame, encoded = _decode_packet(data.reshape(1, -1), 2)
+    assert frame.shape == (H // 2, W // 2, 3)
+    assert np.array_equal(encoded, data)
+
+    # backend ignored raw mode: decoded frame shrunk, nothing to keep
+    frame, encoded = _decode_packet(image(), 2)
+    assert frame.shape == (H // 2, W // 2, 3) and encoded is None
+
+    assert _decode_packet(np.zeros(16, dtype=np.uint8), 2) == (None, None)
+    assert _decode_packet(None, 2) == (None, None)
+
+
+def test_bad_decode_scale(session):
+    with pytest.raises(ValueError):
+        RecordedSessionSource(session, decode_scale=3)
+
+
+def test_stream_reduced_decode(session, tmp_path):
+    source = RecordedSessionSource(session, realtime=False)
+    originals = [source.read()[1].copy() for _ in range(4)]
+    source.release()
+
+    rerecorded = str(tmp_path / "again.pfs")
+    stream = VideoStream(session, realtime=False, decode_scale=2,
+                         recorder=SessionRecorder(rerecorded)).start()
+    try:
+        assert stream.scale == 2
+        last = 0
+        for k in range(4):
+            ref = stream.wait_next(last, timeout=1.0)
+            with ref:
+                assert ref.scale == 2
+                assert ref.image.shape == (H // 2, W // 2, 3)
+                assert np.array_equal(ref.full(), originals[k])
+                last = ref.seq
+    finally:
+        stream.stop()
+
+    # camera JPEGs are recorded as-is, not the reduced frames
+    assert jpegs(rerecorded) == jpegs(session)
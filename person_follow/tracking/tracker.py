@@ -0,0 +1,280 @@
+# file: tracking/tracker.py
+
+from collections import deque
+
+import cv2
+import numpy as np
+
+from config.constants import (
+    TRACK_SCALE,
+    TRACK_MAX_POINTS,
+    TRACK_MIN_POINTS,
+    TRACK_MAX_AGE,
+    TRACK_MAX_MISSES,
+)
+from detection.zones import classify_zone
+
+# Noise model (frame pixels; velocities in px/s)
+_Q_POS = 10.0 ** 2       # per second
+_Q_SIZE = 20.0 ** 2
+_Q_VEL = 300.0 ** 2
+_R_FLOW = 2.0 ** 2       # optical flow centre measurement
+_R_DET_POS = 10.0 ** 2   # SSD box centre
+_R_DET_SIZE = 15.0 ** 2  # SSD box width / height
+
+# Coasting on the Kalman prediction alone counts as a half-quality track
+_COAST_QUALITY = 0.5
+
+NOT_FOUND = {"found": False, "zone": None, "bbox": None, "conf": 0.0}
+
+
+class _ConstantVelocityKF:
+    """
+    Kalman filter over [cx, cy, w, h, vx, vy] (frame pixels).
+    Box size is a random walk, the centre moves at constant velocity.
+    """
+
+    def __init__(self, bbox):
+        x1, y1, x2, y2 = bbox
+        self.x = np.array([(x1 + x2) / 2.0, (y1 + y2) / 2.0, x2 - x1, y2 - y1, 0.0, 0.0])
+        self.P = np.diag([_R_DET_POS, _R_DET_POS, _R_DET_SIZE, _R_DET_SIZE, _Q_VEL, _Q_VEL])
+
+    def predict(self, dt: float):
+        dt = max(dt, 1e-3)
+        F = np.eye(6)
+        F[0, 4] = F[1, 5] = dt
+        Q = np.diag([_Q_POS, _Q_POS, _Q_SIZE, _Q_SIZE, _Q_VEL, _Q_VEL]) * dt
+
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + Q
+
+    def correct(self, z: np.ndarray, H: np.ndarray, R: np.ndarray):
+        y = z - H @ self.x
+        S = H @ self.P @ H.T + R
+        K = self.P @ H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(6) - K @ H) @ self.P
+
+    def correct_center(self, cx: float, cy: float, var: float):
+        H = np.zeros((2, 6))
+        H[0, 0] = H[1, 1] = 1.0
+        self.correct(np.array([cx, cy]), H, np.eye(2) * var)
+
+    def correct_box(self, bbox):
+        x1, y1, x2, y2 = bbox
+        z = np.array([(x1 + x2) / 2.0, (y1 + y2) / 2.0, x2 - x1, y2 - y1])
+        H = np.zeros((4, 6))
+        H[:, :4] = np.eye(4)
+        self.correct(z, H, np.diag([_R_DET_POS, _R_DET_POS, _R_DET_SIZE, _R_DET_SIZE]))
+
+    @property
+    def center(self):
+        return float(self.x[0]), float(self.x[1])
+
+    @property
+    def velocity(self):
+        return float(self.x[4]), float(self.x[5])
+
+    def bbox(self, frame_w: int, frame_h: int):
+        cx, cy, w, h = self.x[:4]
+        w, h = max(1.0, w), max(1.0, h)
+        x1 = int(max(0, min(frame_w, cx - w / 2)))
+        x2 = int(max(0, min(frame_w, cx + w / 2)))
+        y1 = int(max(0, min(frame_h, cy - h / 2)))
+        y2 = int(max(0, min(frame_h, cy + h / 2)))
+        return x1, y1, x2, y2
+
+
+class PersonTracker:
+    """
+    Carries the last detected person through frames the SSD doesn't see.
+
+    Every frame: update() runs pyramidal Lucas-Kanade on a downscaled
+    grayscale frame, takes the median motion of the points inside the
+    box and feeds it to a constant-velocity Kalman filter.
+    When the detector finishes: correct() snaps the filter to the SSD
+    box, first shifting that box by the motion the tracker saw since the
+    detector's frame was captured (results arrive late).
+
+    Both return a detection dict the brain understands, plus
+    "tracked": True when the box came from the tracker.
+    """
+
+    def __init__(self,
+                 scale: float = TRACK_SCALE,
+                 max_points: int = TRACK_MAX_POINTS,
+                 min_points: int = TRACK_MIN_POINTS,
+                 max_age: float = TRACK_MAX_AGE,
+                 max_misses: int = TRACK_MAX_MISSES):
+        self.scale = scale
+        self.max_points = max_points
+        self.min_points = min_points
+        self.max_age = max_age
+        self.max_misses = max_misses
+
+        self.kf = None
+        self.prev_gray = None
+        self.points = None             # [P, 1, 2] float32, downscaled coords
+        self.frame_w = 0
+        self.frame_h = 0
+        self.last_time = None
+
+        self.det_conf = 0.0            # confidence of the confirming detection
+        self.confirm_time = 0.0        # capture time of that detection's frame
+        self.misses = 0
+        self.quality = 0.0             # fraction of flow points still tracked
+
+        self.history = deque(maxlen=64)   # (frame_time, cx, cy) per update
+
+    @property
+    def active(self) -> bool:
+        return self.kf is not None
+
+    @property
+    def velocity(self):
+        """
+        Estimated (vx, vy) of the box centre in px/s.
+        """
+        return self.kf.velocity if self.active else (0.0, 0.0)
+
+    def reset(self):
+        self.kf = None
+        self.points = None
+        self.misses = 0
+        self.quality = 0.0
+        self.history.clear()
+
+    # ------------------------------------------------------------
+    # STATE OUTPUT
+    # ------------------------------------------------------------
+    def confidence(self, now: float) -> float:
+        """
+        Detection confidence, faded by track age and flow quality.
+        """
+        if not self.active:
+            return 0.0
+        age = max(0.0, now - self.confirm_time)
+        return self.det_conf * max(0.0, 1.0 - age / self.max_age) * self.quality
+
+    def current(self) -> dict:
+        if not self.active:
+            return dict(NOT_FOUND)
+
+        bbox = self.kf.bbox(self.frame_w, self.frame_h)
+        return {
+            "found": True,
+            "zone": classify_zone(bbox, self.frame_w),
+            "bbox": bbox,
+            "conf": self.confidence(self.last_time or self.confirm_time),
+            "tracked": True,
+        }
+
+    # ------------------------------------------------------------
+    # PER-FRAME PROPAGATION
+    # ------------------------------------------------------------
+    def _gray(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale,
+                           interpolation=cv2.INTER_LINEAR)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def _seed_points(self, bbox):
+        x1, y1, x2, y2 = (int(v * self.scale) for v in bbox)
+
+        # Inner part of the box: fewer background corners
+        mx, my = (x2 - x1) // 8, (y2 - y1) // 8
+        mask = np.zeros_like(self.prev_gray)
+        mask[y1 + my:y2 - my, x1 + mx:x2 - mx] = 255
+
+        self.points = cv2.goodFeaturesToTrack(
+            self.prev_gray, self.max_points, 0.01, 3, mask=mask
+        )
+        self.quality = 1.0 if self.points is not None else _COAST_QUALITY
+
+    def update(self, frame: np.ndarray, frame_time: float) -> dict:
+        gray = self._gray(frame)
+        self.frame_h, self.frame_w = frame.shape[:2]
+
+        prev_gray = self.prev_gray
+        self.prev_gray = gray
+        dt = 0.0 if self.last_time is None else frame_time - self.last_time
+        self.last_time = frame_time
+
+        if not self.active:
+            return dict(NOT_FOUND)
+
+        if frame_time - self.confirm_time > self.max_age:
+            self.reset()
+            return dict(NOT_FOUND)
+
+        cx0, cy0 = self.kf.center
+        self.kf.predict(dt)
+
+        if self.points is not None and prev_gray is not None:
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(
+                prev_gray, gray, self.points, None, winSize=(11, 11), maxLevel=2
+            )
+            good = status.ravel() == 1
+
+            if int(good.sum()) >= self.min_points:
+                d = np.median(new_points[good] - self.points[good], axis=0).ravel()
+                self.kf.correct_center(cx0 + d[0] / self.scale, cy0 + d[1] / self.scale, _R_FLOW)
+                self.quality = float(good.mean())
+                self.points = new_points[good].reshape(-1, 1, 2)
+            else:
+                # Lost the texture — coast on the motion model
+                self.points = None
+                self.quality = _COAST_QUALITY
+
+        self.history.append((frame_time,) + self.kf.center)
+        return self.current()
+
+    # ------------------------------------------------------------
+    # DETECTOR CORRECTION
+    # ------------------------------------------------------------
+    def _motion_since(self, t: float):
+        """
+        How far the tracked centre moved between time t and now.
+        """
+        if not self.history or t < self.history[0][0]:
+            return 0.0, 0.0
+
+        then = self.history[0]
+        for entry in self.history:
+            if entry[0] > t:
+                break
+            then = entry
+
+        cx, cy = self.kf.center
+        return cx - then[1], cy - then[2]
+
+    def correct(self, result) -> dict:
+        """
+        Fold a finished DetectionResult into the track.
+        """
+        det = result.detection
+        if not det.get("found", False):
+            self.misses += 1
+            if self.misses >= self.max_misses:
+                self.reset()
+            return self.current()
+
+        self.misses = 0
+        x1, y1, x2, y2 = det["bbox"]
+
+        if self.active:
+            dx, dy = self._motion_since(result.frame_time)
+            bbox = (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+            self.kf.correct_box(bbox)
+        else:
+            self.kf = _ConstantVelocityKF((x1, y1, x2, y2))
+            self.history.clear()
+
+        self.det_conf = float(det.get("conf", 0.0))
+        self.confirm_time = result.frame_time
+
+        if self.prev_gray is not None:
+            self._seed_points(self.kf.bbox(self.frame_w, self.frame_h))
+
+        out = self.current()
+        out["tracked"] = False
+        return out